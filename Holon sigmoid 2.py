@@ -1,7 +1,11 @@
 import random
-import math
+
+from holon_gating import SigmoidModulationKernel
+from holon_memory import MemoryHolon
 
 class CoreHolon:
+    modulation_kernel = SigmoidModulationKernel(k=2)
+
     def __init__(self, starting_energy, starting_materials):
         self.energy = starting_energy
         self.materials = starting_materials
@@ -12,32 +16,28 @@ class CoreHolon:
         waste_holon.reset()
         energy_holon.reset()
         energy_disposal_holon.reset()
-        k=2
+        # Sigmoid gates with k=2, equivalent to math.isclose(sigmoid, 1) but without math.exp
+        gates=self.modulation_kernel
         se=self.energy
         sm=self.materials
-        sig1=-k*(30-se)
-        sig2= -k*(70-se)
-        sig3 =-k*(30-sm)
-        sig4 =-k*(70-sm)
-        sigenergy1=1/(1+math.exp(sig1))
-        sigenergy2=1/(1+math.exp(sig2))
-        sigmat1=1/(1+math.exp(sig3))
-        sigmat2=1/(1+math.exp(sig4))
-        if math.isclose(sigenergy1,1):
+        if gates.energy_low(se):
             energy_holon.amplify()
             energy_disposal_holon.suppress()
-        elif math.isclose(sigenergy2,1):
+        elif gates.energy_high(se):
             energy_disposal_holon.amplify()
             energy_holon.suppress()
 
-        if math.isclose(sigmat1,1):
+        if gates.materials_low(sm):
             waste_holon.suppress()
-        elif math.isclose(sigmat2,1):
+        elif gates.materials_high(sm):
             waste_holon.amplify()
 
 class PerceptionHolon:
+    def __init__(self, rng=random):
+        self.rng = rng
+
     def perceive(self, num_rewards=6, reward_cost_percentage=0.25):
-        rewards = [random.randint(5, 20) for _ in range(num_rewards)]
+        rewards = [self.rng.randint(5, 20) for _ in range(num_rewards)]
         energy_costs = [reward_cost_percentage * reward for reward in rewards]
         return rewards, energy_costs
 
@@ -102,29 +102,6 @@ class EnergyDisposalHolon:
     def reset(self):
         self.activity_level = 1
 
-class MemoryHolon:
-    def __init__(self, max_memory_size=6):
-        self.max_memory_size = max_memory_size
-        self.memory = []
-
-    def remember(self, reward, feedback_type, feedback_value, core_holon):
-        if feedback_type == 'dopamine':
-            outcome_tag = 'h' if 30 <= core_holon.energy <= 70 and 30 <= core_holon.materials <= 70 else '-h'
-        elif feedback_type == 'pain':
-            outcome_tag = '-h' if core_holon.energy < 30 or core_holon.materials < 30 else 'h'
-        else:
-            outcome_tag = '-h'  # Default to negative outcome for unrecognized feedback_type
-
-        self.memory.append((reward, feedback_type, feedback_value, outcome_tag))
-        self.memory.sort(key=lambda x: abs(x[2]), reverse=True)
-        if len(self.memory) > self.max_memory_size:
-            self.memory.pop()
-
-    def get_significant_feedback(self):
-        dopamine_feedback = [item for item in self.memory if item[1] == 'dopamine']
-        pain_feedback = [item for item in self.memory if item[1] == 'pain']
-        return dopamine_feedback, pain_feedback
-
 class SuperHolon:
     def __init__(self, core_holon, perception_holon, action_holon, waste_holon, energy_holon, energy_disposal_holon, memory_holon, energy_maintenance_cost, reward_cost_percentage, materials_needed, energy_generated):
         self.core_holon = core_holon
@@ -138,6 +115,10 @@ class SuperHolon:
         self.reward_cost_percentage = reward_cost_percentage
         self.materials_needed = materials_needed
         self.energy_generated = energy_generated
+        # Per-step output: printed lines when verbose, binary columns when a TraceRecorder is attached
+        self.verbose = False
+        self.trace = None
+        self.step_count = 0
 
     def make_decision(self):
         rewards, energy_costs = self.perception_holon.perceive(reward_cost_percentage=self.reward_cost_percentage)
@@ -149,15 +130,12 @@ class SuperHolon:
 
         rewards, energy_costs = zip(*valid_choices)
 
-        dopamine_feedback, pain_feedback = self.memory_holon.get_significant_feedback()
-
         best_choice = None
         highest_dopamine = float('-inf')
         lowest_pain = float('inf')
 
         for i, (reward, cost) in enumerate(zip(rewards, energy_costs)):
-            dopamine_memory = sum(val for rwd, mem, val, tag in dopamine_feedback if rwd == reward)
-            pain_memory = sum(val for rwd, mem, val, tag in pain_feedback if rwd == reward)
+            dopamine_memory, pain_memory = self.memory_holon.feedback_sums(reward)
             if dopamine_memory - pain_memory > highest_dopamine - lowest_pain:
                 best_choice = i
                 highest_dopamine = dopamine_memory
@@ -167,20 +145,39 @@ class SuperHolon:
             return rewards, energy_costs, best_choice
 
         # No significant feedback, choose randomly
-        chosen_index = random.choice(range(len(rewards)))
+        chosen_index = self.perception_holon.rng.choice(range(len(rewards)))
         return rewards, energy_costs, chosen_index
 
+    def record_trace(self, step, reward, event):
+        trace = self.trace
+        if trace is not None and trace.should_record(step, event):
+            trace.record(
+                step=step,
+                energy=self.core_holon.energy,
+                materials=self.core_holon.materials,
+                waste_level=self.waste_holon.activity_level,
+                energy_level=self.energy_holon.activity_level,
+                energy_disposal_level=self.energy_disposal_holon.activity_level,
+                reward=reward,
+            )
+
     def simulate_step(self):
+        step = self.step_count
+        self.step_count += 1
+
         rewards, energy_costs, chosen_index = self.make_decision()
         if chosen_index == -1:
-            print("  No valid reward to choose from.")
+            if self.verbose:
+                print("  No valid reward to choose from.")
+            self.record_trace(step, -1, True)
             return False
 
         reward = rewards[chosen_index]
         energy_cost = energy_costs[chosen_index]
 
-        print(f"  Available rewards: {rewards}")
-        print(f"  Selected reward: {reward} with energy cost: {energy_cost}")
+        if self.verbose:
+            print(f"  Available rewards: {rewards}")
+            print(f"  Selected reward: {reward} with energy cost: {energy_cost}")
 
         self.action_holon.act(self.core_holon, reward, energy_cost)
         
@@ -196,40 +193,53 @@ class SuperHolon:
         feedback_value = reward if was_successful else -reward
         self.memory_holon.remember(reward, feedback_type, feedback_value, self.core_holon)
 
-        print(f"  Energy = {self.core_holon.energy}, Materials = {self.core_holon.materials}")
-        print(f"  Waste Level = {self.waste_holon.activity_level}, Energy Level = {self.energy_holon.activity_level}, Energy Disposal Level = {self.energy_disposal_holon.activity_level}")
-        print(f"  Dopamine = {self.core_holon.dopamine}, Pain = {self.core_holon.pain}")
-        print(f"  Memory: {self.memory_holon.memory}")
-
-        return self.core_holon.energy > 0 and self.core_holon.materials > 0
-
-# Get user inputs
-num_iterations = int(input("Enter the number of iterations: "))
-starting_materials = int(input("Enter the starting materials: "))
-starting_energy = int(input("Enter the starting energy: "))
-energy_maintenance_cost = float(input("Enter the energy maintenance cost: "))
-reward_cost_percentage = float(input("Enter the reward cost percentage (e.g., 0.25 for 25%): "))
-materials_needed = int(input("Enter the materials needed for energy conversion: "))
-energy_generated = int(input("Enter the energy generated per conversion: "))
-
-# Initialize holons
-core_holon = CoreHolon(starting_energy, starting_materials)
-perception_holon = PerceptionHolon()
-action_holon = ActionHolon()
-waste_holon = WasteHolon()
-energy_holon = EnergyHolon(materials_needed, energy_generated)
-energy_disposal_holon = EnergyDisposalHolon()
-memory_holon = MemoryHolon()
-super_holon = SuperHolon(core_holon, perception_holon, action_holon, waste_holon, energy_holon, energy_disposal_holon, memory_holon, energy_maintenance_cost, reward_cost_percentage, materials_needed, energy_generated)
-
-# Simulation
-for step in range(num_iterations):
-    print(f"\nStep {step + 1}:")
-    success = super_holon.simulate_step()
-
-    if not success:
-        print("System failed to maintain homeostasis. Ending simulation.")
-        break
-
-print("\nSimulation complete.")
-
+        if self.verbose:
+            print(f"  Energy = {self.core_holon.energy}, Materials = {self.core_holon.materials}")
+            print(f"  Waste Level = {self.waste_holon.activity_level}, Energy Level = {self.energy_holon.activity_level}, Energy Disposal Level = {self.energy_disposal_holon.activity_level}")
+            print(f"  Dopamine = {self.core_holon.dopamine}, Pain = {self.core_holon.pain}")
+            print(f"  Memory: {self.memory_holon.memory}")
+
+        alive = self.core_holon.energy > 0 and self.core_holon.materials > 0
+        self.record_trace(step, reward, not (was_successful and alive))
+        return alive
+
+def build_super_holon(starting_materials, starting_energy, energy_maintenance_cost, reward_cost_percentage, materials_needed, energy_generated, max_memory_size=6, streams=None):
+    # Per-holon random streams (holon_random.RandomStreams) when given, the random module otherwise
+    rng = streams.stream if streams is not None else lambda holon: random
+
+    # Initialize holons
+    core_holon = CoreHolon(starting_energy, starting_materials)
+    perception_holon = PerceptionHolon(rng('perception'))
+    action_holon = ActionHolon()
+    waste_holon = WasteHolon()
+    energy_holon = EnergyHolon(materials_needed, energy_generated)
+    energy_disposal_holon = EnergyDisposalHolon()
+    memory_holon = MemoryHolon(max_memory_size)
+    return SuperHolon(core_holon, perception_holon, action_holon, waste_holon, energy_holon, energy_disposal_holon, memory_holon, energy_maintenance_cost, reward_cost_percentage, materials_needed, energy_generated)
+
+def main():
+    # Get user inputs
+    num_iterations = int(input("Enter the number of iterations: "))
+    starting_materials = int(input("Enter the starting materials: "))
+    starting_energy = int(input("Enter the starting energy: "))
+    energy_maintenance_cost = float(input("Enter the energy maintenance cost: "))
+    reward_cost_percentage = float(input("Enter the reward cost percentage (e.g., 0.25 for 25%): "))
+    materials_needed = int(input("Enter the materials needed for energy conversion: "))
+    energy_generated = int(input("Enter the energy generated per conversion: "))
+
+    super_holon = build_super_holon(starting_materials, starting_energy, energy_maintenance_cost, reward_cost_percentage, materials_needed, energy_generated)
+    super_holon.verbose = True
+
+    # Simulation
+    for step in range(num_iterations):
+        print(f"\nStep {step + 1}:")
+        success = super_holon.simulate_step()
+
+        if not success:
+            print("System failed to maintain homeostasis. Ending simulation.")
+            break
+
+    print("\nSimulation complete.")
+
+if __name__ == "__main__":
+    main()
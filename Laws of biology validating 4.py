@@ -1,5 +1,7 @@
 import random
 
+from holon_padic import PAdicNumber
+
 # Define parameters
 INITIAL_TEMPERATURE = 37.0
 TEMPERATURE_RANGE = (36, 37.5)
@@ -11,26 +13,20 @@ ENERGY_THRESHOLD = 0.2
 P = 5
 ALPHA = 0.5
 BETA = 0.3
-INITIAL_ENERGY = float(input('Enter initial energy: '))
-NUM_ITERATIONS = int(input('Enter number of iterations: '))
-
-# Initialize states
-internal_temperature = INITIAL_TEMPERATURE
-energy = INITIAL_ENERGY
-num_iterations_out_of_temp_range = 0
 
 # Generate p-adic metadata
-def generate_p_adic_metadata(p, max_terms=100):
-    metadata = 0
-    for n in range(max_terms):
-        coefficient = random.randint(0, p-1)
-        metadata += coefficient * (p ** n)
-    return metadata
+def generate_p_adic_metadata(p, max_terms=100, rng=None):
+    return PAdicNumber.random(p, max_terms, rng=rng)
 
 # Activation function
 def receptor_activation(metadata):
     return metadata
 
+# State update: (state + metadata) mod P^len(str(state)), reading only the metadata digits it needs
+def add_mod_p_power(state, metadata):
+    k = len(str(state))
+    return (state + metadata.residue(k)) % (P ** k)
+
 # Holon classes
 class Holon:
     def __init__(self, initial_state):
@@ -49,19 +45,21 @@ class CoreHolon(Holon):
             cluster.update_state(metadata)
     
     def update_state(self, metadata):
-        self.state = (self.state + receptor_activation(metadata)) % (P ** len(str(self.state)))
+        self.state = add_mod_p_power(self.state, receptor_activation(metadata))
     
-    def regulate_temperature(self, internal_temp, energy):
+    def regulate_temperature(self, internal_temp, energy, verbose=False):
         if internal_temp < TEMPERATURE_RANGE[0]:
             change = TEMPERATURE_RANGE[0] - internal_temp
             internal_temp += change
             energy -= TEMPERATURE_CHANGE_COST * change  # Cost proportional to the temperature change needed
-            print("Internal temperature adjusted: Heating.")
+            if verbose:
+                print("Internal temperature adjusted: Heating.")
         elif internal_temp > TEMPERATURE_RANGE[1]:
             change = internal_temp - TEMPERATURE_RANGE[1]
             internal_temp -= change
             energy -= TEMPERATURE_CHANGE_COST * change  # Cost proportional to the temperature change needed
-            print("Internal temperature adjusted: Cooling.")
+            if verbose:
+                print("Internal temperature adjusted: Cooling.")
         return internal_temp, energy
     
     def adjust_internal_temperature_based_on_external(self, external_temp, internal_temp):
@@ -73,58 +71,98 @@ class CoreHolon(Holon):
 
 class ClusterHolon(Holon):
     def update_state(self, metadata):
-        self.state = (self.state + receptor_activation(metadata)) % (P ** len(str(self.state)))
+        self.state = add_mod_p_power(self.state, receptor_activation(metadata))
 
-# Initialize holons
-core = CoreHolon(0)
-clusters = [ClusterHolon(i) for i in range(1, NUM_FOOD_OPTIONS + 1)]
-core.clusters = clusters
+class Organism:
+    def __init__(self, initial_energy, core, rng=random, metadata_rng=None):
+        self.initial_energy = initial_energy
+        self.core = core
+        self.internal_temperature = INITIAL_TEMPERATURE
+        self.energy = initial_energy
+        self.num_iterations_out_of_temp_range = 0
+        # Environment draws (external temperature, food) and p-adic metadata draws
+        self.rng = rng
+        self.metadata_rng = metadata_rng
+        self.verbose = False
+        self.step_count = 0
 
-# Simulate the process
-for iteration in range(NUM_ITERATIONS):
-    if energy <= 0 or num_iterations_out_of_temp_range > 5:
-        print("Simulation ended due to energy depletion or excessive temperature deviation.")
-        break
+    def is_alive(self):
+        return not (self.energy <= 0 or self.num_iterations_out_of_temp_range > 5)
 
-    external_temperature = random.uniform(*EXTERNAL_TEMPERATURE_RANGE)
-    
-    # Core adjusts internal temperature based on external conditions
-    internal_temperature = core.adjust_internal_temperature_based_on_external(external_temperature, internal_temperature)
-    
-    # Core regulates temperature to keep it within the range
-    internal_temperature, energy = core.regulate_temperature(internal_temperature, energy)
-    
-    metadata = generate_p_adic_metadata(P)
-    core.update_state(metadata)
-    core.regulate_clusters(metadata)
-    
-    food_energy_values = [random.randint(1, 5) for _ in range(NUM_FOOD_OPTIONS)]
-    selected_food_option = random.randint(0, NUM_FOOD_OPTIONS - 1)
-    energy_cost = ENERGY_COST
-    energy -= energy_cost
-    food_energy = food_energy_values[selected_food_option]
-    energy += food_energy
-    
-    if energy < INITIAL_ENERGY * ENERGY_THRESHOLD:
-        feedback = "Punishment"
-    else:
-        feedback = "Reward"
-    
-    if internal_temperature < TEMPERATURE_RANGE[0] or internal_temperature > TEMPERATURE_RANGE[1]:
-        num_iterations_out_of_temp_range += 1
-    else:
-        num_iterations_out_of_temp_range = 0
-    
-    if energy > 2 * INITIAL_ENERGY:
-        energy = 2 * INITIAL_ENERGY
-    
-    print(f"Iteration {iteration + 1}:")
-    print(f"  External Temperature: {external_temperature:.2f}")
-    print(f"  Internal Temperature: {internal_temperature:.2f}")
-    print(f"  Energy Level: {energy:.2f}")
-    print(f"  Food Energy Values: {food_energy_values}")
-    print(f"  Selected Food Option: {selected_food_option + 1}")
-    print(f"  Feedback: {feedback}")
-    print(f"  Core State: {core.state}\n")
-
-print("Simulation complete.")
+    def simulate_step(self):
+        iteration = self.step_count
+        self.step_count += 1
+        core = self.core
+
+        external_temperature = self.rng.uniform(*EXTERNAL_TEMPERATURE_RANGE)
+
+        # Core adjusts internal temperature based on external conditions
+        self.internal_temperature = core.adjust_internal_temperature_based_on_external(external_temperature, self.internal_temperature)
+
+        # Core regulates temperature to keep it within the range
+        self.internal_temperature, self.energy = core.regulate_temperature(self.internal_temperature, self.energy, self.verbose)
+
+        metadata = generate_p_adic_metadata(P, rng=self.metadata_rng)
+        core.update_state(metadata)
+        core.regulate_clusters(metadata)
+
+        food_energy_values = [self.rng.randint(1, 5) for _ in range(NUM_FOOD_OPTIONS)]
+        selected_food_option = self.rng.randint(0, NUM_FOOD_OPTIONS - 1)
+        energy_cost = ENERGY_COST
+        self.energy -= energy_cost
+        food_energy = food_energy_values[selected_food_option]
+        self.energy += food_energy
+
+        if self.energy < self.initial_energy * ENERGY_THRESHOLD:
+            feedback = "Punishment"
+        else:
+            feedback = "Reward"
+
+        if self.internal_temperature < TEMPERATURE_RANGE[0] or self.internal_temperature > TEMPERATURE_RANGE[1]:
+            self.num_iterations_out_of_temp_range += 1
+        else:
+            self.num_iterations_out_of_temp_range = 0
+
+        if self.energy > 2 * self.initial_energy:
+            self.energy = 2 * self.initial_energy
+
+        if self.verbose:
+            print(f"Iteration {iteration + 1}:")
+            print(f"  External Temperature: {external_temperature:.2f}")
+            print(f"  Internal Temperature: {self.internal_temperature:.2f}")
+            print(f"  Energy Level: {self.energy:.2f}")
+            print(f"  Food Energy Values: {food_energy_values}")
+            print(f"  Selected Food Option: {selected_food_option + 1}")
+            print(f"  Feedback: {feedback}")
+            print(f"  Core State: {core.state}\n")
+        return self.is_alive()
+
+def build_organism(initial_energy, streams=None):
+    # Per-component random streams (holon_random.RandomStreams) when given, the random module otherwise
+    rng = streams.stream('environment') if streams is not None else random
+    metadata_rng = streams.stream('metadata') if streams is not None else None
+
+    # Initialize holons
+    core = CoreHolon(0)
+    clusters = [ClusterHolon(i) for i in range(1, NUM_FOOD_OPTIONS + 1)]
+    core.clusters = clusters
+    return Organism(initial_energy, core, rng, metadata_rng)
+
+def main():
+    initial_energy = float(input('Enter initial energy: '))
+    num_iterations = int(input('Enter number of iterations: '))
+
+    organism = build_organism(initial_energy)
+    organism.verbose = True
+
+    # Simulate the process
+    for iteration in range(num_iterations):
+        if not organism.is_alive():
+            print("Simulation ended due to energy depletion or excessive temperature deviation.")
+            break
+        organism.simulate_step()
+
+    print("Simulation complete.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import typing as t
+
+import numpy as np
+
+from holon_models import DEFAULT_PARAMETERS, HOLONETIC_MODELS, VARIANTS, load_model, load_variant
+from holon_profiling import HolonProfiler, HOLONETIC_METHODS, SUPER_HOLON_METHODS
+from holon_random import RandomStreams
+
+BASELINE_VERSION = 1
+# Relative slowdown (or memory growth) beyond which a metric is flagged as a regression
+DEFAULT_TOLERANCE = 0.10
+
+# The fused engine has no holons to break the step down into
+FUSED_METHODS = {
+    None: ('simulate_step',),
+}
+VALIDATING_METHODS = {
+    None: ('simulate_step',),
+    'core': ('adjust_internal_temperature_based_on_external', 'regulate_temperature', 'update_state', 'regulate_clusters'),
+}
+
+
+class Workload:
+    def __init__(
+        self,
+        name: str,
+        build: t.Callable[[t.Dict[str, int], RandomStreams], t.Any],
+        step: t.Callable[[t.Any], bool],
+        methods: t.Dict[t.Optional[str], t.Tuple[str, ...]],
+        defaults: t.Dict[str, int],
+        sweeps: t.Dict[str, t.Sequence[int]],
+        normalize: t.Optional[t.Callable[[t.Dict[str, int]], t.Dict[str, int]]] = None
+    ):
+        """
+        Fixed-seed benchmark workload of one model
+
+        Parameters:
+        - name: Benchmark name
+        - build: (config, streams) -> organism
+        - step: organism -> whether it is still alive; dead organisms are rebuilt untimed
+        - methods: HolonProfiler table giving the per-phase breakdown
+        - defaults: Default configuration, always including 'population'
+        - sweeps: Configuration key -> values measured for the scaling curves
+        - normalize: Maps a swept configuration to the one that actually runs,
+          so results are labelled with what was measured
+        """
+        self.name = name
+        self.build = build
+        self.step = step
+        self.methods = methods
+        self.defaults = defaults
+        self.sweeps = sweeps
+        self.normalize = normalize
+
+    def configurations(self) -> t.List[t.Dict[str, int]]:
+        # The defaults, then one parameter varied at a time
+        normalize = self.normalize or dict
+        configurations = [normalize(self.defaults)]
+        for key, values in self.sweeps.items():
+            for value in values:
+                config = normalize({**self.defaults, key: value})
+                if config not in configurations:
+                    configurations.append(config)
+        return configurations
+
+
+def _super_holon_workload(variant: str) -> Workload:
+    parameters = {key: value for key, value in DEFAULT_PARAMETERS.items() if key != 'num_iterations'}
+
+    def build(config, streams):
+        return load_variant(variant).build_super_holon(**parameters, max_memory_size=config['max_memory_size'], streams=streams)
+
+    return Workload(
+        variant, build, lambda super_holon: super_holon.simulate_step(), SUPER_HOLON_METHODS,
+        defaults={'population': 10, 'max_memory_size': 6},
+        sweeps={'population': (1, 10, 100), 'max_memory_size': (6, 24, 96)}
+    )
+
+
+def _fused_workload(variant: str) -> Workload:
+    from holon_engine import build_engine
+    parameters = {key: value for key, value in DEFAULT_PARAMETERS.items() if key != 'num_iterations'}
+
+    def build(config, streams):
+        return build_engine(variant, **parameters, max_memory_size=config['max_memory_size'], streams=streams)
+
+    return Workload(
+        'fused_' + variant, build, lambda engine: engine.simulate_step(), FUSED_METHODS,
+        defaults={'population': 10, 'max_memory_size': 6},
+        sweeps={'population': (1, 10, 100), 'max_memory_size': (6, 24, 96)}
+    )
+
+
+def _validating_workload() -> Workload:
+    def build(config, streams):
+        return load_model('validating').build_organism(20.0, streams=streams)
+
+    return Workload(
+        'validating', build, lambda organism: organism.simulate_step(), VALIDATING_METHODS,
+        defaults={'population': 10},
+        sweeps={'population': (1, 10, 100)}
+    )
+
+
+def _holonetic_workload(name: str) -> Workload:
+    def build(config, streams):
+        n_dimensions = config['n_dimensions']
+        n_clusters = config['n_clusters']
+        model = load_model(name).BioHoloneticModel(n_dimensions, n_clusters, streams=streams)
+        if (n_dimensions, n_clusters) != (3, 3):
+            # Goals and clusters of the script are 3 x 3; larger models get seeded random ones
+            setup = np.random.default_rng(streams.key('setup'))
+            model.goals = setup.normal(size=(3, n_dimensions))
+            model.goal = model.goals[0]
+            model.state = np.zeros(n_dimensions)
+            model.prev_state = np.zeros(n_dimensions)
+            model.delta = np.zeros(n_dimensions)
+            model.set_clusters(setup.uniform(0.1, 1.0, size=(n_clusters, n_dimensions)))
+        model.force_stream = streams.stream('force')
+        return model
+
+    def step(model):
+        # uniform(-0.5, 0.5) force per dimension, as in main()
+        return model.update(model.force_stream.uniforms(model.n_dimensions) - 0.5)
+
+    def normalize(config):
+        # The cluster kernel needs at least as many clusters as dimensions
+        return {**config, 'n_clusters': max(config['n_clusters'], config['n_dimensions'])}
+
+    return Workload(
+        name, build, step, HOLONETIC_METHODS,
+        defaults={'population': 10, 'n_dimensions': 3, 'n_clusters': 3},
+        sweeps={'population': (1, 10, 100), 'n_dimensions': (3, 8, 32), 'n_clusters': (3, 8, 32)},
+        normalize=normalize
+    )
+
+
+def workloads() -> t.Dict[str, Workload]:
+    suite = {variant: _super_holon_workload(variant) for variant in VARIANTS}
+    suite.update({'fused_' + variant: _fused_workload(variant) for variant in VARIANTS})
+    suite['validating'] = _validating_workload()
+    suite.update({name: _holonetic_workload(name) for name in HOLONETIC_MODELS})
+    return suite
+
+
+def _run(workload: Workload, config: t.Dict[str, int], seed: int, n_steps: int, profiler: t.Optional[HolonProfiler] = None) -> t.Tuple[int, int]:
+    # Step every organism n_steps times, timing only the steps; returns (steps, nanoseconds)
+    streams = RandomStreams(seed).child(workload.name)
+    organisms = [workload.build(config, streams.child('organism', i)) for i in range(config['population'])]
+    profiled = []
+    if profiler is not None:
+        profiled = [HolonProfiler(profiler.methods, trace_memory=False) for _ in organisms]
+        for organism_profiler, organism in zip(profiled, organisms):
+            organism_profiler.stats = profiler.stats
+            organism_profiler.attach(organism)
+
+    clock = time.perf_counter_ns
+    step = workload.step
+    elapsed = 0
+    for round_index in range(n_steps):
+        for i, organism in enumerate(organisms):
+            start = clock()
+            alive = step(organism)
+            elapsed += clock() - start
+            if not alive:
+                if profiled:
+                    profiled[i].detach()
+                organisms[i] = workload.build(config, streams.child('organism', i, 'restart', round_index))
+                if profiled:
+                    profiled[i].attach(organisms[i])
+    for organism_profiler in profiled:
+        organism_profiler.detach()
+    return len(organisms) * n_steps, elapsed
+
+
+def _peak_memory(workload: Workload, config: t.Dict[str, int], seed: int, n_steps: int) -> int:
+    # Peak traced bytes while building and running the population
+    tracemalloc.start()
+    try:
+        _run(workload, config, seed, n_steps)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _config_key(config: t.Dict[str, int]) -> str:
+    return ",".join(f"{key}={value}" for key, value in sorted(config.items()))
+
+
+def benchmark_workload(workload: Workload, config: t.Dict[str, int], seed: int = 0, n_steps: int = 200, repeats: int = 3) -> t.Dict[str, t.Any]:
+    """
+    Metrics of one workload configuration
+
+    Timing is the best of repeats runs; the phase breakdown comes from a
+    separate profiled run, so its wrapper overhead does not affect steps_per_second.
+    """
+    best = None
+    for _ in range(repeats):
+        steps, elapsed = _run(workload, config, seed, n_steps)
+        best = elapsed if best is None else min(best, elapsed)
+
+    profiler = HolonProfiler(workload.methods, trace_memory=False)
+    profiled_steps, _ = _run(workload, config, seed, n_steps, profiler)
+    phases = {name: stats[1] / profiled_steps for name, stats in profiler.stats.items() if stats[0]}
+
+    peak = _peak_memory(workload, config, seed, max(1, n_steps // 10))
+    return {
+        'config': config,
+        'steps': steps,
+        'steps_per_second': steps / (best / 1e9) if best else float('inf'),
+        'ns_per_step': best / steps,
+        'phase_ns_per_step': phases,
+        'peak_memory_per_organism': peak / config['population'],
+    }
+
+
+def run_suite(names: t.Optional[t.Sequence[str]] = None, seed: int = 0, n_steps: int = 200, repeats: int = 3) -> t.Dict[str, t.Any]:
+    """
+    Run every configuration of the selected workloads and return a baseline document
+    """
+    suite = workloads()
+    results = {}
+    for name in names or list(suite):
+        workload = suite[name]
+        results[name] = {
+            _config_key(config): benchmark_workload(workload, config, seed, n_steps, repeats)
+            for config in workload.configurations()
+        }
+    return {
+        'version': BASELINE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'seed': seed,
+        'n_steps': n_steps,
+        'results': results,
+    }
+
+
+def compare(current: t.Dict[str, t.Any], baseline: t.Dict[str, t.Any], tolerance: float = DEFAULT_TOLERANCE) -> t.List[t.Dict[str, t.Any]]:
+    """
+    Metrics that got worse than the baseline by more than tolerance
+    """
+    regressions = []
+    for name, configs in current['results'].items():
+        for key, metrics in configs.items():
+            previous = baseline.get('results', {}).get(name, {}).get(key)
+            if previous is None:
+                continue
+            for metric in ('ns_per_step', 'peak_memory_per_organism'):
+                old, new = previous[metric], metrics[metric]
+                if old > 0 and new > old * (1 + tolerance):
+                    regressions.append({
+                        'workload': name, 'config': key, 'metric': metric,
+                        'baseline': old, 'current': new, 'change': new / old - 1,
+                    })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the holon models against a stored baseline")
+    parser.add_argument('workloads', nargs='*', help="Workloads to run (default: all)")
+    parser.add_argument('--baseline', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'baseline.json'))
+    parser.add_argument('--output', help="Where to write the results (default: the baseline path when --update)")
+    parser.add_argument('--update', action='store_true', help="Replace the baseline with these results")
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    current = run_suite(args.workloads or None, args.seed, args.steps, args.repeats)
+    for name, configs in current['results'].items():
+        for key, metrics in configs.items():
+            print(f"{name:18s} {key:45s} {metrics['steps_per_second']:12.0f} steps/s  "
+                  f"{metrics['peak_memory_per_organism'] / 1024:8.1f} KiB/organism")
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as handle:
+            regressions = compare(current, json.load(handle), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['workload']} {regression['config']} {regression['metric']}: "
+                  f"{regression['baseline']:.0f} -> {regression['current']:.0f} ({regression['change']:+.0%})")
+
+    output = args.output or (args.baseline if args.update or not os.path.exists(args.baseline) else None)
+    if output is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as handle:
+            json.dump(current, handle, indent=2)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
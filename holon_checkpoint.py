@@ -0,0 +1,270 @@
+import os
+import random
+import typing as t
+
+import numpy as np
+
+from holon_random import CounterStream, RandomStreams, row_keys, uniform_block
+
+SNAPSHOT_MAGIC = b'HSNP\x01'
+
+# Scalar state of a SuperHolon graph: record field -> (holon attribute of the SuperHolon, attribute);
+# None stands for the SuperHolon itself. Fields of holons a variant lacks are left out.
+STATE_FIELDS = {
+    'step_count': (None, 'step_count'),
+    'energy': ('core_holon', 'energy'),
+    'materials': ('core_holon', 'materials'),
+    'dopamine': ('core_holon', 'dopamine'),
+    'pain': ('core_holon', 'pain'),
+    'internal_temperature': ('core_holon', 'internal_temperature'),
+    'external_temperature': ('perception_temperature_Holon', 'temperature1'),
+    'waste_level': ('waste_holon', 'activity_level'),
+    'energy_level': ('energy_holon', 'activity_level'),
+    'energy_disposal_level': ('energy_disposal_holon', 'activity_level'),
+    'temperature_level': ('temperature_Holon', 'activity_level'),
+    'steps_out_of_homeostasis': (None, 'steps_out_of_homeostasis'),
+    'homeostasis_threshold': (None, 'homeostasis_threshold'),
+    'energy_maintenance_cost': (None, 'energy_maintenance_cost'),
+    'reward_cost_percentage': (None, 'reward_cost_percentage'),
+    'materials_needed': (None, 'materials_needed'),
+    'energy_generated': (None, 'energy_generated'),
+    'max_memory_size': ('memory_holon', 'max_memory_size'),
+}
+
+# Holons drawing random numbers: stream ID -> holon attribute of the SuperHolon
+RANDOM_HOLONS = {
+    'perception': 'perception_holon',
+    'perception_temperature': 'perception_temperature_Holon',
+}
+
+RECORD_DTYPE = np.dtype(
+    [(name, '<f8') for name in STATE_FIELDS]
+    + [
+        ('present', '<u4'),     # bit i: STATE_FIELDS[i] exists in this variant
+        ('integral', '<u4'),    # bit i: STATE_FIELDS[i] was a Python int
+        ('n_memory', '<u4'),
+        ('memory_sequence', '<i8'),
+        ('stream_keys', '<u4', (len(RANDOM_HOLONS), 2)),
+        ('stream_positions', '<i8', (len(RANDOM_HOLONS),)),
+        ('counter_streams', '<u4'),  # bit j: RANDOM_HOLONS[j] draws from a CounterStream
+        ('global_random', '<u4'),    # 1 if some holon draws from the random module
+    ]
+)
+MEMORY_DTYPE = np.dtype([
+    ('reward', '<i8'),
+    ('value', '<f8'),
+    ('sequence', '<i8'),
+    ('dopamine', 'u1'),
+    ('healthy', 'u1'),
+    ('integral_value', 'u1'),
+])
+# random.getstate() of the Mersenne Twister: 624 words and the position
+_MT_STATE_WORDS = 625
+
+
+def _number(value: float, integral: bool):
+    return int(value) if integral else float(value)
+
+
+# Draws computed up front for every fork stream, enough for graph construction,
+# when there are enough forks for one vectorized call to beat per-stream refills
+_FORK_PRELOAD = 8
+_FORK_PRELOAD_MIN = 16
+
+
+class _SnapshotStreams:
+    # Stand-in for RandomStreams handing build_super_holon the streams of a snapshot
+    def __init__(self, keys: t.Dict[str, np.ndarray], preload: t.Optional[t.Dict[str, list]] = None):
+        self.keys = keys
+        self.preload = preload or {}
+
+    def stream(self, stream_id: str) -> CounterStream:
+        stream = CounterStream(self.keys[stream_id])
+        if stream_id in self.preload:
+            stream.preload(self.preload[stream_id])
+        return stream
+
+
+class SuperHolonSnapshot:
+    def __init__(self, record: np.ndarray, memory: np.ndarray, random_state: t.Optional[np.ndarray] = None):
+        """
+        Complete state of a SuperHolon graph in flat arrays
+
+        Parameters:
+        - record: One RECORD_DTYPE row with the scalar state, parameters and stream positions
+        - memory: MEMORY_DTYPE rows of the MemoryHolon heap, in heap order
+        - random_state: Mersenne Twister state of the random module, when some holon uses it
+        """
+        self.record = record
+        self.memory = memory
+        self.random_state = random_state
+
+    @classmethod
+    def capture(cls, super_holon) -> 'SuperHolonSnapshot':
+        """
+        Snapshot of any SuperHolon variant; holons it lacks are recorded as absent
+
+        Random holons must draw from a CounterStream or the random module,
+        whose states the snapshot restores; any other rng raises ValueError.
+        """
+        record = np.zeros((), dtype=RECORD_DTYPE)
+        present = integral = 0
+        for bit, (name, (holon, attribute)) in enumerate(STATE_FIELDS.items()):
+            owner = super_holon if holon is None else getattr(super_holon, holon, None)
+            if owner is None or not hasattr(owner, attribute):
+                continue
+            value = getattr(owner, attribute)
+            record[name] = value
+            present |= 1 << bit
+            if isinstance(value, int):
+                integral |= 1 << bit
+        record['present'] = present
+        record['integral'] = integral
+
+        counter_streams = 0
+        random_state = None
+        for bit, holon in enumerate(RANDOM_HOLONS.values()):
+            rng = getattr(getattr(super_holon, holon, None), 'rng', None)
+            if isinstance(rng, CounterStream):
+                record['stream_keys'][bit] = rng.key[0]
+                record['stream_positions'][bit] = rng.position
+                counter_streams |= 1 << bit
+            elif rng is random:
+                record['global_random'] = 1
+            elif rng is not None:
+                # A random.Random or NumPy generator has state the record cannot hold
+                raise ValueError(f"Cannot capture the {type(rng).__name__} rng of {holon}, only CounterStream or the random module")
+        record['counter_streams'] = counter_streams
+        if record['global_random']:
+            _, internal_state, _ = random.getstate()
+            random_state = np.array(internal_state, dtype='<u4')
+
+        heap, sequence = super_holon.memory_holon.snapshot()
+        memory = np.zeros(len(heap), dtype=MEMORY_DTYPE)
+        for row, (_, negative_sequence, (reward, feedback_type, feedback_value, outcome_tag)) in enumerate(heap):
+            memory[row] = (reward, feedback_value, -negative_sequence, feedback_type == 'dopamine',
+                           outcome_tag == 'h', isinstance(feedback_value, int))
+        record['n_memory'] = len(heap)
+        record['memory_sequence'] = sequence
+        return cls(record, memory, random_state)
+
+    def to_bytes(self) -> bytes:
+        parts = [SNAPSHOT_MAGIC, self.record.tobytes(), self.memory.tobytes()]
+        if self.random_state is not None:
+            parts.append(self.random_state.tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'SuperHolonSnapshot':
+        if not data.startswith(SNAPSHOT_MAGIC):
+            raise ValueError("Not a SuperHolon snapshot")
+        offset = len(SNAPSHOT_MAGIC)
+        record = np.frombuffer(data, dtype=RECORD_DTYPE, count=1, offset=offset)[0]
+        offset += RECORD_DTYPE.itemsize
+        memory = np.frombuffer(data, dtype=MEMORY_DTYPE, count=int(record['n_memory']), offset=offset)
+        offset += memory.nbytes
+        random_state = None
+        if record['global_random']:
+            random_state = np.frombuffer(data, dtype='<u4', count=_MT_STATE_WORDS, offset=offset)
+        return cls(np.array(record), memory, random_state)
+
+    def save(self, path: str):
+        """
+        Write the snapshot atomically, so a crash mid-write keeps the previous checkpoint
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as handle:
+            handle.write(self.to_bytes())
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'SuperHolonSnapshot':
+        with open(path, 'rb') as handle:
+            return cls.from_bytes(handle.read())
+
+    def values(self) -> t.Dict[str, t.Union[int, float]]:
+        """
+        Recorded state fields of the variant, with their original int or float type
+        """
+        record = self.record.item()
+        present, integral = int(self.record['present']), int(self.record['integral'])
+        return {
+            name: _number(record[bit], integral >> bit & 1)
+            for bit, name in enumerate(STATE_FIELDS) if present >> bit & 1
+        }
+
+    def _memory_heap(self) -> list:
+        heap = []
+        for reward, value, sequence, dopamine, healthy, integral_value in self.memory.tolist():
+            value = _number(value, integral_value)
+            entry = (reward, 'dopamine' if dopamine else 'pain', value, 'h' if healthy else '-h')
+            heap.append((abs(value), -sequence, entry))
+        return heap
+
+    def _build(self, module, streams, values: t.Dict[str, t.Union[int, float]], heap: list):
+        super_holon = module.build_super_holon(
+            starting_materials=values['materials'],
+            starting_energy=values['energy'],
+            energy_maintenance_cost=values['energy_maintenance_cost'],
+            reward_cost_percentage=values['reward_cost_percentage'],
+            materials_needed=values['materials_needed'],
+            energy_generated=values['energy_generated'],
+            max_memory_size=values['max_memory_size'],
+            streams=streams
+        )
+        for name, value in values.items():
+            holon, attribute = STATE_FIELDS[name]
+            setattr(super_holon if holon is None else getattr(super_holon, holon), attribute, value)
+        super_holon.memory_holon.restore(heap, int(self.record['memory_sequence']))
+        return super_holon
+
+    def restore(self, module):
+        """
+        Rebuild the SuperHolon of a variant module exactly as captured
+
+        Counter streams resume at their recorded positions; the random module
+        is put back in its recorded state, so the run continues as if never stopped.
+        """
+        keys = {stream_id: self.record['stream_keys'][bit] for bit, stream_id in enumerate(RANDOM_HOLONS)}
+        counter_streams = int(self.record['counter_streams'])
+        super_holon = self._build(module, _SnapshotStreams(keys) if counter_streams else None, self.values(), self._memory_heap())
+        for bit, (stream_id, holon) in enumerate(RANDOM_HOLONS.items()):
+            if counter_streams >> bit & 1:
+                getattr(super_holon, holon).rng.seek(int(self.record['stream_positions'][bit]))
+        if self.random_state is not None:
+            random.setstate((3, tuple(int(word) for word in self.random_state), None))
+        return super_holon
+
+    def fork(self, module, n_forks: int, streams: t.Optional[RandomStreams] = None) -> list:
+        """
+        Clone the snapshot into n_forks independent continuations
+
+        Continuation k draws from streams.child('fork', k) when given, otherwise
+        from sub-streams of the recorded counter streams, or from the shared
+        random module. Memory entries are shared immutable tuples, so a fork
+        costs one small graph construction and no deep copy.
+        """
+        values = self.values()
+        heap = self._memory_heap()
+        counter_streams = int(self.record['counter_streams'])
+        fork_keys = {
+            stream_id: row_keys(self.record['stream_keys'][bit], n_forks)
+            for bit, stream_id in enumerate(RANDOM_HOLONS) if counter_streams >> bit & 1
+        }
+        # First draws of all fork streams in one call per stream
+        preload = {}
+        if n_forks >= _FORK_PRELOAD_MIN:
+            preload = {stream_id: uniform_block(keys, 0, _FORK_PRELOAD).tolist() for stream_id, keys in fork_keys.items()}
+        forks = []
+        for k in range(n_forks):
+            if streams is not None:
+                fork_streams = streams.child('fork', k)
+            elif fork_keys:
+                fork_streams = _SnapshotStreams(
+                    {stream_id: keys[k] for stream_id, keys in fork_keys.items()},
+                    {stream_id: draws[k] for stream_id, draws in preload.items()}
+                )
+            else:
+                fork_streams = None
+            forks.append(self._build(module, fork_streams, values, heap))
+        return forks
@@ -0,0 +1,278 @@
+import math
+import typing as t
+
+import numpy as np
+
+from holon_thermoregulation import (
+    ENERGY_COST, EXTERNAL_TEMPERATURE_RANGE, INITIAL_TEMPERATURE, TEMPERATURE_CHANGE_COST, regulate_temperature
+)
+
+# Food values of the script: randint(1, 5), uniform whichever option is chosen
+FOOD_VALUES = np.arange(1, 6)
+# Grid points per ENERGY_COST; food and the step cost are whole multiples of the grid step,
+# temperature-regulation costs are spread over the two grid points around them
+DEFAULT_SUBDIVISIONS = 8
+# Temperature chains run side by side when sampling regulation costs
+N_COST_CHAINS = 1000
+# Steps each chain runs before its costs are kept, forgetting INITIAL_TEMPERATURE
+COST_BURN_IN = 1000
+# Survival below the round-off of the FFT convolutions, counted as nobody left alive
+NEGLIGIBLE_SURVIVAL = 1e-12
+
+
+def regulation_costs(
+    external_temperature_range: t.Tuple[float, float] = EXTERNAL_TEMPERATURE_RANGE,
+    n_samples: int = 1_000_000,
+    rng: t.Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """
+    Energy spent on temperature regulation per step, sampled from the temperature process
+
+    The internal temperature evolves without looking at energy, so its costs
+    can be drawn on their own: N_COST_CHAINS chains start at
+    INITIAL_TEMPERATURE and keep their costs after COST_BURN_IN steps.
+
+    Returns:
+    - (n_samples,) costs, TEMPERATURE_CHANGE_COST per degree heated or cooled
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    low, high = external_temperature_range
+    n_steps = -(-n_samples // N_COST_CHAINS)
+    temperature = np.full(N_COST_CHAINS, INITIAL_TEMPERATURE)
+    costs = np.empty((n_steps, N_COST_CHAINS))
+    for step in range(COST_BURN_IN + n_steps):
+        external_temperature = low + (high - low) * rng.random(N_COST_CHAINS)
+        temperature, change = regulate_temperature(temperature, external_temperature)
+        if step >= COST_BURN_IN:
+            costs[step - COST_BURN_IN] = TEMPERATURE_CHANGE_COST * change
+    return costs.ravel()[:n_samples]
+
+
+def initial_regulation_costs(
+    external_temperature_range: t.Tuple[float, float] = EXTERNAL_TEMPERATURE_RANGE,
+    n_samples: int = 1_000_000,
+    rng: t.Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """
+    Energy spent on temperature regulation in the first step, from INITIAL_TEMPERATURE
+
+    The script starts at INITIAL_TEMPERATURE rather than at a regulated
+    temperature, so its first step pays a different cost: in a cold climate
+    one degree less heating than every later step.
+
+    Returns:
+    - (n_samples,) costs, TEMPERATURE_CHANGE_COST per degree heated or cooled
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    low, high = external_temperature_range
+    external_temperature = low + (high - low) * rng.random(n_samples)
+    _, change = regulate_temperature(np.full(n_samples, INITIAL_TEMPERATURE), external_temperature)
+    return TEMPERATURE_CHANGE_COST * change
+
+
+class EnergyDistribution:
+    def __init__(
+        self,
+        initial_energy: float,
+        external_temperature_range: t.Tuple[float, float] = EXTERNAL_TEMPERATURE_RANGE,
+        costs: t.Optional[np.ndarray] = None,
+        cost_weights: t.Optional[np.ndarray] = None,
+        initial_costs: t.Optional[np.ndarray] = None,
+        initial_cost_weights: t.Optional[np.ndarray] = None,
+        subdivisions: int = DEFAULT_SUBDIVISIONS,
+        rng: t.Optional[np.random.Generator] = None
+    ):
+        """
+        Distribution of the energy of a "Laws of biology validating 4" organism
+
+        Each step the organism pays ENERGY_COST and its regulation cost, eats
+        one of FOOD_VALUES with equal probability and is capped at twice its
+        initial energy; at energy <= 0 it dies. On a grid of step
+        ENERGY_COST / subdivisions anchored at the cap this is a capped random
+        walk: the distribution over the live grid points is convolved with the
+        one-step kernel by FFT, the mass at or below zero is absorbed and the
+        mass above the cap is folded onto it.
+
+        The regulation cost enters as a mixture kernel: the walk's increment is
+        food - ENERGY_COST - cost with cost drawn from its stationary
+        distribution, sampled by regulation_costs unless costs are given. The
+        first step starts from INITIAL_TEMPERATURE instead and has its own
+        kernel, from initial_regulation_costs. Costs off the grid are split
+        between the grid points around them, keeping their mean. Treating
+        successive costs as independent ignores the memory of the temperature
+        process; in climates entirely below or above TEMPERATURE_RANGE every
+        step after the first ends at the same bound, so there is none, and in
+        the script's climate a step costs at most 0.06 and food brings at
+        least 1, so the organism never depletes.
+
+        Parameters:
+        - initial_energy: INITIAL_ENERGY; off the grid it is split between its two neighbours
+        - external_temperature_range: (low, high) climate the costs are sampled in
+        - costs: Regulation costs per step making up the mixture, instead of sampling them
+        - cost_weights: Probabilities of costs, equal by default
+        - initial_costs: Regulation costs of the first step, instead of sampling them
+        - initial_cost_weights: Probabilities of initial_costs, equal by default
+        - subdivisions: Grid points per ENERGY_COST
+        - rng: NumPy generator for regulation_costs
+        """
+        if initial_energy <= 0:
+            raise ValueError("The organism needs positive initial energy")
+        if costs is None:
+            costs = regulation_costs(external_temperature_range, rng=rng)
+        if initial_costs is None:
+            initial_costs = initial_regulation_costs(external_temperature_range, rng=rng)
+        costs = np.asarray(costs, dtype=float)
+        cost_weights = np.full(costs.size, 1 / costs.size) if cost_weights is None else np.asarray(cost_weights, dtype=float)
+        initial_costs = np.asarray(initial_costs, dtype=float)
+        if initial_cost_weights is None:
+            initial_cost_weights = np.full(initial_costs.size, 1 / initial_costs.size)
+        initial_cost_weights = np.asarray(initial_cost_weights, dtype=float)
+
+        self.initial_energy = initial_energy
+        self.cap = 2 * initial_energy
+        self.resolution = ENERGY_COST / subdivisions
+        self.mean_cost = float(cost_weights @ costs)
+        self.mean_initial_cost = float(initial_cost_weights @ initial_costs)
+        # Live grid points, ascending: energy cap - (n_states - 1 - i) * resolution > 0 at index i
+        self.n_states = math.ceil(round(self.cap / self.resolution, 9))
+        self.energy = self.cap - np.arange(self.n_states - 1, -1, -1) * self.resolution
+
+        self.kernel, self.min_shift = self._mixture_kernel(costs, cost_weights)
+        self.initial_kernel, self.initial_min_shift = self._mixture_kernel(initial_costs, initial_cost_weights)
+
+        self._n_fft = 1 << (self.n_states + max(len(self.kernel), len(self.initial_kernel)) - 2).bit_length()
+        self._kernel_fft = np.fft.rfft(self.kernel, self._n_fft)
+        self._initial_kernel_fft = np.fft.rfft(self.initial_kernel, self._n_fft)
+
+        self.initial_distribution = np.zeros(self.n_states)
+        position = (self.cap - initial_energy) / self.resolution
+        below = math.floor(round(position, 9))
+        fraction = position - below
+        self.initial_distribution[self.n_states - 1 - below] += 1 - fraction if fraction > 1e-9 else 1.0
+        if fraction > 1e-9 and below + 2 <= self.n_states:
+            self.initial_distribution[self.n_states - 2 - below] += fraction
+
+    def _mixture_kernel(self, costs: np.ndarray, cost_weights: np.ndarray) -> t.Tuple[np.ndarray, int]:
+        # Mixture kernel over grid shifts min_shift, min_shift + 1, ...: food and ENERGY_COST are whole
+        # grid steps, each cost is split linearly between the two grid points around it
+        cost_shift = costs / self.resolution
+        floor_shift = np.floor(cost_shift)
+        upper = cost_shift - floor_shift
+        cost_kernel = np.bincount(
+            np.concatenate([floor_shift, floor_shift + 1]).astype(np.int64) - int(floor_shift.min()),
+            weights=np.concatenate([cost_weights * (1 - upper), cost_weights * upper])
+        )
+        # Costs are subtracted, so the cost kernel runs backwards from -floor_shift.min()
+        cost_kernel = cost_kernel[::-1]
+        max_cost_shift = int(floor_shift.min()) + len(cost_kernel) - 1
+        food_shift = np.rint((FOOD_VALUES - ENERGY_COST) / self.resolution).astype(np.int64)
+        food_kernel = np.bincount(food_shift - food_shift.min()) / len(FOOD_VALUES)
+        kernel = np.convolve(food_kernel, cost_kernel)
+        return kernel / kernel.sum(), int(food_shift.min()) - max_cost_shift
+
+    def _convolve(self, distribution: np.ndarray, kernel_fft: np.ndarray, kernel_size: int, min_shift: int) -> np.ndarray:
+        n_states = self.n_states
+        full = np.fft.irfft(np.fft.rfft(distribution, self._n_fft) * kernel_fft, self._n_fft)
+        # Round-off of the transforms leaves values of order 1e-17 where there is no mass
+        full = np.maximum(full[..., :n_states + kernel_size - 1], 0.0)
+
+        # full[..., n] lands on grid index n + min_shift: below 0 it dies, from the cap on it is capped
+        n_full = full.shape[-1]
+        first = min(max(-min_shift, 0), n_full)
+        last = min(max(n_states - 1 - min_shift, first), n_full)
+        stepped = np.zeros(distribution.shape)
+        stepped[..., first + min_shift:last + min_shift] = full[..., first:last]
+        stepped[..., n_states - 1] += full[..., last:].sum(axis=-1)
+        return stepped
+
+    def step(self, distribution: np.ndarray) -> np.ndarray:
+        """
+        Distribution one step later; the mass missing from it died
+
+        Parameters:
+        - distribution: (..., n_states) probabilities over the live grid points
+
+        Returns:
+        - (..., n_states) probabilities, absorbed at zero and capped
+        """
+        return self._convolve(distribution, self._kernel_fft, len(self.kernel), self.min_shift)
+
+    def first_step(self, distribution: t.Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Distribution after the first step, paying regulation costs from INITIAL_TEMPERATURE
+
+        Parameters:
+        - distribution: (..., n_states) probabilities at step 0, initial_distribution by default
+        """
+        distribution = self.initial_distribution if distribution is None else np.asarray(distribution, dtype=float)
+        return self._convolve(distribution, self._initial_kernel_fft, len(self.initial_kernel), self.initial_min_shift)
+
+    def evolve(self, n_steps: int, distribution: t.Optional[np.ndarray] = None) -> t.Tuple[np.ndarray, np.ndarray]:
+        """
+        Propagate a distribution n_steps steps, one FFT convolution per step
+
+        The distribution is taken at step 0, so its first step is first_step.
+
+        Returns:
+        - The distribution after n_steps and the survival probability after 0..n_steps steps
+        """
+        distribution = self.initial_distribution if distribution is None else np.asarray(distribution, dtype=float)
+        survival = np.empty(n_steps + 1)
+        survival[0] = distribution.sum()
+        for step in range(1, n_steps + 1):
+            distribution = self.first_step(distribution) if step == 1 else self.step(distribution)
+            survival[step] = distribution.sum()
+        return distribution, survival
+
+    def survival_curve(self, horizon: int) -> np.ndarray:
+        """
+        Probability of still being alive after 0..horizon steps
+
+        One FFT convolution per step, so O(horizon * n_states log n_states)
+        time and O(n_states) memory; initial_energy 100 at the default
+        subdivisions is 6400 grid points. The walk stops early when no step
+        can lower the energy (min_shift >= 0, as in the script's climate):
+        nobody dies after the first step, so the survival stays where it is.
+        It also stops once the survival falls below NEGLIGIBLE_SURVIVAL, the
+        level of the transforms' round-off, and reports zero from there on.
+        """
+        survival = np.zeros(horizon + 1)
+        distribution = self.initial_distribution
+        survival[0] = distribution.sum()
+        for step in range(1, horizon + 1):
+            distribution = self.first_step(distribution) if step == 1 else self.step(distribution)
+            survival[step] = distribution.sum()
+            if survival[step] < NEGLIGIBLE_SURVIVAL:
+                survival[step] = 0.0
+                break
+            if self.min_shift >= 0:
+                survival[step + 1:] = survival[step]
+                break
+        return np.clip(survival, 0.0, 1.0)
+
+    def depletion_probability(self, horizon: int) -> float:
+        """
+        Probability of dying of depletion within horizon steps
+        """
+        return float(1 - self.survival_curve(horizon)[-1])
+
+    def report(self, horizon: int) -> t.Dict[str, t.Any]:
+        """
+        Depletion summary and where the discretization is exact
+        """
+        survival = self.survival_curve(horizon)
+        return {
+            'n_states': self.n_states,
+            'grid_step': self.resolution,
+            'mean_regulation_cost': self.mean_cost,
+            'mean_first_regulation_cost': self.mean_initial_cost,
+            'depletion_probability': float(1 - survival[-1]),
+            'expected_steps_alive': float(survival[1:].sum()),
+            'exactness': {
+                'food_and_step_cost': "exact: whole multiples of the grid step",
+                'regulation_cost': "approximate: the first step's costs from INITIAL_TEMPERATURE, later ones "
+                                   "independent from the stationary mixture, split onto the grid",
+                'temperature_range': "exact: regulation always brings the temperature back into range, "
+                                     "so organisms only stop by depletion",
+            },
+        }
@@ -0,0 +1,447 @@
+import heapq
+import math
+import random
+import typing as t
+
+from holon_gating import ModulationKernel, SigmoidModulationKernel, ThresholdModulationKernel
+from holon_memory import MemoryHolon
+
+# Homeostasis criteria: none (alive while energy and materials last), all three bands
+# (holon homeostasis 6) or the temperature band only (holon semi homeostasis 1)
+STRICT = 'strict'
+TEMPERATURE_ONLY = 'temperature'
+HOMEOSTASIS_CRITERIA = (None, STRICT, TEMPERATURE_ONLY)
+
+# Modulation rules by name; the sigmoid one is the kernel CoreHolon.modulation_kernel of the scripts
+MODULATION_KERNELS = {
+    'threshold': ThresholdModulationKernel(),
+    'sigmoid': SigmoidModulationKernel(k=2),
+}
+
+# (modulation rule, temperature subsystem, homeostasis criterion) of each SuperHolon variant
+VARIANT_KERNELS = {
+    'memory_energy': ('threshold', False, None),
+    'sigmoid': ('sigmoid', False, None),
+    'homeostasis': ('sigmoid', True, STRICT),
+    'semi_homeostasis': ('sigmoid', True, TEMPERATURE_ONLY),
+}
+
+# Script constants: homeostasis bands, disposal and conversion rules, temperature holons
+ENERGY_BAND = (30, 70)
+MATERIALS_BAND = (30, 70)
+TEMPERATURE_BAND = (21, 27)
+DISPOSAL_UNIT = 5
+INITIAL_INTERNAL_TEMPERATURE = 25
+# PerceptionTemperatureHolon: randrange(18, 35) to start, randrange(-2, 2) per step, clipped to [18, 35]
+INITIAL_EXTERNAL_RANGE = (18, 35)
+EXTERNAL_CHANGE_RANGE = (-2, 2)
+EXTERNAL_BOUNDS = (18, 35)
+# The external temperature pulls the internal one past itself by this much
+EXTERNAL_OVERSHOOT = 3
+# TemperatureRegulatorHolon: energy per correction and degrees per unit of activity
+REGULATOR_ENERGY = 4
+REGULATOR_STEP = 3
+# PerceptionHolon: rewards from randint(5, 20), so a score table indexed by reward value fits in 21 columns
+MIN_REWARD = 5
+MAX_REWARD = 20
+
+# Fragments of the fused step; {placeholders} are filled from the kernels at construction
+_DECIDE = """
+    # PerceptionHolon.perceive and make_decision: the first affordable reward with the best
+    # remembered dopamine - pain; some affordable reward always scores above -inf, so the
+    # scripts' random fallback choice never runs
+    best_reward = None
+    best_score = -inf
+    for _ in offers:
+        reward = randint(MIN_REWARD, MAX_REWARD)
+        cost = reward_cost_percentage * reward
+        if cost <= energy:
+            sums = feedback.get(reward)
+            score = sums[0] - sums[1] if sums is not None else 0
+            if score > best_score:
+                best_reward = reward
+                best_cost = cost
+                best_score = score
+    if best_reward is None:
+        if trace_cell[0] is not None and trace_cell[0].should_record(step_index, True):
+            trace_cell[0].record({no_reward_record})
+        return False
+    reward = best_reward
+
+    # ActionHolon.act and maintenance
+    energy -= best_cost
+    materials += reward
+    energy -= energy_maintenance_cost
+"""
+
+_MODULATE = """
+    # CoreHolon.modulate
+    if energy_low_lower <= energy <= energy_low_upper:
+        energy_level = 2
+        energy_disposal_level = 0.5
+    elif energy_high_lower <= energy <= energy_high_upper:
+        energy_level = 0.5
+        energy_disposal_level = 2
+    else:
+        energy_level = 1
+        energy_disposal_level = 1
+    if materials_low_lower <= materials <= materials_low_upper:
+        waste_level = 0.5
+    elif materials_high_lower <= materials <= materials_high_upper:
+        waste_level = 2
+    else:
+        waste_level = 1
+"""
+
+_MODULATE_TEMPERATURE = """
+    # The regulator is amplified unless the lower temperature gate holds
+    if temperature_low_lower <= internal_temperature <= temperature_low_upper:
+        temperature_level = 0.5 if temperature_high_lower <= internal_temperature <= temperature_high_upper else 1
+    else:
+        temperature_level = 2
+"""
+
+_METABOLISM = """
+    # WasteHolon.dispose, EnergyHolon.convert, EnergyDisposalHolon.dispose
+    if materials > MATERIALS_HIGH:
+        materials -= waste_level * DISPOSAL_UNIT
+    needed = materials_needed * energy_level
+    generated = energy_generated * energy_level
+    if materials >= needed:
+        materials -= needed
+        energy += generated
+    if energy > ENERGY_HIGH:
+        energy -= energy_disposal_level * DISPOSAL_UNIT
+"""
+
+_TEMPERATURE = """
+    # PerceptionTemperatureHolon.affect_core_holon and change_temperature, TemperatureRegulatorHolon
+    if external_temperature < internal_temperature:
+        internal_temperature -= ((internal_temperature - external_temperature) + EXTERNAL_OVERSHOOT)
+    elif external_temperature > internal_temperature:
+        internal_temperature += ((external_temperature - internal_temperature) + EXTERNAL_OVERSHOOT)
+    external_temperature += external_randrange(EXTERNAL_CHANGE_LOW, EXTERNAL_CHANGE_HIGH)
+    if external_temperature < EXTERNAL_LOW:
+        external_temperature = EXTERNAL_LOW
+    elif external_temperature > EXTERNAL_HIGH:
+        external_temperature = EXTERNAL_HIGH
+    if internal_temperature <= TEMPERATURE_LOW:
+        energy -= REGULATOR_ENERGY
+        internal_temperature += REGULATOR_STEP * temperature_level
+    elif internal_temperature >= TEMPERATURE_HIGH:
+        energy -= REGULATOR_ENERGY
+        internal_temperature -= REGULATOR_STEP * (1 / temperature_level)
+"""
+
+_REMEMBER = """
+    # MemoryHolon.remember: top-K heap by |feedback| with running sums per reward
+    was_successful = ENERGY_LOW <= energy <= ENERGY_HIGH and MATERIALS_LOW <= materials <= MATERIALS_HIGH
+    if was_successful:
+        entry = (reward, 'dopamine', reward, 'h')
+    else:
+        entry = (reward, 'pain', -reward, '-h' if energy < ENERGY_LOW or materials < MATERIALS_LOW else 'h')
+    item = (abs(entry[2]), -sequence, entry)
+    sequence += 1
+    if len(heap) < max_memory_size:
+        heappush(heap, item)
+        evicted = None
+    else:
+        evicted = heappushpop(heap, item)
+    if evicted is not item:
+        sums = feedback.get(reward)
+        if sums is None:
+            sums = feedback[reward] = [0, 0, 0]
+        sums[0 if was_successful else 1] += 1 * entry[2]
+        sums[2] += 1
+        if evicted is not None:
+            old_reward, old_type, old_value, _ = evicted[2]
+            sums = feedback[old_reward]
+            sums[0 if old_type == 'dopamine' else 1] += -1 * old_value
+            sums[2] -= 1
+            if sums[2] == 0:
+                # Drop empty rewards so float sums do not keep rounding residue
+                del feedback[old_reward]
+"""
+
+_ALIVE = """
+    alive = energy > 0 and materials > 0
+    event = not (was_successful and alive)
+"""
+
+_HOMEOSTASIS = """
+    is_in_homeostasis = {criterion}
+    if not is_in_homeostasis:
+        steps_out_of_homeostasis += 1
+    else:
+        steps_out_of_homeostasis = 0
+    alive = energy > 0 and materials > 0 and steps_out_of_homeostasis < homeostasis_threshold
+    event = not (is_in_homeostasis and alive)
+"""
+
+_CRITERIA = {
+    STRICT: "(ENERGY_LOW <= energy <= ENERGY_HIGH and MATERIALS_LOW <= materials <= MATERIALS_HIGH "
+            "and TEMPERATURE_LOW <= internal_temperature <= TEMPERATURE_HIGH)",
+    TEMPERATURE_ONLY: "(TEMPERATURE_LOW <= internal_temperature <= TEMPERATURE_HIGH)",
+}
+
+# (source, code) of the step factory by (temperature, homeostasis): engines with the same kernels share one
+_compiled = {}
+
+_RECORD = """
+    if trace_cell[0] is not None and trace_cell[0].should_record(step_index, event):
+        trace_cell[0].record({record})
+    return alive
+"""
+
+
+def _factory_source(temperature: bool, homeostasis: t.Optional[str]) -> str:
+    # Source of a factory whose closures share the SuperHolon state as local variables
+    state = ['energy', 'materials', 'waste_level', 'energy_level', 'energy_disposal_level', 'step_count', 'sequence']
+    initial = ['starting_energy', 'starting_materials', '1', '1', '1', '0', '0']
+    levels = "waste_level=waste_level, energy_level=energy_level, energy_disposal_level=energy_disposal_level"
+    record = "step=step_index, energy=energy, materials=materials, " + levels
+    if temperature:
+        state += ['internal_temperature', 'external_temperature', 'temperature_level']
+        initial += ['INITIAL_INTERNAL_TEMPERATURE', 'initial_external', '1']
+        temperature_record = ", temperature=internal_temperature, external_temperature=external_temperature, temperature_level=temperature_level"
+    else:
+        temperature_record = ""
+    if homeostasis is not None:
+        state.append('steps_out_of_homeostasis')
+        initial.append('0')
+
+    body = _DECIDE + _MODULATE
+    if temperature:
+        body += _MODULATE_TEMPERATURE
+    body += _METABOLISM
+    if temperature:
+        body += _TEMPERATURE
+    body += _REMEMBER
+    body += _HOMEOSTASIS.format(criterion=_CRITERIA[homeostasis]) if homeostasis is not None else _ALIVE
+    body += _RECORD
+    body = body.format(
+        no_reward_record=record + ", reward=-1" + temperature_record,
+        record=record + ", reward=reward" + temperature_record
+    )
+
+    names = ", ".join(state)
+    return (
+        "def _factory(trace_cell):\n"
+        + "".join(f"    {name} = {value}\n" for name, value in zip(state, initial))
+        + "    heap = []\n    feedback = {}\n\n"
+        + f"    def step():\n        nonlocal {names}\n        step_index = step_count\n        step_count += 1\n"
+        + "".join("    " + line + "\n" if line else "\n" for line in body.strip("\n").split("\n"))
+        + "\n    def state():\n        return {" + ", ".join(f"'{name}': {name}" for name in state)
+        + ", 'heap': heap}\n\n"
+        + "    def run(n_steps):\n        for index in range(n_steps):\n            if not step():\n"
+        + "                return index\n        return n_steps\n\n"
+        + "    return step, state, run\n"
+    )
+
+
+class SuperHolonEngine:
+    def __init__(
+        self,
+        starting_materials: float,
+        starting_energy: float,
+        energy_maintenance_cost: float,
+        reward_cost_percentage: float,
+        materials_needed: float,
+        energy_generated: float,
+        max_memory_size: int = 6,
+        modulation: t.Union[str, ModulationKernel] = 'threshold',
+        temperature: bool = False,
+        homeostasis: t.Optional[str] = None,
+        homeostasis_threshold: int = 5,
+        num_rewards: int = 6,
+        streams=None
+    ):
+        """
+        One SuperHolon of any variant, advanced by a single fused step function
+
+        The variant scripts share one step (perceive -> act -> maintenance ->
+        modulate -> dispose/convert/dispose -> remember) and differ in three
+        kernels: the modulation rule (hard thresholds or sigmoid gates, both
+        given as closed intervals by a ModulationKernel), the temperature
+        subsystem (PerceptionTemperatureHolon and TemperatureRegulatorHolon) and
+        the homeostasis criterion. At construction the step is generated from
+        the chosen kernels as one function whose state lives in closure
+        variables: no holon objects, attribute lookups or method calls per
+        step, and no branches for kernels that are switched off. Every
+        floating-point operation is that of the scripts, so on the same streams
+        an engine follows the script's SuperHolon exactly. Only the holon
+        overhead goes: with the random module it steps about 2x faster than
+        the script, on RandomStreams the stream draws both pay leave about
+        1.2x for short homeostasis runs and 1.7x for memory_energy.
+
+        Parameters:
+        - starting_materials, starting_energy, energy_maintenance_cost,
+          reward_cost_percentage, materials_needed, energy_generated: Script inputs
+        - max_memory_size: Entries kept by the memory
+        - modulation: 'threshold', 'sigmoid' or a ModulationKernel
+        - temperature: Whether the temperature holons take part
+        - homeostasis: None, STRICT or TEMPERATURE_ONLY
+        - homeostasis_threshold: Consecutive steps out of homeostasis before failing
+        - num_rewards: Rewards offered per step
+        - streams: Per-holon random streams as for build_super_holon; the random module when None
+        """
+        if homeostasis not in HOMEOSTASIS_CRITERIA:
+            raise ValueError(f"Unknown homeostasis criterion: {homeostasis}")
+        if homeostasis is not None and not temperature:
+            raise ValueError("The homeostasis criteria test the temperature band and need the temperature subsystem")
+        kernel = MODULATION_KERNELS[modulation] if isinstance(modulation, str) else modulation
+        self.modulation = kernel
+        self.temperature = temperature
+        self.homeostasis = homeostasis
+        self.homeostasis_threshold = homeostasis_threshold
+        self.max_memory_size = max_memory_size
+        rng = streams.stream if streams is not None else lambda holon: random
+
+        namespace = {
+            'inf': math.inf,
+            'heappush': heapq.heappush,
+            'heappushpop': heapq.heappushpop,
+            'randint': rng('perception').randint,
+            'offers': range(num_rewards),
+            'starting_energy': starting_energy,
+            'starting_materials': starting_materials,
+            'energy_maintenance_cost': energy_maintenance_cost,
+            'reward_cost_percentage': reward_cost_percentage,
+            'materials_needed': materials_needed,
+            'energy_generated': energy_generated,
+            'max_memory_size': max_memory_size,
+            'homeostasis_threshold': homeostasis_threshold,
+            'MIN_REWARD': MIN_REWARD,
+            'MAX_REWARD': MAX_REWARD,
+            'ENERGY_LOW': ENERGY_BAND[0],
+            'ENERGY_HIGH': ENERGY_BAND[1],
+            'MATERIALS_LOW': MATERIALS_BAND[0],
+            'MATERIALS_HIGH': MATERIALS_BAND[1],
+            'TEMPERATURE_LOW': TEMPERATURE_BAND[0],
+            'TEMPERATURE_HIGH': TEMPERATURE_BAND[1],
+            'DISPOSAL_UNIT': DISPOSAL_UNIT,
+            'EXTERNAL_OVERSHOOT': EXTERNAL_OVERSHOOT,
+            'EXTERNAL_CHANGE_LOW': EXTERNAL_CHANGE_RANGE[0],
+            'EXTERNAL_CHANGE_HIGH': EXTERNAL_CHANGE_RANGE[1],
+            'EXTERNAL_LOW': EXTERNAL_BOUNDS[0],
+            'EXTERNAL_HIGH': EXTERNAL_BOUNDS[1],
+            'REGULATOR_ENERGY': REGULATOR_ENERGY,
+            'REGULATOR_STEP': REGULATOR_STEP,
+        }
+        gates = ['energy_low', 'energy_high', 'materials_low', 'materials_high']
+        if temperature:
+            gates += ['temperature_low', 'temperature_high']
+            # Drawn at construction, as PerceptionTemperatureHolon.__init__ does
+            temperature_rng = rng('perception_temperature')
+            namespace['external_randrange'] = temperature_rng.randrange
+            namespace['initial_external'] = temperature_rng.randrange(*INITIAL_EXTERNAL_RANGE)
+        for gate in gates:
+            namespace[gate + '_lower'] = getattr(kernel, gate).lower
+            namespace[gate + '_upper'] = getattr(kernel, gate).upper
+
+        self._trace_cell = [None]
+        self._step, self._state, self._run = self._compile(namespace)
+
+    def _compile(self, namespace: t.Dict[str, t.Any]) -> t.Tuple[t.Callable, t.Callable, t.Callable]:
+        # The factory is generated and compiled once per kernel combination, then run in this engine's namespace
+        key = (self.temperature, self.homeostasis)
+        compiled = _compiled.get(key)
+        if compiled is None:
+            source = _factory_source(self.temperature, self.homeostasis)
+            compiled = _compiled[key] = source, compile(source, "<SuperHolonEngine>", 'exec')
+        self.source, code = compiled
+        if self.temperature:
+            namespace['INITIAL_INTERNAL_TEMPERATURE'] = INITIAL_INTERNAL_TEMPERATURE
+        exec(code, namespace)
+        return namespace['_factory'](self._trace_cell)
+
+    @property
+    def trace(self):
+        return self._trace_cell[0]
+
+    @trace.setter
+    def trace(self, trace):
+        # TraceRecorder or StepStatistics receiving the same columns as the script's record_trace
+        self._trace_cell[0] = trace
+
+    def simulate_step(self) -> bool:
+        """
+        One step; False when the SuperHolon fails, as SuperHolon.simulate_step
+        """
+        return self._step()
+
+    def run(self, num_iterations: int) -> int:
+        """
+        Run up to num_iterations steps
+
+        Returns:
+        - Steps completed before the first failing step
+        """
+        return self._run(num_iterations)
+
+    def state(self) -> t.Dict[str, t.Any]:
+        """
+        Current values: energy, materials, activity levels, step count and, with
+        the temperature subsystem, internal_temperature, external_temperature and
+        temperature_level, plus steps_out_of_homeostasis with a criterion
+        """
+        state = self._state()
+        state.pop('heap')
+        state.pop('sequence')
+        return state
+
+    def __getattr__(self, name: str):
+        # Read access to the state by name, e.g. engine.energy
+        if name.startswith('_') or '_state' not in self.__dict__:
+            raise AttributeError(name)
+        state = self._state()
+        if name in state:
+            return state[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def memory_holon(self) -> MemoryHolon:
+        """
+        MemoryHolon holding a copy of the engine's memory
+        """
+        state = self._state()
+        memory = MemoryHolon(self.max_memory_size)
+        memory.restore(state['heap'], state['sequence'])
+        return memory
+
+
+def build_engine(variant: str, starting_materials, starting_energy, energy_maintenance_cost, reward_cost_percentage, materials_needed, energy_generated, max_memory_size=6, streams=None) -> SuperHolonEngine:
+    """
+    Engine with the kernels of a SuperHolon variant, taking the arguments of its build_super_holon
+    """
+    modulation, temperature, homeostasis = VARIANT_KERNELS[variant]
+    return SuperHolonEngine(
+        starting_materials, starting_energy, energy_maintenance_cost, reward_cost_percentage, materials_needed,
+        energy_generated, max_memory_size, modulation=modulation, temperature=temperature, homeostasis=homeostasis,
+        streams=streams
+    )
+
+
+def simulate_engine(variant: str, parameters: t.Dict[str, float], streams, trace=None) -> t.Tuple[int, int, float, float, float]:
+    """
+    holon_models.simulate_super_holon on the fused engine of a variant
+
+    Returns:
+    - steps survived, failure cause (index of FAILURE_CAUSES), final energy, final materials, final temperature
+    """
+    from holon_models import FAILURE_CAUSES
+    build_parameters = {key: value for key, value in parameters.items() if key != 'num_iterations'}
+    engine = build_engine(variant, **build_parameters, streams=streams)
+    engine.trace = trace
+    steps = engine.run(int(parameters['num_iterations']))
+
+    state = engine.state()
+    cause = 'alive'
+    if steps < int(parameters['num_iterations']):
+        if state['energy'] <= 0 or state['materials'] <= 0:
+            cause = 'depleted'
+        elif state.get('steps_out_of_homeostasis', 0) >= engine.homeostasis_threshold:
+            cause = 'out_of_homeostasis'
+        else:
+            cause = 'no_valid_reward'
+    temperature = state.get('internal_temperature', math.nan)
+    return steps, FAILURE_CAUSES.index(cause), state['energy'], state['materials'], temperature
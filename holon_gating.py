@@ -0,0 +1,160 @@
+import math
+
+# Forms of the sigmoid expressions used by CoreHolon.modulate
+LOGISTIC = 'logistic'        # 1/(1+math.exp(-k*(edge-state)))
+EXPONENTIAL = 'exponential'  # 1/(1*math.exp(-k*(edge-state))), the upper temperature edge
+
+
+class SigmoidGate:
+    def __init__(self, edge, k=2, form=LOGISTIC, rel_tol=1e-09):
+        """
+        Band test equivalent to math.isclose(sigmoid, 1) for one band edge
+
+        The sigmoid is monotonic in the state, so the states for which it is
+        close to 1 form an interval [lower, upper]. Both ends are found once by
+        bisecting on the exact floating-point expression, after which a gate is
+        two comparisons: no exponential on the hot path, no OverflowError far
+        out of band, and it works unchanged on floats and NumPy arrays.
+
+        Parameters:
+        - edge: Band edge of the sigmoid (e.g. 30 or 70)
+        - k: Steepness of the sigmoid, must be positive
+        - form: LOGISTIC or EXPONENTIAL expression
+        - rel_tol: Tolerance of the math.isclose test
+        """
+        if k <= 0:
+            raise ValueError("The sigmoid steepness k must be positive")
+        self.edge = edge
+        self.k = k
+        self.form = form
+        self.rel_tol = rel_tol
+
+        if form == LOGISTIC:
+            # Close to 1 for every state below edge + log(tol / (1 - tol)) / k
+            estimate = edge + math.log(rel_tol / (1 - rel_tol)) / k
+            self.lower = -math.inf
+            self.upper = self._boundary(estimate - 1, estimate + 1)
+        elif form == EXPONENTIAL:
+            # Close to 1 only in a window of about rel_tol / k around the edge
+            self.lower = self._boundary(edge, edge - 1)
+            self.upper = self._boundary(edge, edge + 1)
+        else:
+            raise ValueError(f"Unknown sigmoid form: {form}")
+
+    def is_close_to_one(self, state):
+        """
+        Reference evaluation of the original math.isclose(sigmoid, 1) test
+        """
+        try:
+            if self.form == LOGISTIC:
+                sigmoid = 1/(1+math.exp(-self.k*(self.edge-state)))
+            else:
+                sigmoid = 1/(1*math.exp(-self.k*(self.edge-state)))
+        except (OverflowError, ZeroDivisionError):
+            return False
+        return math.isclose(sigmoid, 1, rel_tol=self.rel_tol)
+
+    def _boundary(self, inside, outside):
+        # Bisect down to adjacent floats; the result is the last state inside the band
+        if not self.is_close_to_one(inside) or self.is_close_to_one(outside):
+            raise ValueError("Could not bracket the sigmoid band edge")
+        while True:
+            middle = (inside + outside) / 2
+            if middle == inside or middle == outside:
+                return inside
+            if self.is_close_to_one(middle):
+                inside = middle
+            else:
+                outside = middle
+
+    def __call__(self, state):
+        return (self.lower <= state) & (state <= self.upper)
+
+
+class ThresholdGate:
+    def __init__(self, edge, below=True):
+        """
+        Hard band test state < edge (below) or state > edge, as in the memory and energy CoreHolon
+
+        Written as the closed interval [lower, upper] of a SigmoidGate, with the
+        edge itself excluded by stepping to the adjacent float.
+        """
+        self.edge = edge
+        if below:
+            self.lower = -math.inf
+            self.upper = math.nextafter(edge, -math.inf)
+        else:
+            self.lower = math.nextafter(edge, math.inf)
+            self.upper = math.inf
+
+    def __call__(self, state):
+        return (self.lower <= state) & (state <= self.upper)
+
+
+class ModulationKernel:
+    """
+    Gating decisions of CoreHolon.modulate: six band gates, each a closed interval [lower, upper]
+    """
+
+    def activity_levels(self, energy, materials, internal_temperature=None):
+        """
+        Activity levels chosen by CoreHolon.modulate
+
+        Accepts floats or NumPy arrays of states. The if/elif chains of the
+        scalar method are written as mask arithmetic so both work alike.
+
+        Returns:
+        - (waste, energy, energy_disposal) levels, plus the temperature level
+          when internal_temperature is given
+        """
+        energy_low = self.energy_low(energy)
+        energy_high = self.energy_high(energy) * (1 - energy_low)
+        energy_level = 1 + energy_low - 0.5 * energy_high
+        energy_disposal_level = 1 - 0.5 * energy_low + energy_high
+
+        materials_low = self.materials_low(materials)
+        materials_high = self.materials_high(materials) * (1 - materials_low)
+        waste_level = 1 - 0.5 * materials_low + materials_high
+
+        if internal_temperature is None:
+            return waste_level, energy_level, energy_disposal_level
+
+        # The regulator is amplified unless the lower temperature sigmoid is close to 1
+        threshold = 1 - self.temperature_low(internal_temperature)
+        temperature_high = self.temperature_high(internal_temperature) * (1 - threshold)
+        temperature_level = 1 + threshold - 0.5 * temperature_high
+        return waste_level, energy_level, energy_disposal_level, temperature_level
+
+
+class SigmoidModulationKernel(ModulationKernel):
+    def __init__(self, k=2, energy_band=(30, 70), materials_band=(30, 70), temperature_band=(21, 27), rel_tol=1e-09):
+        """
+        Sigmoid gating decisions of CoreHolon.modulate for single states or arrays of states
+
+        Parameters:
+        - k: Steepness of the sigmoids
+        - energy_band, materials_band, temperature_band: (low, high) band edges
+        - rel_tol: Tolerance of the math.isclose tests
+        """
+        self.energy_low = SigmoidGate(energy_band[0], k, rel_tol=rel_tol)
+        self.energy_high = SigmoidGate(energy_band[1], k, rel_tol=rel_tol)
+        self.materials_low = SigmoidGate(materials_band[0], k, rel_tol=rel_tol)
+        self.materials_high = SigmoidGate(materials_band[1], k, rel_tol=rel_tol)
+        self.temperature_low = SigmoidGate(temperature_band[0], k, rel_tol=rel_tol)
+        self.temperature_high = SigmoidGate(temperature_band[1], k, form=EXPONENTIAL, rel_tol=rel_tol)
+
+
+class ThresholdModulationKernel(ModulationKernel):
+    def __init__(self, energy_band=(30, 70), materials_band=(30, 70), temperature_band=(21, 27)):
+        """
+        Hard-threshold gating of the memory and energy CoreHolon: below the low edge or above the high one
+
+        The memory and energy script has no temperature holons; its temperature
+        gates follow the same rule for variants that add them.
+        """
+        self.energy_low = ThresholdGate(energy_band[0])
+        self.energy_high = ThresholdGate(energy_band[1], below=False)
+        self.materials_low = ThresholdGate(materials_band[0])
+        self.materials_high = ThresholdGate(materials_band[1], below=False)
+        self.temperature_low = ThresholdGate(temperature_band[0])
+        self.temperature_high = ThresholdGate(temperature_band[1], below=False)
@@ -0,0 +1,254 @@
+import math
+import typing as t
+from fractions import Fraction
+
+import numpy as np
+import scipy.sparse as sparse
+import scipy.sparse.csgraph as csgraph
+import scipy.sparse.linalg as sparse_linalg
+
+from holon_engine import MAX_REWARD, MIN_REWARD
+
+# Activity levels a holon can take: suppressed, reset and amplified
+ACTIVITY_LEVELS = (Fraction(1, 2), Fraction(1), Fraction(2))
+
+
+def _lattice_scale(values: t.Iterable[Fraction]) -> int:
+    # Smallest integer L such that every value * L is an integer
+    scale = 1
+    for value in values:
+        scale = scale * value.denominator // math.gcd(scale, value.denominator)
+    return scale
+
+
+class SuperHolonMarkovChain:
+    def __init__(
+        self,
+        starting_energy: float,
+        starting_materials: float,
+        energy_maintenance_cost: float,
+        reward_cost_percentage: float,
+        materials_needed: float,
+        energy_generated: float,
+        num_rewards: int = 6,
+        energy_cap: t.Optional[float] = None,
+        materials_cap: t.Optional[float] = None,
+        max_states: int = 5_000_000
+    ):
+        """
+        Exact Markov chain over (energy, materials) of the threshold SuperHolon
+
+        Without memory, make_decision takes the first affordable reward among
+        num_rewards uniform draws, which is uniform over the affordable rewards,
+        and every holon rule is deterministic. All increments are rational, so
+        energy and materials stay on a lattice of step 1/L and the reachable
+        states can be enumerated exactly from the starting state.
+
+        Parameters:
+        - starting_energy, starting_materials, energy_maintenance_cost,
+          reward_cost_percentage, materials_needed, energy_generated: Script inputs
+        - num_rewards: Rewards offered per step by PerceptionHolon
+        - energy_cap, materials_cap: Optional bounds; states beyond them are lumped
+          into an absorbing 'truncated' state whose probability is reported
+        - max_states: Guard against state spaces too large to enumerate
+        """
+        self.num_rewards = num_rewards
+        self.rewards = np.arange(MIN_REWARD, MAX_REWARD + 1)
+        pct = Fraction(str(reward_cost_percentage))
+
+        # Every quantity added to or removed from energy and materials in one step
+        increments = [Fraction(str(starting_energy)), Fraction(str(starting_materials)), Fraction(str(energy_maintenance_cost))]
+        increments += [pct * int(reward) for reward in self.rewards]
+        for level in ACTIVITY_LEVELS:
+            increments += [Fraction(str(energy_generated)) * level, Fraction(str(materials_needed)) * level, 5 * level]
+        self.scale = _lattice_scale(increments)
+        scaled = lambda value: int(Fraction(str(value)) * self.scale)
+
+        self._reward_cost = np.array([int(pct * int(reward) * self.scale) for reward in self.rewards])
+        self._reward_materials = self.rewards * self.scale
+        self._maintenance = scaled(energy_maintenance_cost)
+        self._materials_needed = {level: int(Fraction(str(materials_needed)) * level * self.scale) for level in ACTIVITY_LEVELS}
+        self._energy_generated = {level: int(Fraction(str(energy_generated)) * level * self.scale) for level in ACTIVITY_LEVELS}
+        self._disposal = {level: int(5 * level * self.scale) for level in ACTIVITY_LEVELS}
+        self._low = 30 * self.scale
+        self._high = 70 * self.scale
+        self._energy_cap = None if energy_cap is None else scaled(energy_cap)
+        self._materials_cap = None if materials_cap is None else scaled(materials_cap)
+        self.max_states = max_states
+
+        self._build(scaled(starting_energy), scaled(starting_materials))
+
+    def _next_state(self, energy: np.ndarray, materials: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray]:
+        """
+        Scaled (energy, materials) after every reward, for states as column vectors
+
+        Same order as SuperHolon.simulate_step: act and maintenance, modulate,
+        waste disposal, energy conversion, energy disposal.
+        """
+        half, one, two = ACTIVITY_LEVELS
+        energy = energy - self._reward_cost - self._maintenance
+        materials = materials + self._reward_materials
+
+        low_energy = energy < self._low
+        high_energy = ~low_energy & (energy > self._high)
+        low_materials = materials < self._low
+        high_materials = ~low_materials & (materials > self._high)
+
+        # WasteHolon.dispose
+        waste = np.where(low_materials, self._disposal[half], np.where(high_materials, self._disposal[two], self._disposal[one]))
+        materials = np.where(materials > self._high, materials - waste, materials)
+
+        # EnergyHolon.convert
+        needed = np.where(low_energy, self._materials_needed[two], np.where(high_energy, self._materials_needed[half], self._materials_needed[one]))
+        generated = np.where(low_energy, self._energy_generated[two], np.where(high_energy, self._energy_generated[half], self._energy_generated[one]))
+        converts = materials >= needed
+        materials = np.where(converts, materials - needed, materials)
+        energy = np.where(converts, energy + generated, energy)
+
+        # EnergyDisposalHolon.dispose
+        disposal = np.where(low_energy, self._disposal[half], np.where(high_energy, self._disposal[two], self._disposal[one]))
+        energy = np.where(energy > self._high, energy - disposal, energy)
+        return energy, materials
+
+    def _build(self, starting_energy: int, starting_materials: int):
+        n_rewards = len(self.rewards)
+        index = {(starting_energy, starting_materials): 0}
+        energy_states = [starting_energy]
+        materials_states = [starting_materials]
+        rows, cols, probabilities = [], [], []
+        failure, truncated = [], []
+
+        start = 0
+        while start < len(energy_states):
+            stop = len(energy_states)
+            energy = np.array(energy_states[start:stop])[:, None]
+            materials = np.array(materials_states[start:stop])[:, None]
+            source = np.arange(start, stop)[:, None]
+
+            # First affordable reward among num_rewards draws: uniform over the affordable ones
+            affordable = self._reward_cost <= energy
+            n_affordable = affordable.sum(axis=1, keepdims=True)
+            no_valid = ((n_rewards - n_affordable) / n_rewards) ** self.num_rewards
+            probability = np.where(affordable, (1 - no_valid) / np.maximum(n_affordable, 1), 0.0)
+
+            next_energy, next_materials = self._next_state(energy, materials)
+            failed = affordable & ((next_energy <= 0) | (next_materials <= 0))
+            beyond = affordable & ~failed & self._beyond_caps(next_energy, next_materials)
+            moves = affordable & ~failed & ~beyond
+
+            failure.extend(no_valid[:, 0] + np.where(failed, probability, 0).sum(axis=1))
+            truncated.extend(np.where(beyond, probability, 0).sum(axis=1))
+
+            for state, energy_value, materials_value, probability_value in zip(
+                np.broadcast_to(source, moves.shape)[moves].tolist(),
+                next_energy[moves].tolist(),
+                next_materials[moves].tolist(),
+                probability[moves].tolist()
+            ):
+                key = (energy_value, materials_value)
+                target = index.get(key)
+                if target is None:
+                    target = index[key] = len(energy_states)
+                    energy_states.append(energy_value)
+                    materials_states.append(materials_value)
+                    if len(energy_states) > self.max_states:
+                        raise ValueError("State space exceeds max_states; set energy_cap/materials_cap")
+                rows.append(state)
+                cols.append(target)
+                probabilities.append(probability_value)
+            start = stop
+
+        n_states = len(energy_states)
+        self.n_states = n_states
+        self.energy = np.array(energy_states) / self.scale
+        self.materials = np.array(materials_states) / self.scale
+        # Several rewards can lead to the same state; duplicates are summed
+        self.transitions = sparse.csr_matrix((probabilities, (rows, cols)), shape=(n_states, n_states))
+        self.failure = np.array(failure)
+        self.truncated = np.array(truncated)
+
+    def _beyond_caps(self, energy: np.ndarray, materials: np.ndarray) -> np.ndarray:
+        beyond = np.zeros(energy.shape, dtype=bool)
+        if self._energy_cap is not None:
+            beyond |= energy > self._energy_cap
+        if self._materials_cap is not None:
+            beyond |= materials > self._materials_cap
+        return beyond
+
+    def survival_curve(self, horizon: int) -> np.ndarray:
+        """
+        Probability of still being alive after 0..horizon steps from the starting state
+
+        Mass absorbed by truncation is not counted as alive, so with caps this is a lower bound.
+        """
+        distribution = np.zeros(self.n_states)
+        distribution[0] = 1
+        transitions_t = self.transitions.T.tocsr()
+        survival = np.empty(horizon + 1)
+        survival[0] = 1
+        for step in range(1, horizon + 1):
+            distribution = transitions_t @ distribution
+            survival[step] = distribution.sum()
+        return survival
+
+    def _can_reach(self, targets: np.ndarray) -> np.ndarray:
+        # States with a path to any of the target states, grown backwards one step at a time
+        reached = targets.copy()
+        frontier = reached
+        while frontier.any():
+            frontier = (self.transitions @ frontier.astype(float) > 0) & ~reached
+            reached |= frontier
+        return reached
+
+    def failure_probability(self) -> np.ndarray:
+        """
+        Probability of eventually failing from every state (truncation counts as not failing)
+        """
+        leaks = self.failure > 0
+        can_fail = self._can_reach(leaks)
+        probability = np.zeros(self.n_states)
+        if can_fail.any():
+            restricted = self.transitions[can_fail][:, can_fail]
+            system = sparse.identity(restricted.shape[0], format='csc') - restricted.tocsc()
+            probability[can_fail] = sparse_linalg.spsolve(system, self.failure[can_fail])
+        return probability
+
+    def expected_time_to_failure(self) -> np.ndarray:
+        """
+        Expected number of steps until failure (or truncation); inf from states that may never fail
+        """
+        exits = (self.failure > 0) | (self.truncated > 0)
+        transient = self._can_reach(exits)
+        # States that can reach a closed class without failure survive forever with positive probability
+        certain = ~self._can_reach(~transient)
+        expected = np.full(self.n_states, math.inf)
+        if certain.any():
+            restricted = self.transitions[certain][:, certain]
+            system = sparse.identity(restricted.shape[0], format='csc') - restricted.tocsc()
+            expected[certain] = sparse_linalg.spsolve(system, np.ones(restricted.shape[0]))
+        return expected
+
+    def report(self, horizon: t.Optional[int] = None) -> t.Dict[str, t.Any]:
+        """
+        Survival summary from the starting state and where the discretization is exact
+        """
+        n_components, _ = csgraph.connected_components(self.transitions, directed=True, connection='strong')
+        summary = {
+            'n_states': self.n_states,
+            'lattice_step': 1 / self.scale,
+            'strongly_connected_components': n_components,
+            'failure_probability': float(self.failure_probability()[0]),
+            'expected_time_to_failure': float(self.expected_time_to_failure()[0]),
+            'truncated_mass_per_step_max': float(self.truncated.max(initial=0.0)),
+            'exactness': {
+                'lattice': f"exact: every increment is a multiple of 1/{self.scale}",
+                'choice': "exact for memory-free choice (first affordable reward, uniform over affordable rewards); "
+                          "memory-guided choice in make_decision depends on MemoryHolon, which is not part of the "
+                          "state, so results are an approximation for the scripted model",
+                'state_space': "exact" if self._energy_cap is None and self._materials_cap is None
+                               else "approximate: mass beyond energy_cap/materials_cap is absorbed as truncated",
+            },
+        }
+        if horizon is not None:
+            summary['survival_at_horizon'] = float(self.survival_curve(horizon)[-1])
+        return summary
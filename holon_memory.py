@@ -0,0 +1,85 @@
+import heapq
+
+
+class MemoryHolon:
+    """
+    Bounded top-K memory of (reward, feedback_type, feedback_value, outcome_tag) entries
+
+    Entries live in a min-heap ordered by |feedback_value|, so remembering costs
+    O(log K) instead of a full re-sort. The weakest entry is evicted first and,
+    among entries of equal strength, the most recent one, which is the entry
+    the previous sort-then-pop implementation dropped. A running dopamine and
+    pain sum per reward value is updated on insert and eviction, so decisions
+    look up a reward's feedback in O(1).
+    """
+
+    def __init__(self, max_memory_size=6):
+        self.max_memory_size = max_memory_size
+        self._heap = []
+        self._sequence = 0
+        # reward -> [dopamine sum, pain sum, number of entries]
+        self._feedback_sums = {}
+
+    @property
+    def memory(self):
+        # Strongest first, older entries first among ties, as the sorted list used to be
+        return [entry for _, _, entry in sorted(self._heap, key=lambda item: (-item[0], -item[1]))]
+
+    def remember(self, reward, feedback_type, feedback_value, core_holon):
+        if feedback_type == 'dopamine':
+            outcome_tag = 'h' if 30 <= core_holon.energy <= 70 and 30 <= core_holon.materials <= 70 else '-h'
+        elif feedback_type == 'pain':
+            outcome_tag = '-h' if core_holon.energy < 30 or core_holon.materials < 30 else 'h'
+        else:
+            outcome_tag = '-h'  # Default to negative outcome for unrecognized feedback_type
+
+        entry = (reward, feedback_type, feedback_value, outcome_tag)
+        # Newer entries get a smaller second key, so they pop first among equal |feedback_value|
+        item = (abs(feedback_value), -self._sequence, entry)
+        self._sequence += 1
+
+        if len(self._heap) < self.max_memory_size:
+            heapq.heappush(self._heap, item)
+            self._add_feedback(entry, 1)
+            return
+
+        evicted = heapq.heappushpop(self._heap, item)
+        if evicted is not item:
+            self._add_feedback(entry, 1)
+            self._add_feedback(evicted[2], -1)
+
+    def _add_feedback(self, entry, sign):
+        reward, feedback_type, feedback_value, _ = entry
+        sums = self._feedback_sums.setdefault(reward, [0, 0, 0])
+        if feedback_type == 'dopamine':
+            sums[0] += sign * feedback_value
+        elif feedback_type == 'pain':
+            sums[1] += sign * feedback_value
+        sums[2] += sign
+        if sums[2] == 0:
+            # Drop empty rewards so float sums do not keep rounding residue
+            del self._feedback_sums[reward]
+
+    def snapshot(self):
+        # Heap items in heap order and the insertion counter, enough to continue exactly
+        return list(self._heap), self._sequence
+
+    def restore(self, heap, sequence):
+        # Items are immutable tuples, so restored copies can share them
+        self._heap = list(heap)
+        self._sequence = sequence
+        self._feedback_sums = {}
+        for _, _, entry in self._heap:
+            self._add_feedback(entry, 1)
+
+    def feedback_sums(self, reward):
+        sums = self._feedback_sums.get(reward)
+        if sums is None:
+            return 0, 0
+        return sums[0], sums[1]
+
+    def get_significant_feedback(self):
+        memory = self.memory
+        dopamine_feedback = [item for item in memory if item[1] == 'dopamine']
+        pain_feedback = [item for item in memory if item[1] == 'pain']
+        return dopamine_feedback, pain_feedback
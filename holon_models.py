@@ -0,0 +1,330 @@
+import argparse
+import importlib.util
+import json
+import math
+import os
+import random
+import sys
+import typing as t
+
+from holon_random import RandomStreams
+
+# Model scripts of this directory; their file names contain spaces, so they are loaded by path
+MODELS = {
+    'memory_energy': "Holon Q+ Model memory and energy.py",
+    'sigmoid': "Holon sigmoid 2.py",
+    'homeostasis': "holon homeostasis 6.py",
+    'semi_homeostasis': "holon semi homeostasis 1.py",
+    'validating': "Laws of biology validating 4.py",
+    'holonetico25': "modelo biologico-holonetico25.py",
+    'holonetico28': "modelo biologico-holonetico28.py",
+}
+
+# SuperHolon variants, all built by build_super_holon(...)
+VARIANTS = {name: MODELS[name] for name in ('memory_energy', 'sigmoid', 'homeostasis', 'semi_homeostasis')}
+HOLONETIC_MODELS = ('holonetico25', 'holonetico28')
+
+# Suggested parameters from the README
+DEFAULT_PARAMETERS = {
+    'num_iterations': 1000,
+    'starting_materials': 50,
+    'starting_energy': 50,
+    'energy_maintenance_cost': 5,
+    'reward_cost_percentage': 0.25,
+    'materials_needed': 12,
+    'energy_generated': 9,
+}
+VALIDATING_PARAMETERS = {
+    'num_iterations': 300,
+    'initial_energy': 20.0,
+}
+# The holonetic scripts fix three dimensions and clusters in their goals and cluster matrices
+HOLONETIC_PARAMETERS = {
+    'num_iterations': 100,
+    'noise_sigma': 0.1,
+}
+
+# Index of each cause is its failure_cause code in holon_montecarlo
+FAILURE_CAUSES = ('alive', 'no_valid_reward', 'depleted', 'out_of_homeostasis')
+
+_loaded_scripts = {}
+
+
+def load_script(filename: str):
+    """
+    Import a model script of this directory as a module
+
+    Modules are cached per process, so a pool worker imports each script once.
+    """
+    module = _loaded_scripts.get(filename)
+    if module is not None:
+        return module
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    if directory not in sys.path:
+        # The scripts import their shared holons from this directory
+        sys.path.insert(0, directory)
+    name = "holon_script_" + "".join(c if c.isalnum() else "_" for c in os.path.splitext(filename)[0])
+    spec = importlib.util.spec_from_file_location(name, os.path.join(directory, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _loaded_scripts[filename] = module
+    return module
+
+
+def load_model(model: str):
+    """
+    Import the script of a model as a module, e.g. load_model('homeostasis').SuperHolon
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model: {model}")
+    return load_script(MODELS[model])
+
+
+def load_variant(variant: str):
+    """
+    Import the script of a SuperHolon variant as a module
+    """
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown SuperHolon variant: {variant}")
+    return load_script(VARIANTS[variant])
+
+
+def __getattr__(name: str):
+    # holon_models.homeostasis and friends import their script on first access
+    if name in MODELS:
+        return load_model(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def simulate_super_holon(module, parameters: t.Dict[str, float], streams, trace=None) -> t.Tuple[int, int, float, float, float]:
+    """
+    Run one SuperHolon of a loaded variant on its own random streams
+
+    trace, when given, is attached to the SuperHolon (a TraceRecorder or StepStatistics).
+
+    Returns:
+    - steps survived, failure cause (index of FAILURE_CAUSES), final energy, final materials, final temperature
+    """
+    build_parameters = {key: value for key, value in parameters.items() if key != 'num_iterations'}
+    super_holon = module.build_super_holon(**build_parameters, streams=streams)
+    super_holon.trace = trace
+    steps, cause = advance_super_holon(super_holon, int(parameters['num_iterations']))
+
+    core_holon = super_holon.core_holon
+    temperature = getattr(core_holon, 'internal_temperature', math.nan)
+    return steps, cause, core_holon.energy, core_holon.materials, temperature
+
+
+def advance_super_holon(super_holon, num_iterations: int) -> t.Tuple[int, int]:
+    """
+    Step a SuperHolon graph up to num_iterations times, stopping at its first failing step
+
+    Returns:
+    - steps survived, failure cause (index of FAILURE_CAUSES)
+    """
+    core_holon = super_holon.core_holon
+    steps = 0
+    cause = 'alive'
+    for _ in range(num_iterations):
+        if not super_holon.simulate_step():
+            if core_holon.energy <= 0 or core_holon.materials <= 0:
+                cause = 'depleted'
+            elif getattr(super_holon, 'steps_out_of_homeostasis', 0) >= getattr(super_holon, 'homeostasis_threshold', math.inf):
+                cause = 'out_of_homeostasis'
+            else:
+                cause = 'no_valid_reward'
+            break
+        steps += 1
+    return steps, FAILURE_CAUSES.index(cause)
+
+
+def _run_super_holon(module, parameters, streams) -> t.Dict[str, t.Any]:
+    steps, cause, energy, materials, temperature = simulate_super_holon(module, parameters, streams)
+    return {
+        'steps': steps,
+        'cause': FAILURE_CAUSES[cause],
+        'energy': energy,
+        'materials': materials,
+        'temperature': None if math.isnan(temperature) else temperature,
+    }
+
+
+def _run_validating(module, parameters, streams) -> t.Dict[str, t.Any]:
+    organism = module.build_organism(float(parameters['initial_energy']), streams=streams)
+    # Same loop as main(): the organism is checked before each step
+    for _ in range(int(parameters['num_iterations'])):
+        if not organism.is_alive():
+            break
+        organism.simulate_step()
+    return {
+        'steps': organism.step_count,
+        'alive': organism.is_alive(),
+        'energy': organism.energy,
+        'temperature': organism.internal_temperature,
+        'iterations_out_of_range': organism.num_iterations_out_of_temp_range,
+    }
+
+
+def _run_holonetic(module, parameters, streams) -> t.Dict[str, t.Any]:
+    model = module.BioHoloneticModel(3, 3, noise_sigma=float(parameters['noise_sigma']), streams=streams)
+    force = streams.stream('force')
+    stopped = False
+    for _ in range(int(parameters['num_iterations'])):
+        # uniform(-0.5, 0.5) force per dimension, as in main()
+        if not model.update(force.uniforms(model.n_dimensions) - 0.5):
+            stopped = True
+            break
+    return {
+        'steps': model.step_count,
+        'stopped': stopped,
+        'state': model.state.tolist(),
+        'goal': model.goal.tolist(),
+    }
+
+
+def default_parameters(model: str) -> t.Dict[str, float]:
+    if model in VARIANTS:
+        return dict(DEFAULT_PARAMETERS)
+    if model == 'validating':
+        return dict(VALIDATING_PARAMETERS)
+    return dict(HOLONETIC_PARAMETERS)
+
+
+def run(
+    model: str,
+    parameters: t.Optional[t.Dict[str, float]] = None,
+    seed: t.Optional[int] = None,
+    replica: int = 0,
+    scenarios: t.Optional[str] = None,
+    scenario: t.Optional[int] = None
+) -> t.Dict[str, t.Any]:
+    """
+    Run one model non-interactively and summarise its final state
+
+    Parameters:
+    - model: Key of MODELS
+    - parameters: Script inputs, missing ones default to default_parameters(model)
+    - seed: Root seed of the random streams
+    - replica: Index of the replica, which draws from the streams child('replica', replica),
+      as replicate replica of holon_montecarlo.run_monte_carlo does
+    - scenarios: Directory of a holon_scenarios.ScenarioLibrary the environment is read from
+    - scenario: Scenario of the library, by default the replica index
+
+    Returns:
+    - Dictionary of the run description and its outcome, JSON serialisable
+    """
+    module = load_model(model)
+    unknown = set(parameters or {}) - set(default_parameters(model))
+    if unknown:
+        raise ValueError(f"Unknown parameters for {model}: {', '.join(sorted(unknown))}")
+    parameters = {**default_parameters(model), **(parameters or {})}
+    streams = RandomStreams(seed)
+    replica_streams = streams.child('replica', replica)
+    described = {}
+    if scenarios is not None:
+        if model in HOLONETIC_MODELS:
+            raise ValueError(f"{model} has no environment series to read from a scenario")
+        from holon_scenarios import open_library
+        library = open_library(scenarios)
+        if parameters['num_iterations'] > library.n_steps:
+            raise ValueError(f"The scenarios cover {library.n_steps} steps, fewer than num_iterations")
+        scenario = replica if scenario is None else scenario
+        replica_streams = library[scenario].streams(replica_streams)
+        described = {'scenarios': scenarios, 'scenario': scenario}
+
+    if model in VARIANTS:
+        outcome = _run_super_holon(module, parameters, replica_streams)
+    elif model == 'validating':
+        outcome = _run_validating(module, parameters, replica_streams)
+    else:
+        outcome = _run_holonetic(module, parameters, replica_streams)
+    return {'model': model, 'seed': streams.root_seed, 'replica': replica, **described, 'parameters': parameters, **outcome}
+
+
+def load_batch(path: str) -> t.List[t.Dict[str, t.Any]]:
+    """
+    Expand a JSON or TOML batch file into one specification per run
+
+    The file holds a list of runs, each with a model, optional parameters,
+    seed and repeat count; a "defaults" table applies to every run:
+
+        [defaults]
+        seed = 1
+
+        [[runs]]
+        model = "homeostasis"
+        repeat = 100
+        parameters = { num_iterations = 500 }
+
+    Runs without a seed get one drawn from the OS, recorded in their output.
+    Runs with scenarios = "<library directory>" read their environment from
+    it, replica i from scenario i unless a scenario index is given, so runs of
+    different models with the same repeat count see the same climates.
+    """
+    if path.endswith('.toml'):
+        import tomllib
+        with open(path, 'rb') as handle:
+            batch = tomllib.load(handle)
+    else:
+        with open(path) as handle:
+            batch = json.load(handle)
+
+    defaults = batch.get('defaults', {})
+    specs = []
+    for entry in batch.get('runs', []):
+        entry = {**defaults, **entry, 'parameters': {**defaults.get('parameters', {}), **entry.get('parameters', {})}}
+        if entry.get('model') not in MODELS:
+            raise ValueError(f"Unknown model in batch: {entry.get('model')}")
+        seed = entry.get('seed')
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        for replica in range(int(entry.get('repeat', 1))):
+            spec = {'model': entry['model'], 'parameters': entry['parameters'], 'seed': seed, 'replica': replica}
+            if 'scenarios' in entry:
+                spec['scenarios'] = entry['scenarios']
+                spec['scenario'] = entry.get('scenario')
+            specs.append(spec)
+    return specs
+
+
+def _run_spec(spec: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+    return run(spec['model'], spec['parameters'], spec['seed'], spec['replica'], spec.get('scenarios'), spec.get('scenario'))
+
+
+def run_batch(specs: t.List[t.Dict[str, t.Any]], processes: int = 1, chunksize: t.Optional[int] = None) -> t.Iterator[t.Dict[str, t.Any]]:
+    """
+    Results of the runs in order, computed across a process pool when processes > 1
+
+    Workers import only this module and the scripts their runs need.
+    """
+    if processes == 1:
+        yield from map(_run_spec, specs)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(specs) / (processes * 4)))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        yield from executor.map(_run_spec, specs, chunksize=chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a batch of holon model simulations without prompting")
+    parser.add_argument('batch', help="JSON or TOML file listing the runs")
+    parser.add_argument('--processes', type=int, default=1, help="Worker processes (0: one per CPU)")
+    parser.add_argument('--output', help="JSON lines file receiving one result per run (default: stdout)")
+    args = parser.parse_args()
+
+    specs = load_batch(args.batch)
+    processes = args.processes or os.cpu_count() or 1
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in run_batch(specs, processes):
+            output.write(json.dumps(result) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import math
+import os
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from holon_models import DEFAULT_PARAMETERS, FAILURE_CAUSES, load_variant
+from holon_models import simulate_super_holon as simulate_replicate
+from holon_random import RandomStreams
+from holon_stats import StepStatistics, merge_statistics
+
+class MonteCarloResults:
+    def __init__(
+        self,
+        steps_survived: np.ndarray,
+        failure_cause: np.ndarray,
+        final_energy: np.ndarray,
+        final_materials: np.ndarray,
+        final_temperature: np.ndarray,
+        statistics: t.Optional[StepStatistics] = None
+    ):
+        """
+        Per-replicate outcome of a Monte Carlo study
+
+        Parameters:
+        - steps_survived: Successful steps before failure or the end of the run
+        - failure_cause: Index into holon_models.FAILURE_CAUSES
+        - final_energy, final_materials: CoreHolon values at the end of the run
+        - final_temperature: Internal temperature, NaN for variants without one
+        - statistics: Step statistics merged over all replicates, when requested
+        """
+        self.steps_survived = steps_survived
+        self.failure_cause = failure_cause
+        self.final_energy = final_energy
+        self.final_materials = final_materials
+        self.final_temperature = final_temperature
+        self.statistics = statistics
+
+    def __len__(self) -> int:
+        return len(self.steps_survived)
+
+    def survival_rate(self) -> float:
+        return float(np.mean(self.failure_cause == FAILURE_CAUSES.index('alive')))
+
+    def failure_counts(self) -> t.Dict[str, int]:
+        counts = np.bincount(self.failure_cause, minlength=len(FAILURE_CAUSES))
+        return {name: int(count) for name, count in zip(FAILURE_CAUSES, counts)}
+
+
+def _run_chunk(
+    variant: str,
+    parameters: t.Dict[str, float],
+    root_seed: int,
+    replicates: range,
+    statistics: t.Optional[t.Callable[[], StepStatistics]] = None,
+    scenarios: t.Optional[str] = None,
+    fused: bool = False
+) -> t.Tuple[np.ndarray, t.Optional[StepStatistics]]:
+    if fused:
+        from holon_engine import simulate_engine
+        simulate = lambda parameters, streams, trace: simulate_engine(variant, parameters, streams, trace)
+    else:
+        module = load_variant(variant)
+        simulate = lambda parameters, streams, trace: simulate_replicate(module, parameters, streams, trace)
+    streams = RandomStreams(root_seed)
+    library = None
+    if scenarios is not None:
+        # Workers map the scenario files once and share their pages
+        from holon_scenarios import open_library
+        library = open_library(scenarios)
+    # One set of aggregators per chunk, so a worker returns O(1) statistics however many replicates it runs
+    chunk_statistics = statistics() if statistics is not None else None
+    results = np.empty((len(replicates), 5))
+    for i, replicate in enumerate(replicates):
+        # Streams depend only on the root seed and the replicate index, not on the worker
+        replicate_streams = streams.child('replica', replicate)
+        if library is not None:
+            replicate_streams = library[replicate].streams(replicate_streams)
+        results[i] = simulate(parameters, replicate_streams, chunk_statistics)
+        if chunk_statistics is not None:
+            chunk_statistics.end_run()
+    return results, chunk_statistics
+
+
+def run_monte_carlo(
+    variant: str,
+    parameters: t.Optional[t.Dict[str, float]] = None,
+    n_replicates: int = 1000,
+    seed: t.Optional[int] = None,
+    processes: t.Optional[int] = None,
+    chunksize: t.Optional[int] = None,
+    statistics: t.Optional[t.Callable[[], StepStatistics]] = None,
+    scenarios: t.Optional[str] = None,
+    fused: bool = False
+) -> MonteCarloResults:
+    """
+    Run n_replicates independent SuperHolons of a variant across a process pool
+
+    Parameters:
+    - variant: Key of holon_models.VARIANTS
+    - parameters: Values for the script inputs, missing ones default to DEFAULT_PARAMETERS
+    - n_replicates: Number of replicates
+    - seed: Root seed of the per-replicate random streams
+    - processes: Number of worker processes, 1 runs in the current process
+    - chunksize: Replicates per submitted task, by default about four tasks per worker
+    - statistics: Picklable factory of the StepStatistics aggregated over every step,
+      e.g. functools.partial(holon_stats.super_holon_statistics, variant)
+    - scenarios: Directory of a holon_scenarios.ScenarioLibrary; replicate i reads
+      its environment from scenario i, so variants compared on the same library
+      see the same climates and offers
+    - fused: Run the replicates on holon_engine.SuperHolonEngine, which follows the
+      scripts exactly on the same streams with a fused step
+    """
+    parameters = {**DEFAULT_PARAMETERS, **(parameters or {})}
+    if scenarios is not None:
+        from holon_scenarios import open_library
+        library = open_library(scenarios)
+        if n_replicates > len(library) or parameters['num_iterations'] > library.n_steps:
+            raise ValueError(f"The scenarios cover {len(library)} replicates of {library.n_steps} steps")
+    root_seed = RandomStreams(seed).root_seed
+    processes = processes or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, math.ceil(n_replicates / (processes * 4)))
+    chunks = [range(start, min(start + chunksize, n_replicates)) for start in range(0, n_replicates, chunksize)]
+
+    if processes == 1:
+        outputs = [_run_chunk(variant, parameters, root_seed, chunk, statistics, scenarios, fused) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(_run_chunk, variant, parameters, root_seed, chunk, statistics, scenarios, fused) for chunk in chunks]
+            outputs = [future.result() for future in futures]
+
+    results = np.concatenate([output[0] for output in outputs]) if outputs else np.empty((0, 5))
+    return MonteCarloResults(
+        steps_survived=results[:, 0].astype(np.int64),
+        failure_cause=results[:, 1].astype(np.int8),
+        final_energy=results[:, 2],
+        final_materials=results[:, 3],
+        final_temperature=results[:, 4],
+        statistics=merge_statistics(output[1] for output in outputs) if statistics is not None else None
+    )
@@ -0,0 +1,466 @@
+import random
+import typing as t
+
+import numpy as np
+
+from holon_checkpoint import MEMORY_DTYPE, RANDOM_HOLONS, RECORD_DTYPE, STATE_FIELDS, SuperHolonSnapshot
+from holon_engine import INITIAL_EXTERNAL_RANGE
+from holon_memory import MemoryHolon
+from holon_models import advance_super_holon
+from holon_random import CounterStream, RandomStreams
+
+# Memory slots per organism unless more are asked for: the scripts' default max_memory_size
+DEFAULT_MEMORY_CAPACITY = 6
+
+# Flags of a memory slot
+DOPAMINE = 1    # feedback_type 'dopamine' with value +reward, otherwise 'pain' with value -reward
+HEALTHY = 2     # outcome_tag 'h', otherwise '-h'
+
+# One MemoryHolon entry: the scripts remember +reward or -reward, so reward and flags give the whole entry
+MEMORY_SLOT_DTYPE = np.dtype([
+    ('reward', '<i2'),
+    ('flags', 'u1'),
+    ('sequence', '<u4'),
+])
+
+# build_super_holon arguments -> row field holding them before the first step
+PARAMETER_FIELDS = {
+    'starting_energy': 'energy',
+    'starting_materials': 'materials',
+    'energy_maintenance_cost': 'energy_maintenance_cost',
+    'reward_cost_percentage': 'reward_cost_percentage',
+    'materials_needed': 'materials_needed',
+    'energy_generated': 'energy_generated',
+    'max_memory_size': 'max_memory_size',
+}
+
+_FIELD_BITS = {name: bit for bit, name in enumerate(STATE_FIELDS)}
+# Row fields shared with RECORD_DTYPE, copied as they are between rows and snapshots
+_RECORD_FIELDS = (*STATE_FIELDS, 'present', 'integral', 'stream_keys', 'stream_positions', 'memory_sequence')
+_RANDOM_STREAM_IDS = {holon: stream_id for stream_id, holon in RANDOM_HOLONS.items()}
+
+
+def organism_dtype(memory_capacity: int = DEFAULT_MEMORY_CAPACITY) -> np.dtype:
+    """
+    Packed row of one organism: the scalar state of a SuperHolonSnapshot record,
+    its stream positions and memory_capacity memory slots in heap order
+    """
+    return np.dtype(
+        [(name, '<f8') for name in STATE_FIELDS]
+        + [
+            ('present', '<u4'),     # bit i: STATE_FIELDS[i] exists in this variant
+            ('integral', '<u4'),    # bit i: STATE_FIELDS[i] is a Python int
+            ('stream_keys', '<u4', (len(RANDOM_HOLONS), 2)),
+            ('stream_positions', '<i8', (len(RANDOM_HOLONS),)),
+            ('counter_streams', 'u1'),  # bit j: RANDOM_HOLONS[j] draws from a CounterStream, else the random module
+            ('n_memory', 'u1'),
+            ('memory_sequence', '<i8'),
+            ('memory', MEMORY_SLOT_DTYPE, (memory_capacity,)),
+        ]
+    )
+
+
+def _view_fields() -> t.Dict[t.Optional[str], t.Dict[str, str]]:
+    # Holon attribute of the SuperHolon (None for the SuperHolon itself) -> {view attribute: row field}
+    fields = {}
+    for name, (holon, attribute) in STATE_FIELDS.items():
+        fields.setdefault(holon, {})[attribute] = name
+    # EnergyHolon keeps its own copy of the conversion parameters of the SuperHolon
+    fields['energy_holon'].update(materials_needed='materials_needed', energy_generated='energy_generated')
+    return fields
+
+
+VIEW_FIELDS = _view_fields()
+
+
+class _Field:
+    # Holon attribute stored in a row field; reading a field the variant lacks raises AttributeError
+    def __init__(self, attribute: str, field: str):
+        self.attribute = attribute
+        self.field = field
+        self.mask = 1 << _FIELD_BITS[field]
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        try:
+            return view._values[self.field]
+        except KeyError:
+            raise AttributeError(self.attribute) from None
+
+    def __set__(self, view, value):
+        values = view._values
+        previous = values.get(self.field)
+        if type(previous) is type(value) and previous == value:
+            # The row already holds it; the activity levels are mostly set to what they were
+            return
+        columns, index, masks = view._columns, view._index, view._masks
+        values[self.field] = value
+        columns[self.field][index] = value
+        present = masks[0] | self.mask
+        integral = masks[1] | self.mask if isinstance(value, int) else masks[1] & ~self.mask
+        # The masks change only when a field appears or switches between int and float
+        if present != masks[0]:
+            masks[0] = present
+            columns['present'][index] = present
+        if integral != masks[1]:
+            masks[1] = integral
+            columns['integral'][index] = integral
+
+
+def _fields(fields: t.Dict[str, str]) -> t.Dict[str, _Field]:
+    return {attribute: _Field(attribute, field) for attribute, field in fields.items()}
+
+
+def _row_state(columns: t.Dict[str, np.ndarray], index: int) -> t.Tuple[t.Dict[str, t.Any], t.List[int]]:
+    # Values of the present fields of a row, as the script had them, and its [present, integral] masks
+    present, integral = columns['present'].item(index), columns['integral'].item(index)
+    values = {}
+    for name, bit in _FIELD_BITS.items():
+        if present >> bit & 1:
+            value = columns[name].item(index)
+            values[name] = int(value) if integral >> bit & 1 else value
+    return values, [present, integral]
+
+
+class _RowView:
+    # The holons of one view graph share the row's values and masks, read once when the graph is made:
+    # reads come from them, writes go to them and through to the row, which always holds the state
+    __slots__ = ('_columns', '_index', '_values', '_masks')
+
+    def __init__(self, columns: t.Dict[str, np.ndarray], index: int, state: t.Optional[tuple] = None):
+        self._columns = columns
+        self._index = index
+        self._values, self._masks = state if state is not None else _row_state(columns, index)
+
+
+def _pack_slot(columns: t.Dict[str, np.ndarray], index: int, slot: int, item: tuple):
+    # One MemoryHolon heap item into one memory slot of a row
+    _, negative_sequence, (reward, feedback_type, feedback_value, outcome_tag) = item
+    dopamine = feedback_type == 'dopamine'
+    if feedback_type not in ('dopamine', 'pain') or feedback_value != (reward if dopamine else -reward):
+        raise ValueError("Memory slots hold dopamine entries of +reward and pain entries of -reward")
+    columns['memory'][index, slot] = (reward, dopamine * DOPAMINE | (outcome_tag == 'h') * HEALTHY, -negative_sequence)
+
+
+def _pack_memory(columns: t.Dict[str, np.ndarray], index: int, heap: list, sequence: int):
+    # MemoryHolon heap items, in heap order, into the memory slots of a row
+    if len(heap) > columns['memory'].shape[1]:
+        raise ValueError(f"The memory holds {len(heap)} entries, the row has {columns['memory'].shape[1]} slots")
+    for slot, item in enumerate(heap):
+        _pack_slot(columns, index, slot, item)
+    columns['n_memory'][index] = len(heap)
+    columns['memory_sequence'][index] = sequence
+
+
+def _unpack_memory(columns: t.Dict[str, np.ndarray], index: int) -> t.Tuple[list, int]:
+    # Heap items and insertion counter for MemoryHolon.restore
+    heap = []
+    for reward, flags, sequence in columns['memory'][index][:columns['n_memory'].item(index)].tolist():
+        if flags & DOPAMINE:
+            entry = (reward, 'dopamine', reward, 'h' if flags & HEALTHY else '-h')
+        else:
+            entry = (reward, 'pain', -reward, 'h' if flags & HEALTHY else '-h')
+        heap.append((abs(reward), -sequence, entry))
+    return heap, columns['memory_sequence'].item(index)
+
+
+class MemoryHolonView(_RowView, MemoryHolon):
+    """
+    MemoryHolon whose entries live in the memory slots of an organism row
+
+    The heap is unpacked when the view is made. After every change only the
+    heap slots holding a different item are packed back, at most the
+    O(log K) slots a push moved, so the row always holds the memory.
+    """
+    __slots__ = ()
+    max_memory_size = _Field('max_memory_size', 'max_memory_size')
+
+    def __init__(self, columns: t.Dict[str, np.ndarray], index: int, state: t.Optional[tuple] = None):
+        super().__init__(columns, index, state)
+        MemoryHolon.restore(self, *_unpack_memory(columns, index))
+
+    def remember(self, reward, feedback_type, feedback_value, core_holon):
+        before = list(self._heap)
+        MemoryHolon.remember(self, reward, feedback_type, feedback_value, core_holon)
+        columns, index, heap = self._columns, self._index, self._heap
+        for slot, item in enumerate(heap):
+            if slot >= len(before) or item is not before[slot]:
+                _pack_slot(columns, index, slot, item)
+        if len(heap) != len(before):
+            columns['n_memory'][index] = len(heap)
+        columns['memory_sequence'][index] = self._sequence
+
+    def restore(self, heap, sequence):
+        MemoryHolon.restore(self, heap, sequence)
+        _pack_memory(self._columns, self._index, self._heap, self._sequence)
+
+
+# View classes by variant module: (SuperHolon view, {holon attribute: (class, row-backed)}, other attributes)
+_view_classes = {}
+
+
+def _views(module) -> t.Tuple[type, t.Dict[str, t.Tuple[type, bool]], t.Dict[str, t.Any]]:
+    views = _view_classes.get(module)
+    if views is not None:
+        return views
+
+    # A throwaway graph shows which holons the variant has and the constants they set in __init__
+    prototype = module.build_super_holon(0, 0, 0, 0, 0, 0, streams=RandomStreams(0))
+    super_fields = VIEW_FIELDS[None]
+    super_view = type(type(prototype).__name__, (_RowView, type(prototype)), {'__slots__': (), **_fields(super_fields)})
+    holons = {}
+    values = {}
+    for attribute, value in vars(prototype).items():
+        if attribute in super_fields:
+            continue
+        if isinstance(value, MemoryHolon):
+            holons[attribute] = (MemoryHolonView, True)
+        elif type(value).__module__ == module.__name__:
+            fields = VIEW_FIELDS.get(attribute)
+            if fields is None:
+                # Holons without state (ActionHolon, PerceptionHolon) are built anew for every view
+                holons[attribute] = (type(value), False)
+                continue
+            constants = {name: constant for name, constant in vars(value).items() if name not in fields and name != 'rng'}
+            namespace = {'__slots__': (), **constants, **_fields(fields)}
+            holons[attribute] = (type(type(value).__name__, (_RowView, type(value)), namespace), True)
+        else:
+            # verbose, trace
+            values[attribute] = value
+    views = _view_classes[module] = (super_view, holons, values)
+    return views
+
+
+def _store_streams(row: np.void, super_holon):
+    # Keys and positions of the counter streams the random holons draw from
+    counter_streams = 0
+    for bit, holon in enumerate(RANDOM_HOLONS.values()):
+        rng = getattr(getattr(super_holon, holon, None), 'rng', None)
+        if isinstance(rng, CounterStream):
+            row['stream_keys'][bit] = rng.key[0]
+            row['stream_positions'][bit] = rng.position
+            counter_streams |= 1 << bit
+    row['counter_streams'] = counter_streams
+
+
+class OrganismTable:
+    def __init__(self, n_organisms: int, memory_capacity: int = DEFAULT_MEMORY_CAPACITY):
+        """
+        Organisms of the SuperHolon variants, one packed row each
+
+        A SuperHolon graph is eight to ten Python objects with a __dict__ each
+        plus a list of tuples for its memory, a few kilobytes per organism. A
+        row holds the same state in organism_dtype(memory_capacity): core
+        values, activity levels, parameters and the homeostasis threshold as
+        in SuperHolonSnapshot records, the keys and positions of the random
+        streams, and the memory heap in fixed-size slots, about 240 bytes in
+        all. Rows of different variants and parameters share one table.
+
+        The script's own classes work on rows through views: view() returns
+        a SuperHolon graph whose holons are subclasses of the variant's holon
+        classes, with every state attribute read from the row once when the
+        view is made and written through to it on every change.
+        Their unchanged methods step the organism in place, so a view follows
+        the script exactly and nothing but the row outlives it.
+
+        Parameters:
+        - n_organisms: Rows of the table, all empty until stored or populated
+        - memory_capacity: Memory slots per row, at least the largest max_memory_size
+        """
+        self.memory_capacity = memory_capacity
+        self.rows = np.zeros(n_organisms, dtype=organism_dtype(memory_capacity))
+        # Column views of rows shared by all views; rows is written in place, never replaced
+        self._columns = {name: self.rows[name] for name in self.rows.dtype.names}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes
+
+    @classmethod
+    def populate(
+        cls,
+        module,
+        n_organisms: int,
+        parameters: t.Dict[str, t.Any],
+        streams: t.Optional[RandomStreams] = None,
+        memory_capacity: t.Optional[int] = None
+    ) -> 'OrganismTable':
+        """
+        Table of n_organisms new organisms of a variant, as its build_super_holon builds them
+
+        One graph is built and packed, then the per-organism parameters and
+        the initial external temperature are written column by column.
+
+        Parameters:
+        - module: Variant module, e.g. holon_models.load_variant('homeostasis')
+        - parameters: build_super_holon arguments, each one value for all organisms or an array of one per organism
+        - streams: Organism i draws stream ID s from row i of streams.batch(n_organisms, s), as the rows of
+          SuperHolonPopulation do; from the random module when None
+        - memory_capacity: Memory slots per row, by default the largest max_memory_size
+
+        Returns:
+        - The populated OrganismTable
+        """
+        columns = {name: np.broadcast_to(np.asarray(value), (n_organisms,)) for name, value in parameters.items()}
+        max_memory_size = int(columns['max_memory_size'].max()) if 'max_memory_size' in columns else DEFAULT_MEMORY_CAPACITY
+        if memory_capacity is None:
+            memory_capacity = max_memory_size
+        elif memory_capacity < max_memory_size:
+            raise ValueError(f"memory_capacity {memory_capacity} is below max_memory_size {max_memory_size}")
+
+        table = cls(n_organisms, memory_capacity)
+        template = module.build_super_holon(**{name: column[0].item() for name, column in columns.items()}, streams=RandomStreams(0))
+        table.rows[:] = table._pack(SuperHolonSnapshot.capture(template))
+        for name, column in columns.items():
+            table.assign(PARAMETER_FIELDS[name], column)
+
+        rows = table.rows
+        rows['stream_positions'] = 0
+        rows['stream_keys'] = 0
+        if streams is not None:
+            # The template drew from counter streams for exactly the random holons of the variant
+            counter_streams = int(rows['counter_streams'][0])
+            for bit, stream_id in enumerate(RANDOM_HOLONS):
+                if counter_streams >> bit & 1:
+                    rows['stream_keys'][:, bit] = streams.batch(n_organisms, stream_id).keys
+        else:
+            rows['counter_streams'] = 0
+        # PerceptionTemperatureHolon draws the external temperature when it is built
+        if int(rows['present'][0]) >> _FIELD_BITS['external_temperature'] & 1:
+            if streams is not None:
+                batch = streams.batch(n_organisms, 'perception_temperature')
+                rows['external_temperature'] = batch.integers(*INITIAL_EXTERNAL_RANGE)
+                rows['stream_positions'][:, list(RANDOM_HOLONS).index('perception_temperature')] = batch.position
+            else:
+                rows['external_temperature'] = [random.randrange(*INITIAL_EXTERNAL_RANGE) for _ in range(n_organisms)]
+        return table
+
+    def assign(self, field: str, values, index=slice(None)):
+        """
+        Write a state field of the selected rows, marking it present and integral when values are integers
+        """
+        rows = self.rows
+        values = np.asarray(values)
+        mask = 1 << _FIELD_BITS[field]
+        rows[field][index] = values
+        rows['present'][index] |= mask
+        if values.dtype.kind in 'iub':
+            rows['integral'][index] |= mask
+        else:
+            rows['integral'][index] &= np.uint32(~mask & 0xFFFFFFFF)
+
+    def _pack(self, snapshot: SuperHolonSnapshot) -> np.ndarray:
+        row = np.zeros((), dtype=self.rows.dtype)
+        record = snapshot.record
+        for name in _RECORD_FIELDS:
+            row[name] = record[name]
+        row['counter_streams'] = record['counter_streams']
+        memory = snapshot.memory
+        if len(memory) > self.memory_capacity:
+            raise ValueError(f"The memory holds {len(memory)} entries, the rows have {self.memory_capacity} slots")
+        dopamine = memory['dopamine'].astype(bool)
+        if not memory['integral_value'].all() or np.any(memory['value'] != np.where(dopamine, memory['reward'], -memory['reward'])):
+            raise ValueError("Memory slots hold dopamine entries of +reward and pain entries of -reward")
+        slots = row['memory'][:len(memory)]
+        slots['reward'] = memory['reward']
+        slots['flags'] = np.where(dopamine, DOPAMINE, 0) | np.where(memory['healthy'].astype(bool), HEALTHY, 0)
+        slots['sequence'] = memory['sequence']
+        row['n_memory'] = len(memory)
+        return row
+
+    def store(self, index, super_holon):
+        """
+        Pack a SuperHolon graph, or a view, into the selected rows; a slice or index array gets copies of it
+
+        Holons drawing from the random module keep drawing from it when viewed; its state is not stored.
+        """
+        self.rows[index] = self._pack(SuperHolonSnapshot.capture(super_holon))
+
+    def snapshot(self, index: int) -> SuperHolonSnapshot:
+        """
+        SuperHolonSnapshot of one row, e.g. to save it, restore it as objects or fork it
+        """
+        row = self.rows[index]
+        record = np.zeros((), dtype=RECORD_DTYPE)
+        for name in _RECORD_FIELDS:
+            record[name] = row[name]
+        record['counter_streams'] = row['counter_streams']
+        n_memory = int(row['n_memory'])
+        record['n_memory'] = n_memory
+        slots = row['memory'][:n_memory]
+        dopamine = (slots['flags'] & DOPAMINE).astype(bool)
+        memory = np.zeros(n_memory, dtype=MEMORY_DTYPE)
+        memory['reward'] = slots['reward']
+        memory['value'] = np.where(dopamine, slots['reward'], -slots['reward'].astype(np.int64))
+        memory['sequence'] = slots['sequence']
+        memory['dopamine'] = dopamine
+        memory['healthy'] = (slots['flags'] & HEALTHY).astype(bool)
+        memory['integral_value'] = 1
+        return SuperHolonSnapshot(record, memory)
+
+    def super_holon(self, index: int, module):
+        """
+        Independent SuperHolon graph of the script's objects with the state of one row
+        """
+        return self.snapshot(index).restore(module)
+
+    def view(self, index: int, module, streams=None):
+        """
+        SuperHolon graph of a variant over one row
+
+        Core, activity, temperature and memory holons and the SuperHolon are
+        views: the script's methods read and change the row. The row is read
+        when the view is made, so write it through this view while the view
+        is in use, not through the table. Random holons
+        draw from streams when given, otherwise from the row's recorded
+        counter streams, or from the random module for rows built without
+        them. Stream positions are written back by run() and store().
+
+        Parameters:
+        - index: Row of the organism
+        - module: Variant module the row was stored or populated from
+        - streams: Per-holon random streams as for build_super_holon
+        """
+        index = int(index)
+        super_view, holons, values = _views(module)
+        state = _row_state(self._columns, index)
+        super_holon = super_view(self._columns, index, state)
+        for attribute, (holon_class, row_backed) in holons.items():
+            stream_id = _RANDOM_STREAM_IDS.get(attribute)
+            rng = None if stream_id is None else self._stream(self.rows[index], stream_id, streams)
+            if row_backed:
+                holon = holon_class(self._columns, index, state)
+                if rng is not None:
+                    holon.rng = rng
+            else:
+                holon = holon_class() if rng is None else holon_class(rng)
+            setattr(super_holon, attribute, holon)
+        for attribute, value in values.items():
+            setattr(super_holon, attribute, value)
+        return super_holon
+
+    @staticmethod
+    def _stream(row: np.void, stream_id: str, streams):
+        if streams is not None:
+            return streams.stream(stream_id)
+        bit = list(RANDOM_HOLONS).index(stream_id)
+        if int(row['counter_streams']) >> bit & 1:
+            return CounterStream(row['stream_keys'][bit], int(row['stream_positions'][bit]))
+        return random
+
+    def run(self, index: int, module, num_iterations: int, trace=None) -> t.Tuple[int, int]:
+        """
+        Step one organism in its row up to num_iterations times, stopping at its first failing step
+
+        Returns:
+        - steps survived, failure cause (index of holon_models.FAILURE_CAUSES)
+        """
+        super_holon = self.view(index, module)
+        super_holon.trace = trace
+        result = advance_super_holon(super_holon, num_iterations)
+        _store_streams(self.rows[index], super_holon)
+        return result
@@ -0,0 +1,166 @@
+import random
+
+import numpy as np
+import typing as t
+
+
+class PAdicNumber:
+    def __init__(self, p: int, digits: np.ndarray):
+        """
+        Fixed-precision p-adic number stored as a little-endian digit array
+
+        digits[..., n] is the coefficient of p^n, so a value is known modulo
+        p^precision. Leading dimensions hold batches: digits of shape
+        (count, precision) are count p-adic numbers handled together.
+
+        Parameters:
+        - p: Prime base
+        - digits: Integer array of digits in 0..p-1, last axis is the precision
+        """
+        self.p = p
+        self.digits = np.asarray(digits, dtype=np.int64)
+
+    @property
+    def precision(self) -> int:
+        return self.digits.shape[-1]
+
+    @classmethod
+    def random(
+        cls,
+        p: int,
+        precision: int = 100,
+        size: t.Optional[int] = None,
+        rng: t.Optional[np.random.Generator] = None
+    ) -> 'PAdicNumber':
+        """
+        Draw uniformly random digits, one value or a batch of size values at once
+
+        Same distribution as generate_p_adic_metadata: every coefficient is
+        uniform in 0..p-1. Without rng the coefficients come from the random
+        module, one randint per digit from p^0 up, exactly as the original drew them.
+        A single value on a counter stream (holon_random.CounterStream) skips
+        its precision draws at once and draws each digit from its position
+        when it is first read, so residue(k) costs k draws.
+        """
+        shape = (precision,) if size is None else (size, precision)
+        if rng is None:
+            digits = [random.randint(0, p-1) for _ in range(int(np.prod(shape)))]
+            return cls(p, np.reshape(digits, shape))
+        if size is None and hasattr(rng, 'split'):
+            return _StreamPAdicNumber(p, precision, rng.split(precision))
+        return cls(p, rng.integers(0, p, size=shape))
+
+    @classmethod
+    def from_int(cls, value: int, p: int, precision: int = 100) -> 'PAdicNumber':
+        """
+        Digits of value modulo p^precision (negative values wrap around as p-adic integers)
+        """
+        value %= p ** precision
+        digits = np.zeros(precision, dtype=np.int64)
+        for n in range(precision):
+            if not value:
+                break
+            value, digits[n] = divmod(value, p)
+        return cls(p, digits)
+
+    def to_int(self) -> int:
+        """
+        Integer in 0..p^precision-1 of a single (non-batched) value
+        """
+        return self.residue(self.precision)
+
+    def residue(self, k: int) -> t.Union[int, np.ndarray]:
+        """
+        Value modulo p^k, read from the lowest k digits only
+
+        Returns a Python int for a single value (exact for any k) and an int64
+        array for a batch, which requires p^k to fit in 64 bits.
+        """
+        k = min(k, self.precision)
+        if self.digits.ndim == 1:
+            value = 0
+            for digit in reversed(self.digits[:k].tolist()):
+                value = value * self.p + digit
+            return value
+        if self.p ** k >= 2 ** 63:
+            raise OverflowError("Batched residues need p^k to fit in int64")
+        powers = self.p ** np.arange(k, dtype=np.int64)
+        return self.digits[..., :k] @ powers
+
+    def truncate(self, k: int) -> 'PAdicNumber':
+        """
+        Reduction modulo p^k, keeping the precision
+        """
+        digits = self.digits.copy()
+        digits[..., k:] = 0
+        return PAdicNumber(self.p, digits)
+
+    def __add__(self, other: 'PAdicNumber') -> 'PAdicNumber':
+        if other.p != self.p or other.precision != self.precision:
+            raise ValueError("Only p-adic numbers with the same base and precision can be added")
+        digits_sum = self.digits + other.digits
+        digits = np.empty(np.broadcast(self.digits, other.digits).shape, dtype=np.int64)
+        carry = 0
+        # The carry beyond the last digit is dropped, as in arithmetic modulo p^precision
+        for n in range(self.precision):
+            column = digits_sum[..., n] + carry
+            digits[..., n] = column % self.p
+            carry = column // self.p
+        return PAdicNumber(self.p, digits)
+
+    def valuation(self) -> t.Union[int, np.ndarray]:
+        """
+        Index of the lowest non-zero digit; precision for zero (valuation at least precision)
+        """
+        nonzero = self.digits != 0
+        valuation = np.where(nonzero.any(axis=-1), np.argmax(nonzero, axis=-1), self.precision)
+        return int(valuation) if valuation.ndim == 0 else valuation
+
+    def norm(self) -> t.Union[float, np.ndarray]:
+        """
+        p-adic absolute value p^-valuation, 0 for values that are zero at this precision
+        """
+        valuation = np.asarray(self.valuation())
+        norm = np.where(valuation < self.precision, float(self.p) ** -valuation.astype(float), 0.0)
+        return float(norm) if norm.ndim == 0 else norm
+
+    def __getitem__(self, index) -> 'PAdicNumber':
+        # Select values from a batch
+        return PAdicNumber(self.p, self.digits[index])
+
+    def __len__(self) -> int:
+        return self.digits.shape[0] if self.digits.ndim > 1 else 1
+
+    def __repr__(self) -> str:
+        if self.digits.ndim == 1:
+            return f"PAdicNumber(p={self.p}, value={self.to_int()})"
+        return f"PAdicNumber(p={self.p}, batch={self.digits.shape[:-1]}, precision={self.precision})"
+
+
+class _StreamPAdicNumber(PAdicNumber):
+    # PAdicNumber.random on a counter stream: digit n is drawn from position n of the stream when first read
+    def __init__(self, p: int, precision: int, stream):
+        self.p = p
+        self._precision = precision
+        self._stream = stream
+        self._drawn = []
+
+    @property
+    def precision(self) -> int:
+        return self._precision
+
+    def _draw(self, k: int) -> t.List[int]:
+        # Same digits as rng.integers(0, p, size=precision) on the stream
+        while len(self._drawn) < k:
+            self._drawn.append(int(self._stream.random() * self.p))
+        return self._drawn[:k]
+
+    @property
+    def digits(self) -> np.ndarray:
+        return np.array(self._draw(self._precision), dtype=np.int64)
+
+    def residue(self, k: int) -> int:
+        value = 0
+        for digit in reversed(self._draw(min(k, self._precision))):
+            value = value * self.p + digit
+        return value
@@ -0,0 +1,275 @@
+import numpy as np
+import typing as t
+
+from holon_engine import MAX_REWARD, MIN_REWARD
+from holon_models import FAILURE_CAUSES
+from holon_random import StreamBatch
+
+# Failure causes recorded per organism, coded as in holon_montecarlo
+ALIVE = FAILURE_CAUSES.index('alive')
+NO_VALID_REWARD = FAILURE_CAUSES.index('no_valid_reward')
+DEPLETED = FAILURE_CAUSES.index('depleted')
+
+
+class SuperHolonPopulation:
+    def __init__(
+        self,
+        n_organisms: int,
+        starting_energy: float,
+        starting_materials: float,
+        energy_maintenance_cost: float,
+        reward_cost_percentage: float,
+        materials_needed: float,
+        energy_generated: float,
+        max_memory_size: int = 6,
+        num_rewards: int = 6,
+        rng: t.Union[np.random.Generator, StreamBatch, None] = None
+    ):
+        """
+        Struct-of-arrays version of the memory and energy SuperHolon
+
+        Every organism follows the same rules as SuperHolon.simulate_step in
+        "Holon Q+ Model memory and energy.py": perceive -> act -> maintenance ->
+        modulate -> dispose/convert/dispose -> remember. Instead of seven holon
+        objects per organism, the state of N organisms lives in flat arrays and
+        one step advances all organisms that are still alive.
+
+        Parameters:
+        - n_organisms: Number of organisms simulated together
+        - starting_energy, starting_materials: Initial CoreHolon values
+        - energy_maintenance_cost: Energy spent by every organism at each step
+        - reward_cost_percentage: Energy cost of a reward as a fraction of its value
+        - materials_needed, energy_generated: EnergyHolon conversion parameters
+        - max_memory_size: Number of entries kept by each organism's MemoryHolon
+        - num_rewards: Number of rewards offered by PerceptionHolon at each step
+        - rng: NumPy generator used for the reward draws, or a StreamBatch with one
+          row per organism so each organism draws from its own stream
+        """
+        self.n_organisms = n_organisms
+        self.energy_maintenance_cost = energy_maintenance_cost
+        self.reward_cost_percentage = reward_cost_percentage
+        self.materials_needed = materials_needed
+        self.energy_generated = energy_generated
+        self.max_memory_size = max_memory_size
+        self.num_rewards = num_rewards
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        # CoreHolon values
+        self.energy = np.full(n_organisms, starting_energy, dtype=float)
+        self.materials = np.full(n_organisms, starting_materials, dtype=float)
+
+        # Activity levels of the waste, energy and energy disposal holons
+        self.waste_level = np.ones(n_organisms)
+        self.energy_level = np.ones(n_organisms)
+        self.energy_disposal_level = np.ones(n_organisms)
+
+        # MemoryHolon entries: reward, feedback value, outcome tag ('h' is True) and insertion order
+        shape = (n_organisms, max_memory_size)
+        self.memory_reward = np.zeros(shape, dtype=np.int64)
+        self.memory_value = np.zeros(shape)
+        self.memory_tag = np.zeros(shape, dtype=bool)
+        self.memory_order = np.full(shape, -1, dtype=np.int64)
+        self.memory_used = np.zeros(shape, dtype=bool)
+
+        # Running dopamine - pain sum per reward value, the score used by make_decision
+        self.memory_score = np.zeros((n_organisms, MAX_REWARD + 1))
+
+        # Survival bookkeeping
+        self.alive = np.ones(n_organisms, dtype=bool)
+        self.steps_survived = np.zeros(n_organisms, dtype=np.int64)
+        self.failure_cause = np.full(n_organisms, ALIVE, dtype=np.int8)
+        self.step_count = 0
+
+    def perceive(self, n: int, idx: t.Optional[np.ndarray] = None) -> t.Tuple[np.ndarray, np.ndarray]:
+        """
+        Draw the rewards offered to n organisms and their energy costs
+
+        idx names the organisms when rng is a StreamBatch, which draws from their rows.
+        """
+        size = (n, self.num_rewards)
+        if isinstance(self.rng, StreamBatch):
+            rewards = self.rng.integers(MIN_REWARD, MAX_REWARD + 1, size=size, rows=idx)
+        else:
+            rewards = self.rng.integers(MIN_REWARD, MAX_REWARD + 1, size=size)
+        energy_costs = self.reward_cost_percentage * rewards
+        return rewards, energy_costs
+
+    def make_decision(
+        self,
+        idx: np.ndarray,
+        rewards: np.ndarray,
+        energy_costs: np.ndarray
+    ) -> np.ndarray:
+        """
+        Choose one reward per organism, or -1 when no reward is affordable
+
+        Like SuperHolon.make_decision, the first affordable reward with the
+        highest remembered dopamine - pain score wins.
+        """
+        valid = energy_costs <= self.energy[idx, None]
+        scores = np.take_along_axis(self.memory_score[idx], rewards, axis=1)
+        scores = np.where(valid, scores, -np.inf)
+        chosen_index = np.argmax(scores, axis=1)
+        chosen_index[~valid.any(axis=1)] = -1
+        return chosen_index
+
+    def modulate(self, idx: np.ndarray):
+        """
+        CoreHolon.modulate with hard thresholds for the organisms in idx
+        """
+        energy = self.energy[idx]
+        materials = self.materials[idx]
+        low_energy = energy < 30
+        high_energy = ~low_energy & (energy > 70)
+
+        self.energy_level[idx] = np.where(low_energy, 2, np.where(high_energy, 0.5, 1))
+        self.energy_disposal_level[idx] = np.where(low_energy, 0.5, np.where(high_energy, 2, 1))
+        self.waste_level[idx] = np.where(materials < 30, 0.5, np.where(materials > 70, 2, 1))
+
+    def remember(self, idx: np.ndarray, rewards: np.ndarray, feedback_values: np.ndarray):
+        """
+        MemoryHolon.remember for the organisms in idx
+
+        Entries are kept unsorted; eviction drops the entry with the smallest
+        |feedback_value|, and among ties the most recent one, which is the entry
+        the scalar sort-then-pop would drop.
+        """
+        if self.max_memory_size == 0:
+            # The scalar memory drops every entry when it has no room
+            return
+        energy = self.energy[idx]
+        materials = self.materials[idx]
+        is_dopamine = feedback_values > 0
+        in_band = (30 <= energy) & (energy <= 70) & (30 <= materials) & (materials <= 70)
+        outcome_tag = np.where(is_dopamine, in_band, ~((energy < 30) | (materials < 30)))
+
+        used = self.memory_used[idx]
+        magnitude = np.where(used, np.abs(self.memory_value[idx]), np.inf)
+        has_free_slot = ~used.all(axis=1)
+
+        # When memory is full, the weakest and newest entry is the eviction candidate
+        weakest = magnitude.min(axis=1)
+        candidates = used & (magnitude == weakest[:, None])
+        evicted_slot = np.argmax(np.where(candidates, self.memory_order[idx], -1), axis=1)
+        slot = np.where(has_free_slot, np.argmin(used, axis=1), evicted_slot)
+        stored = has_free_slot | (np.abs(feedback_values) > weakest)
+
+        idx, slot = idx[stored], slot[stored]
+        rewards, feedback_values, outcome_tag = rewards[stored], feedback_values[stored], outcome_tag[stored]
+
+        # Remove the evicted entry from the score table before overwriting its slot
+        replaced = self.memory_used[idx, slot]
+        old_reward = self.memory_reward[idx, slot]
+        old_value = self.memory_value[idx, slot]
+        self.memory_score[idx[replaced], old_reward[replaced]] -= np.abs(old_value[replaced])
+
+        self.memory_reward[idx, slot] = rewards
+        self.memory_value[idx, slot] = feedback_values
+        self.memory_tag[idx, slot] = outcome_tag
+        self.memory_order[idx, slot] = self.step_count
+        self.memory_used[idx, slot] = True
+
+        # Dopamine adds its value and pain subtracts its (negative) value, so both add |value|
+        self.memory_score[idx, rewards] += np.abs(feedback_values)
+
+    def simulate_step(self, rewards: t.Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Advance every living organism by one step
+
+        Parameters:
+        - rewards: Optional (n_organisms, num_rewards) array of offered rewards,
+          used instead of drawing new ones (e.g. to replay a scalar run)
+
+        Returns:
+        - The boolean mask of organisms still alive after the step
+        """
+        idx = np.flatnonzero(self.alive)
+        if idx.size == 0:
+            return self.alive
+
+        if rewards is None:
+            rewards, energy_costs = self.perceive(idx.size, idx)
+        else:
+            rewards = np.asarray(rewards)[idx]
+            energy_costs = self.reward_cost_percentage * rewards
+
+        chosen_index = self.make_decision(idx, rewards, energy_costs)
+        no_choice = chosen_index < 0
+        self._retire(idx[no_choice], NO_VALID_REWARD)
+        idx, rewards, energy_costs, chosen_index = (
+            idx[~no_choice], rewards[~no_choice], energy_costs[~no_choice], chosen_index[~no_choice]
+        )
+
+        rows = np.arange(idx.size)
+        reward = rewards[rows, chosen_index]
+        energy_cost = energy_costs[rows, chosen_index]
+
+        # ActionHolon.act and the maintenance cost
+        # Two subtractions, as the scalar does; one of their sum can round differently
+        self.energy[idx] -= energy_cost
+        self.energy[idx] -= self.energy_maintenance_cost
+        self.materials[idx] += reward
+
+        self.modulate(idx)
+
+        # WasteHolon.dispose
+        materials = self.materials[idx]
+        materials = np.where(materials > 70, materials - self.waste_level[idx] * 5, materials)
+
+        # EnergyHolon.convert
+        energy = self.energy[idx]
+        level = self.energy_level[idx]
+        materials_needed = self.materials_needed * level
+        converts = materials >= materials_needed
+        materials = np.where(converts, materials - materials_needed, materials)
+        energy = np.where(converts, energy + self.energy_generated * level, energy)
+
+        # EnergyDisposalHolon.dispose
+        energy = np.where(energy > 70, energy - self.energy_disposal_level[idx] * 5, energy)
+
+        self.energy[idx] = energy
+        self.materials[idx] = materials
+
+        was_successful = (30 <= energy) & (energy <= 70) & (30 <= materials) & (materials <= 70)
+        feedback_values = np.where(was_successful, reward, -reward)
+        self.remember(idx, reward, feedback_values)
+
+        survived = (energy > 0) & (materials > 0)
+        self.steps_survived[idx[survived]] += 1
+        self._retire(idx[~survived], DEPLETED)
+
+        self.step_count += 1
+        return self.alive
+
+    def run(self, num_iterations: int) -> np.ndarray:
+        """
+        Run up to num_iterations steps, stopping early once every organism has failed
+
+        Returns:
+        - The number of steps each organism survived
+        """
+        for _ in range(num_iterations):
+            if not self.simulate_step().any():
+                break
+        return self.steps_survived
+
+    def memory(self, i: int) -> t.List[t.Tuple[int, str, float, str]]:
+        """
+        Memory of organism i in the (reward, feedback_type, feedback_value, outcome_tag)
+        format and order of MemoryHolon.memory
+        """
+        slots = np.flatnonzero(self.memory_used[i])
+        slots = sorted(slots, key=lambda s: (-abs(self.memory_value[i, s]), self.memory_order[i, s]))
+        return [
+            (
+                int(self.memory_reward[i, s]),
+                'dopamine' if self.memory_value[i, s] > 0 else 'pain',
+                float(self.memory_value[i, s]),
+                'h' if self.memory_tag[i, s] else '-h'
+            )
+            for s in slots
+        ]
+
+    def _retire(self, idx: np.ndarray, cause: int):
+        self.alive[idx] = False
+        self.failure_cause[idx] = cause
@@ -0,0 +1,200 @@
+import json
+import time
+import tracemalloc
+import typing as t
+
+# Methods instrumented on each holon: holon attribute -> method names; None is the profiled object itself
+SUPER_HOLON_METHODS = {
+    None: ('simulate_step', 'make_decision', 'record_trace'),
+    'perception_holon': ('perceive',),
+    'action_holon': ('act',),
+    'core_holon': ('modulate',),
+    'waste_holon': ('dispose',),
+    'energy_holon': ('convert',),
+    'energy_disposal_holon': ('dispose',),
+    'memory_holon': ('remember', 'feedback_sums'),
+    'temperature_Holon': ('rise_temperature',),
+    'perception_temperature_Holon': ('affect_core_holon', 'change_temperature'),
+}
+HOLONETIC_METHODS = {
+    None: ('update', 'compute_delta_state', 'trigger_goal_transition', 'record_trace'),
+    'cluster_kernel': ('__call__',),
+}
+POPULATION_METHODS = {
+    None: ('simulate_step', 'perceive', 'make_decision', 'modulate', 'remember'),
+}
+
+# [traced memory at the call, highest traced memory seen in it] of every traced call in progress, of all profilers
+_memory_frames = []
+# Attached profilers tracing memory; the first one starts tracemalloc unless it was running, the last one stops it
+_memory_tracers = [0, False]
+
+
+class HolonProfiler:
+    def __init__(
+        self,
+        methods: t.Dict[t.Optional[str], t.Tuple[str, ...]] = SUPER_HOLON_METHODS,
+        trace_memory: bool = True,
+        json_path: t.Optional[str] = None
+    ):
+        """
+        Per-holon call counts, cumulative time and memory allocated by a simulation
+
+        attach() shadows the listed methods with timing wrappers set on the
+        instances and detach() removes them again, so a model that is not
+        profiled runs its plain methods with no check on the hot path.
+        Times are inclusive: make_decision contains perceive.
+
+        With trace_memory, tracemalloc follows the calls. peak_bytes adds up,
+        per call, how far the traced memory rose above its level at the call:
+        memory allocated and freed inside the call counts too, so a step
+        building a temporary list reports it even though nothing survives.
+        net_bytes adds up what the calls left allocated. Both are inclusive
+        like the times. tracemalloc is started by attach() when it is not
+        running and stopped by detach(), and slows every allocation while on.
+
+        A wrapper costs about 1 us per call, several more with memory
+        tracing, which is included in the times of the enclosing methods.
+
+        Parameters:
+        - methods: Holon attribute -> method names to instrument
+        - trace_memory: Also record peak_bytes and net_bytes
+        - json_path: File receiving the summary when used as a context manager
+        """
+        self.methods = methods
+        self.trace_memory = trace_memory
+        self.json_path = json_path
+        # 'holon.method' -> [calls, nanoseconds, peak bytes, net bytes]
+        self.stats = {}
+        self._attached = []
+        self._tracing = False
+
+    def _wrap(self, name: str, method: t.Callable) -> t.Callable:
+        stats = self.stats.setdefault(name, [0, 0, 0, 0])
+        clock = time.perf_counter_ns
+
+        if not self.trace_memory:
+            def timed(*args, **kwargs):
+                start = clock()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    stats[1] += clock() - start
+                    stats[0] += 1
+
+            return timed
+
+        frames = _memory_frames
+        traced_memory = tracemalloc.get_traced_memory
+        reset_peak = tracemalloc.reset_peak
+
+        def timed(*args, **kwargs):
+            # The peak is reset for this call, so the calls it is nested in take the peak so far first
+            current, peak = traced_memory()
+            for frame in frames:
+                frame[1] = max(frame[1], peak)
+            reset_peak()
+            frame = [current, current]
+            frames.append(frame)
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats[1] += clock() - start
+                current, peak = traced_memory()
+                frames.pop()
+                peak = max(frame[1], peak)
+                for outer in frames:
+                    outer[1] = max(outer[1], peak)
+                stats[2] += peak - frame[0]
+                stats[3] += current - frame[0]
+                stats[0] += 1
+
+        return timed
+
+    def attach(self, root) -> 'HolonProfiler':
+        if self._attached:
+            raise RuntimeError("Profiler is already attached")
+        if self.trace_memory:
+            if not _memory_tracers[0] and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _memory_tracers[1] = True
+            _memory_tracers[0] += 1
+            self._tracing = True
+        for attribute, names in self.methods.items():
+            holon = root if attribute is None else getattr(root, attribute, None)
+            if holon is None:
+                continue
+            label = type(root).__name__ if attribute is None else attribute
+            for name in names:
+                if name == '__call__':
+                    # Special methods are looked up on the type, so calls are routed through a wrapper holder
+                    setattr(root, attribute, _CallableHolon(holon, self._wrap(f"{label}.{name}", holon.__call__)))
+                    self._attached.append((root, attribute, holon))
+                elif callable(getattr(holon, name, None)):
+                    # Methods come from the class and are shadowed; attributes of the instance or module are replaced
+                    original = vars(holon).get(name) if hasattr(holon, '__dict__') else None
+                    setattr(holon, name, self._wrap(f"{label}.{name}", getattr(holon, name)))
+                    self._attached.append((holon, name, original))
+        return self
+
+    def detach(self):
+        for owner, name, original in reversed(self._attached):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._attached = []
+        if self._tracing:
+            self._tracing = False
+            _memory_tracers[0] -= 1
+            if not _memory_tracers[0] and _memory_tracers[1]:
+                tracemalloc.stop()
+                _memory_tracers[1] = False
+
+    def reset(self):
+        for stats in self.stats.values():
+            stats[:] = [0, 0, 0, 0]
+
+    def summary(self) -> t.Dict[str, t.Dict[str, float]]:
+        return {
+            name: {
+                'calls': calls,
+                'total_ns': nanoseconds,
+                'mean_ns': nanoseconds / calls if calls else 0.0,
+                'peak_bytes': peak_bytes,
+                'net_bytes': net_bytes,
+            }
+            for name, (calls, nanoseconds, peak_bytes, net_bytes) in self.stats.items()
+        }
+
+    def to_json(self, path: t.Optional[str] = None) -> str:
+        """
+        JSON summary, also written to path when given
+        """
+        text = json.dumps(self.summary(), indent=2)
+        if path is not None:
+            with open(path, 'w') as handle:
+                handle.write(text)
+        return text
+
+    def __enter__(self) -> 'HolonProfiler':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detach()
+        if self.json_path is not None:
+            self.to_json(self.json_path)
+
+
+class _CallableHolon:
+    # Stands in for a callable holon (e.g. a cluster kernel) while it is profiled
+    def __init__(self, holon, timed_call: t.Callable):
+        self._holon = holon
+        self._timed_call = timed_call
+
+    def __call__(self, *args, **kwargs):
+        return self._timed_call(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._holon, name)
@@ -0,0 +1,467 @@
+import hashlib
+import itertools
+import secrets
+import typing as t
+
+if t.TYPE_CHECKING:
+    import numpy as np
+
+# NumPy is imported by array draws and large refills only: the first refills of scalar streams,
+# as the SuperHolon variants use them, run on the pure-integer Philox below, so short runs and
+# short-lived streams start without loading NumPy
+
+# Philox4x32-10 constants (Salmon et al., "Parallel random numbers: as easy as 1, 2, 3")
+PHILOX_M0 = 0xD2511F53
+PHILOX_M1 = 0xCD9E8D57
+PHILOX_W0 = 0x9E3779B9
+PHILOX_W1 = 0xBB67AE85
+PHILOX_ROUNDS = 10
+
+_MASK32 = 0xFFFFFFFF
+
+# numpy.random.SeedSequence constants, whose keys stream_key reproduces without NumPy
+_POOL_SIZE = 4
+_INIT_A = 0x43B0D7E5
+_MULT_A = 0x931E8875
+_INIT_B = 0x8B51F9DD
+_MULT_B = 0x58F38DED
+_MIX_MULT_L = 0xCA01F9DD
+_MIX_MULT_R = 0x4973F715
+_XSHIFT = 16
+
+# Doubles drawn per Philox block: each block yields 4 x 32 bits, two words per 53-bit double
+DRAWS_PER_BLOCK = 2
+
+# Largest block of row keys computed without NumPy, whose per-call overhead dominates small blocks
+_SCALAR_ROWS = 64
+# A young stream refills _SCALAR_BLOCK draws at a time in plain integers, whose cost is per draw,
+# so short runs compute few draws they never read; after _SCALAR_DRAWS its refills come from NumPy
+_SCALAR_BLOCK = 8
+_SCALAR_DRAWS = 128
+
+
+def philox4x32(counter: 'np.ndarray', key: 'np.ndarray', rounds: int = PHILOX_ROUNDS) -> 'np.ndarray':
+    """
+    Philox4x32 block function, vectorized over any number of counters and keys
+
+    Parameters:
+    - counter: (..., 4) uint32 counters
+    - key: (..., 2) uint32 keys, broadcast against the counters
+
+    Returns:
+    - (..., 4) uint32 random words
+    """
+    import numpy as np
+    counter = np.asarray(counter, dtype=np.uint32)
+    key = np.asarray(key, dtype=np.uint32)
+    shape = np.broadcast_shapes(counter.shape[:-1], key.shape[:-1])
+    c0, c1, c2, c3 = (np.broadcast_to(counter[..., i], shape).astype(np.uint64) for i in range(4))
+    k0 = np.broadcast_to(key[..., 0], shape).astype(np.uint32)
+    k1 = np.broadcast_to(key[..., 1], shape).astype(np.uint32)
+    m0, m1, w0, w1 = np.uint64(PHILOX_M0), np.uint64(PHILOX_M1), np.uint32(PHILOX_W0), np.uint32(PHILOX_W1)
+    mask, shift = np.uint64(_MASK32), np.uint64(32)
+
+    with np.errstate(over='ignore'):
+        for _ in range(rounds):
+            product0 = m0 * c0
+            product1 = m1 * c2
+            c0, c1, c2, c3 = (
+                (product1 >> shift) ^ c1 ^ k0.astype(np.uint64),
+                product1 & mask,
+                (product0 >> shift) ^ c3 ^ k1.astype(np.uint64),
+                product0 & mask,
+            )
+            k0 = k0 + w0
+            k1 = k1 + w1
+
+    return np.stack([c0, c1, c2, c3], axis=-1).astype(np.uint32)
+
+
+def _id_to_int(component_id: t.Union[str, int]) -> int:
+    if isinstance(component_id, str):
+        return int.from_bytes(hashlib.blake2b(component_id.encode(), digest_size=4).digest(), 'little')
+    return int(component_id)
+
+
+def _uint32_words(value: int) -> t.List[int]:
+    # Little-endian 32-bit words of a non-negative integer, at least one, as SeedSequence splits them
+    words = [value & _MASK32]
+    value >>= 32
+    while value:
+        words.append(value & _MASK32)
+        value >>= 32
+    return words
+
+
+def _seed_sequence_state(entropy: int, spawn_key: t.Tuple[int, ...], n_words: int) -> t.Tuple[int, ...]:
+    # numpy.random.SeedSequence(entropy, spawn_key=spawn_key).generate_state(n_words) in plain integers
+    hash_const = _INIT_A
+
+    def hashmix(value: int) -> int:
+        nonlocal hash_const
+        value ^= hash_const
+        hash_const = hash_const * _MULT_A & _MASK32
+        value = value * hash_const & _MASK32
+        return value ^ value >> _XSHIFT
+
+    def mix(x: int, y: int) -> int:
+        result = (_MIX_MULT_L * x - _MIX_MULT_R * y) & _MASK32
+        return result ^ result >> _XSHIFT
+
+    run_entropy = _uint32_words(entropy)
+    spawn_entropy = [word for value in spawn_key for word in _uint32_words(value)]
+    if spawn_entropy and len(run_entropy) < _POOL_SIZE:
+        run_entropy += [0] * (_POOL_SIZE - len(run_entropy))
+    entropy_words = run_entropy + spawn_entropy
+
+    pool = [hashmix(entropy_words[i] if i < len(entropy_words) else 0) for i in range(_POOL_SIZE)]
+    for i_src in range(_POOL_SIZE):
+        for i_dst in range(_POOL_SIZE):
+            if i_src != i_dst:
+                pool[i_dst] = mix(pool[i_dst], hashmix(pool[i_src]))
+    for word in entropy_words[_POOL_SIZE:]:
+        for i_dst in range(_POOL_SIZE):
+            pool[i_dst] = mix(pool[i_dst], hashmix(word))
+
+    hash_const = _INIT_B
+    state = []
+    for value in itertools.islice(itertools.cycle(pool), n_words):
+        value ^= hash_const
+        hash_const = hash_const * _MULT_B & _MASK32
+        value = value * hash_const & _MASK32
+        state.append(value ^ value >> _XSHIFT)
+    return tuple(state)
+
+
+def stream_key(root_seed: int, *ids: t.Union[str, int]) -> t.Tuple[int, int]:
+    """
+    Philox key of the stream identified by ids under root_seed, as two 32-bit integers
+
+    Equal to numpy.random.SeedSequence(root_seed, spawn_key=ids).generate_state(2), computed without NumPy.
+    """
+    return _seed_sequence_state(int(root_seed), tuple(_id_to_int(i) for i in ids), 2)
+
+
+def row_keys(base_key: t.Sequence[int], n_rows: int) -> 'np.ndarray':
+    """
+    Keys of n_rows sub-streams, one Philox block per row hashed from the base key
+    """
+    import numpy as np
+    if n_rows <= _SCALAR_ROWS:
+        round_keys = _round_keys(*(int(word) for word in base_key))
+        keys = [_philox4x32_scalar(row & _MASK32, row >> 32, 0x5EED, 0, round_keys)[:2] for row in range(n_rows)]
+        return np.array(keys, dtype=np.uint32).reshape(n_rows, 2)
+    rows = np.arange(n_rows, dtype=np.uint64)
+    counter = np.zeros((n_rows, 4), dtype=np.uint32)
+    counter[:, 0] = rows & np.uint64(_MASK32)
+    counter[:, 1] = rows >> np.uint64(32)
+    counter[:, 2] = 0x5EED  # Separates key derivation from draws, which use counter[2] = 0
+    return philox4x32(counter, np.asarray(base_key, dtype=np.uint32))[:, :2]
+
+
+def uniform_block(keys: 'np.ndarray', position: int, n_draws: int) -> 'np.ndarray':
+    """
+    Doubles in [0, 1) at positions position..position+n_draws-1 of each keyed stream
+
+    Any position can be computed directly, which is what makes skip-ahead free.
+
+    Parameters:
+    - keys: (n_rows, 2) uint32 keys
+
+    Returns:
+    - (n_rows, n_draws) array
+    """
+    import numpy as np
+    first = position // DRAWS_PER_BLOCK
+    last = (position + n_draws - 1) // DRAWS_PER_BLOCK
+    blocks = np.arange(first, last + 1, dtype=np.uint64)
+    counter = np.zeros((len(blocks), 4), dtype=np.uint32)
+    counter[:, 0] = blocks & np.uint64(_MASK32)
+    counter[:, 1] = blocks >> np.uint64(32)
+
+    words = philox4x32(counter[None, :, :], keys[:, None, :]).astype(np.uint64)
+    # 27 + 26 high bits of two words make one 53-bit double
+    doubles = ((words[..., 0::2] >> np.uint64(5)) * np.uint64(67108864) + (words[..., 1::2] >> np.uint64(6)))
+    doubles = doubles.reshape(len(keys), -1) * (1.0 / 9007199254740992.0)
+    offset = position - first * DRAWS_PER_BLOCK
+    return doubles[:, offset:offset + n_draws]
+
+
+def _round_keys(k0: int, k1: int) -> t.Tuple[t.Tuple[int, int], ...]:
+    # Keys of the PHILOX_ROUNDS rounds, the same for every block of a stream
+    keys = []
+    for _ in range(PHILOX_ROUNDS):
+        keys.append((k0, k1))
+        k0 = (k0 + PHILOX_W0) & _MASK32
+        k1 = (k1 + PHILOX_W1) & _MASK32
+    return tuple(keys)
+
+
+def _philox4x32_scalar(c0: int, c1: int, c2: int, c3: int, round_keys: t.Tuple[t.Tuple[int, int], ...]) -> t.Tuple[int, int, int, int]:
+    # philox4x32 for one block in plain integers, cheaper than NumPy for a few blocks
+    for k0, k1 in round_keys:
+        product0 = PHILOX_M0 * c0
+        product1 = PHILOX_M1 * c2
+        c0, c1, c2, c3 = (product1 >> 32) ^ c1 ^ k0, product1 & _MASK32, (product0 >> 32) ^ c3 ^ k1, product0 & _MASK32
+    return c0, c1, c2, c3
+
+
+def _uniform_block_scalar(round_keys: t.Tuple[t.Tuple[int, int], ...], position: int, n_draws: int) -> t.List[float]:
+    # Same draws as uniform_block for one key, given by its _round_keys
+    first = position // DRAWS_PER_BLOCK
+    last = (position + n_draws - 1) // DRAWS_PER_BLOCK
+    draws = []
+    for block in range(first, last + 1):
+        c0, c1, c2, c3 = _philox4x32_scalar(block & 0xFFFFFFFF, block >> 32, 0, 0, round_keys)
+        draws.append(((c0 >> 5) * 67108864 + (c1 >> 6)) * (1.0 / 9007199254740992.0))
+        draws.append(((c2 >> 5) * 67108864 + (c3 >> 6)) * (1.0 / 9007199254740992.0))
+    offset = position - first * DRAWS_PER_BLOCK
+    return draws[offset:offset + n_draws]
+
+
+def _normal_from_uniforms(uniforms: 'np.ndarray') -> 'np.ndarray':
+    # Box-Muller on pairs of uniforms; 1 - u keeps the logarithm finite
+    import numpy as np
+    u1, u2 = uniforms[..., 0::2], uniforms[..., 1::2]
+    return np.sqrt(-2.0 * np.log1p(-u1)) * np.cos(2.0 * np.pi * u2)
+
+
+class CounterStream:
+    def __init__(self, key: t.Sequence[int], position: int = 0, block_size: int = 512):
+        """
+        Single counter-based random stream
+
+        Offers the random-module calls used by the holons (random, randint,
+        randrange, uniform, choice) and the NumPy-style calls used by the
+        models (integers, normal, uniforms). Draws are fetched in blocks and
+        every draw consumes one position, so seek/advance jump exactly.
+        Only the NumPy-style calls import NumPy.
+
+        Parameters:
+        - key: Philox key of the stream, two 32-bit words
+        - position: Index of the next draw
+        - block_size: Draws fetched per refill of the buffer
+        """
+        self._key_words = tuple(int(word) for word in key)
+        self._round_keys = None
+        self._scalar_draws = 0
+        self.block_size = block_size
+        self._buffer = []
+        self._buffer_start = 0
+        self._index = 0
+        self.seek(position)
+
+    @property
+    def key(self) -> 'np.ndarray':
+        # (1, 2) uint32 key, as uniform_block takes it
+        import numpy as np
+        return np.array([self._key_words], dtype=np.uint32)
+
+    @property
+    def position(self) -> int:
+        return self._buffer_start + self._index
+
+    def seek(self, position: int):
+        # The buffer is refilled on the next draw, so seeking and creating streams cost no Philox work
+        self._buffer = []
+        self._buffer_start = position
+        self._index = 0
+
+    def preload(self, draws: t.List[float]):
+        """
+        Use draws already computed for the current position, e.g. by one uniform_block call for many streams
+        """
+        self._buffer_start = self.position
+        self._buffer = draws
+        self._index = 0
+
+    def _refill(self):
+        self._buffer_start = self.position
+        # Plain integers for the first few small refills, so short-lived streams never import NumPy;
+        # past them a long stream imports it once, cheaper than the per-draw cost of the scalar Philox
+        if self._scalar_draws < _SCALAR_DRAWS:
+            if self._round_keys is None:
+                self._round_keys = _round_keys(*self._key_words)
+            self._buffer = _uniform_block_scalar(self._round_keys, self._buffer_start, _SCALAR_BLOCK)
+            self._scalar_draws += _SCALAR_BLOCK
+        else:
+            # NumPy blocks grow up to block_size, so their per-call overhead is paid rarely
+            size = min(self.block_size, max(_SCALAR_DRAWS, 2 * len(self._buffer)))
+            self._buffer = uniform_block(self.key, self._buffer_start, size)[0].tolist()
+        self._index = 0
+
+    def advance(self, n_draws: int):
+        """
+        Skip the next n_draws draws
+        """
+        if 0 <= self._index + n_draws < len(self._buffer):
+            self._index += n_draws
+        else:
+            self.seek(self.position + n_draws)
+
+    def split(self, n_draws: int) -> 'CounterStream':
+        """
+        A stream over the next n_draws draws, which this stream skips
+
+        Draws nothing: positions of the split stream that are never read are never computed.
+        """
+        stream = CounterStream(self._key_words, self.position, self.block_size)
+        self.advance(n_draws)
+        return stream
+
+    def uniforms(self, n_draws: int) -> 'np.ndarray':
+        """
+        The next n_draws doubles in [0, 1) as one array
+
+        Served from the buffer as the scalar calls are; only draws beyond a
+        full refill are computed in one uniform_block call.
+        """
+        import numpy as np
+        draws = np.empty(n_draws)
+        filled = 0
+        while filled < n_draws:
+            if self._index == len(self._buffer):
+                if n_draws - filled > self.block_size:
+                    draws[filled:] = uniform_block(self.key, self.position, n_draws - filled)[0]
+                    self.seek(self.position + n_draws - filled)
+                    break
+                self._refill()
+            taken = min(n_draws - filled, len(self._buffer) - self._index)
+            draws[filled:filled + taken] = self._buffer[self._index:self._index + taken]
+            self._index += taken
+            filled += taken
+        return draws
+
+    def random(self) -> float:
+        if self._index == len(self._buffer):
+            self._refill()
+        value = self._buffer[self._index]
+        self._index += 1
+        return value
+
+    def randint(self, a: int, b: int) -> int:
+        # Inclusive bounds, as random.randint
+        return a + int(self.random() * (b - a + 1))
+
+    def randrange(self, start, stop=None, step=1) -> int:
+        if stop is None:
+            start, stop = 0, start
+        start, stop, step = int(start), int(stop), int(step)
+        n = (stop - start + step - (1 if step > 0 else -1)) // step
+        if n <= 0:
+            raise ValueError(f"empty range for randrange({start}, {stop}, {step})")
+        return start + step * int(self.random() * n)
+
+    def uniform(self, a: float, b: float) -> float:
+        return a + (b - a) * self.random()
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def integers(self, low: int, high: t.Optional[int] = None, size=None):
+        # Exclusive upper bound, as numpy.random.Generator.integers
+        if high is None:
+            low, high = 0, low
+        if size is None:
+            return low + int(self.random() * (high - low))
+        import numpy as np
+        n_draws = int(np.prod(size))
+        return low + (self.uniforms(n_draws) * (high - low)).astype(np.int64).reshape(size)
+
+    def normal(self, loc: float = 0.0, scale: float = 1.0, size=None):
+        import numpy as np
+        n_draws = 1 if size is None else int(np.prod(size))
+        values = loc + scale * _normal_from_uniforms(self.uniforms(2 * n_draws))
+        return float(values[0]) if size is None else values.reshape(size)
+
+
+class StreamBatch:
+    def __init__(self, keys: 'np.ndarray', position: int = 0):
+        """
+        One counter-based stream per row, drawn together
+
+        All rows share a position, so one call returns the next draws of every
+        requested row at once, and a row's draws do not depend on which other
+        rows are drawn. Row i reproduces the scalar stream row_stream(i).
+
+        Parameters:
+        - keys: (n_rows, 2) uint32 keys
+        - position: Index of the next draw of every row
+        """
+        import numpy as np
+        self.keys = np.asarray(keys, dtype=np.uint32)
+        self.position = position
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def row_stream(self, row: int) -> CounterStream:
+        return CounterStream(self.keys[row], self.position)
+
+    def advance(self, n_draws: int):
+        self.position += n_draws
+
+    def uniforms(self, n_draws: int, rows: t.Optional['np.ndarray'] = None) -> 'np.ndarray':
+        """
+        The next n_draws doubles of each selected row, shape (n_rows, n_draws)
+        """
+        keys = self.keys if rows is None else self.keys[rows]
+        draws = uniform_block(keys, self.position, n_draws)
+        self.position += n_draws
+        return draws
+
+    def _per_row(self, size, rows) -> t.Tuple[int, tuple]:
+        import numpy as np
+        n_rows = len(self.keys) if rows is None else len(rows)
+        size = (n_rows,) if size is None else tuple(np.atleast_1d(size))
+        if size[0] != n_rows:
+            raise ValueError("The first dimension of size must match the number of rows")
+        return int(np.prod(size[1:])), size
+
+    def uniform(self, low: float = 0.0, high: float = 1.0, size=None, rows: t.Optional['np.ndarray'] = None) -> 'np.ndarray':
+        per_row, size = self._per_row(size, rows)
+        return low + (high - low) * self.uniforms(per_row, rows).reshape(size)
+
+    def integers(self, low: int, high: t.Optional[int] = None, size=None, rows: t.Optional['np.ndarray'] = None) -> 'np.ndarray':
+        import numpy as np
+        if high is None:
+            low, high = 0, low
+        per_row, size = self._per_row(size, rows)
+        return low + (self.uniforms(per_row, rows) * (high - low)).astype(np.int64).reshape(size)
+
+    def normal(self, loc: float = 0.0, scale: float = 1.0, size=None, rows: t.Optional['np.ndarray'] = None) -> 'np.ndarray':
+        per_row, size = self._per_row(size, rows)
+        return loc + scale * _normal_from_uniforms(self.uniforms(2 * per_row, rows)).reshape(size)
+
+
+class RandomStreams:
+    def __init__(self, root_seed: t.Optional[int] = None, ids: t.Tuple[t.Union[str, int], ...] = ()):
+        """
+        Factory of per-component streams derived from one root seed
+
+        Every component (holon, model part, replica) is named by a path of IDs,
+        e.g. streams.child('replica', 7).stream('perception'); its stream is a
+        pure function of the root seed and that path.
+
+        Parameters:
+        - root_seed: Root seed; fresh entropy when None, kept in root_seed
+        - ids: ID path prefix of every stream made by this factory
+        """
+        # 128 bits of fresh entropy, as numpy.random.SeedSequence draws them
+        self.root_seed = secrets.randbits(128) if root_seed is None else int(root_seed)
+        self.ids = tuple(ids)
+
+    def child(self, *ids: t.Union[str, int]) -> 'RandomStreams':
+        return RandomStreams(self.root_seed, self.ids + ids)
+
+    def key(self, *ids: t.Union[str, int]) -> t.Tuple[int, int]:
+        return stream_key(self.root_seed, *(self.ids + ids))
+
+    def stream(self, *ids: t.Union[str, int]) -> CounterStream:
+        return CounterStream(self.key(*ids))
+
+    def batch(self, n_rows: int, *ids: t.Union[str, int]) -> StreamBatch:
+        """
+        Streams of rows 0..n_rows-1 under the given ID, e.g. one per replica
+        """
+        return StreamBatch(row_keys(self.key(*ids), n_rows))
@@ -0,0 +1,312 @@
+import json
+import os
+import typing as t
+
+import numpy as np
+
+from holon_engine import EXTERNAL_BOUNDS, EXTERNAL_CHANGE_RANGE, INITIAL_EXTERNAL_RANGE, MAX_REWARD, MIN_REWARD
+from holon_random import RandomStreams, row_keys, StreamBatch
+from holon_thermoregulation import EXTERNAL_TEMPERATURE_RANGE, NUM_FOOD_OPTIONS
+
+# PerceptionHolon.perceive offers this many rewards per step by default
+NUM_REWARDS = 6
+# Food values of validating 4: randint(1, 5) per option
+FOOD_RANGE = (1, 5)
+
+# Scenario rows generated together; bounds the draws held in memory while generating
+GENERATION_BLOCK_SIZE = 1 << 22
+# Library description, next to one .npy file per series
+METADATA_FILE = "scenarios.json"
+SERIES = (
+    'initial_temperature', 'temperature_change', 'temperature_walk', 'rewards', 'choice_draws',
+    'external_temperature', 'food_offers', 'food_choice'
+)
+
+_open_libraries = {}
+
+
+class Scenario:
+    def __init__(self, library: 'ScenarioLibrary', index: int):
+        """
+        Environment of one run: row index of every series of a library
+
+        Series are read-only views into the library's memory-mapped files.
+
+        Parameters:
+        - library: ScenarioLibrary holding the series
+        - index: Row of the scenario
+        """
+        if not 0 <= index < len(library):
+            raise IndexError(f"Scenario {index} out of range for a library of {len(library)}")
+        self.library = library
+        self.index = index
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        if name in SERIES:
+            return self.library.series[name][self.index]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    @property
+    def n_steps(self) -> int:
+        return self.library.n_steps
+
+    def streams(self, fallback=None) -> 'ScenarioStreams':
+        return ScenarioStreams(self, fallback)
+
+
+class ScenarioLibrary:
+    def __init__(self, path: str):
+        """
+        Precomputed environment series, memory-mapped from a directory
+
+        Every scenario holds the environment the scripts otherwise draw step by
+        step: for the SuperHolon variants the PerceptionTemperatureHolon walk
+        and the offered rewards, for validating 4 the external temperature and
+        the food offers. Files are opened read-only with np.load(mmap_mode='r'),
+        so pool workers opening the same library share its pages through the
+        OS cache instead of each holding a copy.
+
+        Parameters:
+        - path: Directory written by ScenarioLibrary.generate
+        """
+        with open(os.path.join(path, METADATA_FILE)) as handle:
+            self.metadata = json.load(handle)
+        self.path = path
+        self.n_scenarios = self.metadata['n_scenarios']
+        self.n_steps = self.metadata['n_steps']
+        self.series = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode='r') for name in SERIES}
+
+    def __len__(self) -> int:
+        return self.n_scenarios
+
+    def __getitem__(self, index: int) -> Scenario:
+        return Scenario(self, index)
+
+    @classmethod
+    def generate(
+        cls,
+        path: str,
+        n_scenarios: int,
+        n_steps: int,
+        seed: t.Optional[int] = None,
+        external_temperature_range: t.Tuple[float, float] = EXTERNAL_TEMPERATURE_RANGE
+    ) -> 'ScenarioLibrary':
+        """
+        Draw n_scenarios scenarios of n_steps steps in bulk and write them to path
+
+        Each series has its own counter-based stream per scenario row, so
+        scenario i does not depend on how many scenarios are generated, and
+        rows are generated in blocks written straight into the .npy files.
+
+        Parameters:
+        - path: Directory of the library, created if missing
+        - n_scenarios: Number of scenarios
+        - n_steps: Steps covered by every scenario
+        - seed: Root seed, drawn from the OS when None and recorded in the metadata
+        - external_temperature_range: Climate of validating 4
+        """
+        os.makedirs(path, exist_ok=True)
+        streams = RandomStreams(seed)
+        low, high = external_temperature_range
+        shapes = {
+            'initial_temperature': ((n_scenarios,), np.int8),
+            'temperature_change': ((n_scenarios, n_steps), np.int8),
+            'temperature_walk': ((n_scenarios, n_steps + 1), np.int8),
+            'rewards': ((n_scenarios, n_steps, NUM_REWARDS), np.int8),
+            'choice_draws': ((n_scenarios, n_steps), np.float64),
+            'external_temperature': ((n_scenarios, n_steps), np.float64),
+            'food_offers': ((n_scenarios, n_steps, NUM_FOOD_OPTIONS), np.int8),
+            'food_choice': ((n_scenarios, n_steps), np.int8),
+        }
+        series = {
+            name: np.lib.format.open_memmap(os.path.join(path, name + ".npy"), mode='w+', dtype=dtype, shape=shape)
+            for name, (shape, dtype) in shapes.items()
+        }
+        keys = {name: row_keys(streams.key(name), n_scenarios) for name in ('temperature', 'rewards', 'food')}
+
+        draws_per_row = n_steps * (NUM_REWARDS + NUM_FOOD_OPTIONS + 4) + 1
+        block = max(1, GENERATION_BLOCK_SIZE // draws_per_row)
+        for start in range(0, n_scenarios, block):
+            rows = slice(start, min(start + block, n_scenarios))
+            n_rows = rows.stop - rows.start
+
+            # randrange(start, stop) is start + int(u * (stop - start)), as CounterStream draws it
+            temperature = StreamBatch(keys['temperature'][rows])
+            first, last = INITIAL_EXTERNAL_RANGE
+            walk = first + (temperature.uniforms(1)[:, 0] * (last - first)).astype(np.int64)
+            lower, upper = EXTERNAL_CHANGE_RANGE
+            change = lower + (temperature.uniforms(n_steps) * (upper - lower)).astype(np.int64)
+            series['initial_temperature'][rows] = walk
+            series['temperature_change'][rows] = change
+            series['temperature_walk'][rows, 0] = walk
+            for step in range(n_steps):
+                walk = np.clip(walk + change[:, step], *EXTERNAL_BOUNDS)
+                series['temperature_walk'][rows, step + 1] = walk
+
+            rewards = StreamBatch(keys['rewards'][rows])
+            offered = MIN_REWARD + (rewards.uniforms(n_steps * NUM_REWARDS) * (MAX_REWARD - MIN_REWARD + 1)).astype(np.int64)
+            series['rewards'][rows] = offered.reshape(n_rows, n_steps, NUM_REWARDS)
+            series['choice_draws'][rows] = rewards.uniforms(n_steps)
+
+            # Step by step the script draws the temperature, the offers and the choice; each comes in one block here
+            food = StreamBatch(keys['food'][rows])
+            series['external_temperature'][rows] = low + (high - low) * food.uniforms(n_steps)
+            lowest, highest = FOOD_RANGE
+            offers = lowest + (food.uniforms(n_steps * NUM_FOOD_OPTIONS) * (highest - lowest + 1)).astype(np.int64)
+            series['food_offers'][rows] = offers.reshape(n_rows, n_steps, NUM_FOOD_OPTIONS)
+            series['food_choice'][rows] = (food.uniforms(n_steps) * NUM_FOOD_OPTIONS).astype(np.int64)
+
+        for array in series.values():
+            array.flush()
+        del series
+        metadata = {
+            'n_scenarios': n_scenarios,
+            'n_steps': n_steps,
+            'seed': int(streams.root_seed),
+            'num_rewards': NUM_REWARDS,
+            'num_food_options': NUM_FOOD_OPTIONS,
+            'external_temperature_range': [float(low), float(high)],
+        }
+        with open(os.path.join(path, METADATA_FILE), 'w') as handle:
+            json.dump(metadata, handle, indent=2)
+        return cls(path)
+
+
+def open_library(path: str) -> ScenarioLibrary:
+    """
+    Library at path, opened once per process so a pool worker maps its files once
+    """
+    path = os.path.abspath(path)
+    library = _open_libraries.get(path)
+    if library is None:
+        library = _open_libraries[path] = ScenarioLibrary(path)
+    return library
+
+
+class _SeriesReader:
+    def __init__(self, scenario: Scenario, stream: str):
+        self.scenario = scenario
+        self.stream = stream
+
+    def _mismatch(self, call: str):
+        return ValueError(f"{call} on the '{self.stream}' stream does not match the scenario series")
+
+    def _exhausted(self):
+        return IndexError(f"Scenario {self.scenario.index} covers only {self.scenario.n_steps} steps")
+
+
+class _TemperatureReader(_SeriesReader):
+    # PerceptionTemperatureHolon: the starting temperature, then one change per step
+    def __init__(self, scenario: Scenario, stream: str):
+        super().__init__(scenario, stream)
+        self._initial = int(scenario.initial_temperature)
+        # A run reads its own row sequentially; Python ints serve faster than memmap scalars
+        self._changes = scenario.temperature_change.tolist()
+        self._started = False
+        self._step = 0
+
+    def randrange(self, start, stop=None, step=1) -> int:
+        bounds = (int(start), int(stop))
+        if not self._started and bounds == INITIAL_EXTERNAL_RANGE:
+            self._started = True
+            return self._initial
+        if bounds != EXTERNAL_CHANGE_RANGE:
+            raise self._mismatch(f"randrange{bounds}")
+        if self._step == len(self._changes):
+            raise self._exhausted()
+        self._step += 1
+        return self._changes[self._step - 1]
+
+
+class _RewardReader(_SeriesReader):
+    # PerceptionHolon: NUM_REWARDS offered rewards per step, and the fallback choice among the affordable ones
+    def __init__(self, scenario: Scenario, stream: str):
+        super().__init__(scenario, stream)
+        self._rewards = scenario.rewards.ravel().tolist()
+        self._choice_draws = scenario.choice_draws.tolist()
+        self._position = 0
+
+    def randint(self, a: int, b: int) -> int:
+        if (a, b) != (MIN_REWARD, MAX_REWARD):
+            raise self._mismatch(f"randint({a}, {b})")
+        if self._position == len(self._rewards):
+            raise self._exhausted()
+        self._position += 1
+        return self._rewards[self._position - 1]
+
+    def choice(self, seq):
+        # The choice belongs to the step whose rewards were read last
+        step = max(self._position - 1, 0) // NUM_REWARDS
+        return seq[int(self._choice_draws[step] * len(seq))]
+
+
+class _FoodReader(_SeriesReader):
+    # validating 4 Organism: external temperature, food offers and the chosen option, each once per step
+    def __init__(self, scenario: Scenario, stream: str):
+        super().__init__(scenario, stream)
+        self._climate = tuple(scenario.library.metadata['external_temperature_range'])
+        self._temperatures = scenario.external_temperature.tolist()
+        self._offers = scenario.food_offers.ravel().tolist()
+        self._choices = scenario.food_choice.tolist()
+        self._step = 0
+        self._offer = 0
+        self._choice = 0
+
+    def uniform(self, a: float, b: float) -> float:
+        if (float(a), float(b)) != self._climate:
+            raise self._mismatch(f"uniform({a}, {b})")
+        if self._step == len(self._temperatures):
+            raise self._exhausted()
+        self._step += 1
+        return self._temperatures[self._step - 1]
+
+    def randint(self, a: int, b: int) -> int:
+        if (a, b) == FOOD_RANGE:
+            if self._offer == len(self._offers):
+                raise self._exhausted()
+            self._offer += 1
+            return self._offers[self._offer - 1]
+        if (a, b) == (0, NUM_FOOD_OPTIONS - 1):
+            if self._choice == len(self._choices):
+                raise self._exhausted()
+            self._choice += 1
+            return self._choices[self._choice - 1]
+        raise self._mismatch(f"randint({a}, {b})")
+
+
+# Streams the model scripts draw their environment from, and the series serving them
+_READERS = {
+    'perception': _RewardReader,
+    'perception_temperature': _TemperatureReader,
+    'environment': _FoodReader,
+}
+
+
+class ScenarioStreams:
+    def __init__(self, scenario: Scenario, fallback=None):
+        """
+        Streams of a run whose environment comes from a scenario
+
+        Passed as streams to build_super_holon or build_organism: the
+        environment streams read the scenario series with the random-module
+        calls the holons make, so every model run on the same scenario sees the
+        same climate and offers at the same step. Other streams, such as the
+        p-adic metadata of validating 4, come from fallback.
+
+        Parameters:
+        - scenario: Scenario to read
+        - fallback: RandomStreams for the streams not in the scenario
+        """
+        self.scenario = scenario
+        self.fallback = fallback
+
+    def child(self, *ids) -> 'ScenarioStreams':
+        return ScenarioStreams(self.scenario, self.fallback.child(*ids) if self.fallback is not None else None)
+
+    def stream(self, *ids):
+        reader = _READERS.get(ids[0]) if len(ids) == 1 else None
+        if reader is not None:
+            return reader(self.scenario, ids[0])
+        if self.fallback is None:
+            raise KeyError(f"Stream {ids} is not part of the scenario and there are no fallback streams")
+        return self.fallback.stream(*ids)
@@ -0,0 +1,201 @@
+import math
+import statistics
+import typing as t
+
+import numpy as np
+
+from holon_checkpoint import SuperHolonSnapshot
+from holon_models import DEFAULT_PARAMETERS, load_variant
+from holon_random import RandomStreams
+
+
+# Homeostasis band of the homeostasis variants: energy and materials in [30, 70], temperature in [21, 27]
+RESOURCE_BAND = (30, 70)
+TEMPERATURE_BAND = (21, 27)
+# Default levels are half a step past every LEVEL_SPACING steps out of homeostasis: single steps
+# are crossed almost surely and waste effort, and the half step is only reached early far from the band
+LEVEL_SPACING = 3
+
+
+def homeostasis_score(super_holon, scale: float = 10.0) -> float:
+    """
+    Importance function of a homeostasis SuperHolon: how close it is to failing
+
+    The integer part is steps_out_of_homeostasis and the fractional part grows
+    with the distance d from the band as d / (d + scale), so the score reaches
+    homeostasis_threshold exactly when the SuperHolon fails out of homeostasis.
+    Depleted energy or materials score infinity.
+    """
+    core = super_holon.core_holon
+    if core.energy <= 0 or core.materials <= 0:
+        return math.inf
+    low, high = RESOURCE_BAND
+    distance = max(
+        0,
+        low - core.energy, core.energy - high,
+        low - core.materials, core.materials - high,
+        TEMPERATURE_BAND[0] - core.internal_temperature, core.internal_temperature - TEMPERATURE_BAND[1]
+    )
+    return super_holon.steps_out_of_homeostasis + distance / (distance + scale)
+
+class SplittingResult:
+    def __init__(self, estimates: np.ndarray, stage_probabilities: np.ndarray, work_steps: int, horizon: int, confidence: float):
+        """
+        Outcome of multilevel splitting repetitions
+
+        Parameters:
+        - estimates: Unbiased failure-probability estimate of every repetition
+        - stage_probabilities: (repetitions, levels) fraction of trajectories reaching each level
+        - work_steps: SuperHolon steps simulated over all repetitions
+        - horizon: Step limit of the failure event
+        - confidence: Level of the confidence interval
+        """
+        self.estimates = estimates
+        self.stage_probabilities = stage_probabilities
+        self.work_steps = work_steps
+        self.horizon = horizon
+        self.confidence = confidence
+
+    @property
+    def estimate(self) -> float:
+        return float(np.mean(self.estimates))
+
+    @property
+    def standard_error(self) -> float:
+        if len(self.estimates) < 2:
+            return math.nan
+        return float(np.std(self.estimates, ddof=1) / math.sqrt(len(self.estimates)))
+
+    @property
+    def interval(self) -> t.Tuple[float, float]:
+        # Normal interval over independent repetitions, clipped to [0, 1]
+        z = statistics.NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        return max(0.0, self.estimate - z * self.standard_error), min(1.0, self.estimate + z * self.standard_error)
+
+    @property
+    def brute_force_steps(self) -> float:
+        """
+        Steps plain Monte Carlo needs for the same standard error
+
+        Failures are rare, so nearly every plain run lasts the whole horizon.
+        """
+        p = self.estimate
+        if p == 0 or not self.standard_error > 0:
+            return math.nan
+        return p * (1 - p) / self.standard_error ** 2 * self.horizon
+
+    @property
+    def speedup(self) -> float:
+        return self.brute_force_steps / self.work_steps
+
+    def report(self) -> t.Dict[str, t.Any]:
+        lower, upper = self.interval
+        return {
+            'failure_probability': self.estimate,
+            'confidence': self.confidence,
+            'interval': (lower, upper),
+            'relative_error': self.standard_error / self.estimate if self.estimate > 0 else math.nan,
+            'stage_probabilities': self.stage_probabilities.mean(axis=0).tolist(),
+            'work_steps': self.work_steps,
+            'brute_force_steps': self.brute_force_steps,
+            'speedup': self.speedup,
+        }
+
+
+def _run_stage(starts: list, level: float, horizon: int, score: t.Callable) -> t.Tuple[list, int]:
+    # Advance each trajectory until its score reaches level, it stops, or the horizon ends
+    entrances = []
+    steps = 0
+    for super_holon in starts:
+        if score(super_holon) >= level:
+            entrances.append(SuperHolonSnapshot.capture(super_holon))
+            continue
+        while super_holon.step_count < horizon:
+            alive = super_holon.simulate_step()
+            steps += 1
+            if score(super_holon) >= level:
+                entrances.append(SuperHolonSnapshot.capture(super_holon))
+                break
+            if not alive:
+                # Stopped without failing, e.g. no affordable reward
+                break
+    return entrances, steps
+
+
+def estimate_failure_probability(
+    variant: str = 'homeostasis',
+    parameters: t.Optional[t.Dict[str, float]] = None,
+    horizon: int = 1000,
+    levels: t.Optional[t.Sequence[float]] = None,
+    n_per_stage: int = 1000,
+    n_repetitions: int = 10,
+    seed: t.Optional[int] = None,
+    score: t.Callable = homeostasis_score,
+    confidence: float = 0.95,
+    homeostasis_threshold: t.Optional[int] = None
+) -> SplittingResult:
+    """
+    Fixed-effort multilevel splitting estimate of P(failure within horizon steps)
+
+    Stage k runs n_per_stage trajectories, cloned from the states where the
+    previous stage crossed levels[k-1], until they cross levels[k]. The
+    product of the stage fractions is an unbiased estimate; independent
+    repetitions give the confidence interval.
+
+    Parameters:
+    - variant: Key of holon_models.VARIANTS with a homeostasis rule
+    - parameters: Script inputs, missing ones default to DEFAULT_PARAMETERS
+    - horizon: Number of steps within which a failure counts
+    - levels: Increasing score levels, the last one is the failure itself;
+      by default LEVEL_SPACING + 0.5, 2 * LEVEL_SPACING + 0.5, ... below the threshold, then the threshold
+    - n_per_stage: Trajectories per stage
+    - n_repetitions: Independent repetitions of the whole estimator
+    - seed: Root seed of the random streams
+    - score: Importance function, must reach the last level exactly on failure
+    - confidence: Level of the confidence interval
+    - homeostasis_threshold: Steps out of homeostasis that fail a SuperHolon,
+      the script's own threshold when None
+    """
+    module = load_variant(variant)
+    parameters = {**DEFAULT_PARAMETERS, **(parameters or {})}
+    build_parameters = {key: value for key, value in parameters.items() if key != 'num_iterations'}
+    streams = RandomStreams(seed)
+
+    estimates = np.zeros(n_repetitions)
+    work_steps = 0
+    stage_probabilities = None
+    for repetition in range(n_repetitions):
+        repetition_streams = streams.child('repetition', repetition)
+        # Stage 0 trajectories are built independently, as the start itself is random (external temperature)
+        trajectories = [
+            module.build_super_holon(**build_parameters, streams=repetition_streams.child('start', i))
+            for i in range(n_per_stage)
+        ]
+        if homeostasis_threshold is not None:
+            for super_holon in trajectories:
+                super_holon.homeostasis_threshold = homeostasis_threshold
+        if levels is None:
+            threshold = trajectories[0].homeostasis_threshold
+            levels = np.append(np.arange(LEVEL_SPACING + 0.5, threshold, LEVEL_SPACING), threshold)
+        if stage_probabilities is None:
+            stage_probabilities = np.zeros((n_repetitions, len(levels)))
+        resample = repetition_streams.stream('resample')
+
+        estimate = 1.0
+        for stage, level in enumerate(levels):
+            entrances, steps = _run_stage(trajectories, level, horizon, score)
+            work_steps += steps
+            stage_probabilities[repetition, stage] = len(entrances) / n_per_stage
+            estimate *= len(entrances) / n_per_stage
+            if not entrances or stage == len(levels) - 1:
+                break
+            # Fixed effort: n_per_stage clones drawn uniformly from the entrance states
+            counts = np.bincount(resample.integers(len(entrances), size=n_per_stage), minlength=len(entrances))
+            trajectories = []
+            for snapshot, count in zip(entrances, counts):
+                if count:
+                    # Clones draw from sub-streams of the entrance state's own streams
+                    trajectories += snapshot.fork(module, int(count))
+        estimates[repetition] = estimate
+
+    return SplittingResult(estimates, stage_probabilities, work_steps, horizon, confidence)
@@ -0,0 +1,390 @@
+import functools
+import math
+import typing as t
+
+from holon_engine import ENERGY_BAND, MATERIALS_BAND, STRICT, TEMPERATURE_BAND, TEMPERATURE_ONLY, VARIANT_KERNELS
+
+# Per-dimension |delta| above which BioHoloneticModel counts towards its stop condition
+DELTA_LIMIT = 3
+# Reward a SuperHolon records when no reward was affordable: the step stopped before changing its state
+NO_VALID_REWARD = -1
+
+
+class Moments:
+    """
+    Running count, mean and variance (Welford), for scalars or NumPy arrays
+
+    Two Moments merge exactly with the pairwise update of Chan et al., so
+    replicates reduced in any order give the same result up to rounding.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean = self.mean + delta / self.count
+        self.m2 = self.m2 + delta * (value - self.mean)
+
+    def merge(self, other: 'Moments') -> 'Moments':
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = self.m2 + other.m2 + delta * delta * (self.count * other.count / count)
+        self.count = count
+        return self
+
+    @property
+    def variance(self):
+        # Sample variance; NaN below two values
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    def summary(self) -> t.Dict[str, t.Any]:
+        mean, variance = self.mean, self.variance
+        if hasattr(mean, 'tolist'):
+            mean = mean.tolist()
+            variance = variance.tolist() if hasattr(variance, 'tolist') else variance
+        return {'count': self.count, 'mean': mean, 'variance': variance}
+
+
+class Histogram:
+    def __init__(self, low: float, high: float, n_bins: int):
+        """
+        Fixed-bin histogram with underflow and overflow counts
+
+        Parameters:
+        - low, high: Range of the bins; high itself falls in the last bin
+        - n_bins: Number of equal-width bins
+        """
+        if not high > low:
+            raise ValueError("Histogram range must have high > low")
+        self.low = low
+        self.high = high
+        self.n_bins = n_bins
+        self.counts = [0] * n_bins
+        self.underflow = 0
+        self.overflow = 0
+        self._scale = n_bins / (high - low)
+
+    def update(self, value: float):
+        if value < self.low:
+            self.underflow += 1
+        elif value > self.high:
+            self.overflow += 1
+        else:
+            self.counts[min(int((value - self.low) * self._scale), self.n_bins - 1)] += 1
+
+    def merge(self, other: 'Histogram') -> 'Histogram':
+        if (self.low, self.high, self.n_bins) != (other.low, other.high, other.n_bins):
+            raise ValueError("Only histograms with the same bins can be merged")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    @property
+    def edges(self) -> t.List[float]:
+        width = (self.high - self.low) / self.n_bins
+        return [self.low + i * width for i in range(self.n_bins + 1)]
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts) + self.underflow + self.overflow
+
+    def summary(self) -> t.Dict[str, t.Any]:
+        return {'edges': self.edges, 'counts': list(self.counts), 'underflow': self.underflow, 'overflow': self.overflow}
+
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 512):
+        """
+        Mergeable quantile sketch with logarithmic bins (DDSketch)
+
+        A value x > 0 is counted in bin ceil(log_gamma(x)), gamma = (1 + a) / (1 - a),
+        so every quantile is returned within relative error a. Negative values
+        use a mirrored set of bins. When a sign has more than max_bins bins,
+        those closest to zero are folded together, which keeps memory bounded
+        and only loses accuracy for the smallest magnitudes.
+
+        Parameters:
+        - relative_accuracy: Relative error a of the returned quantiles
+        - max_bins: Bins kept per sign
+        """
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        # bin -> count, for positive values and for the magnitudes of negative values
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _collapse(self, bins: t.Dict[int, int]):
+        keys = sorted(bins)
+        excess = len(bins) - self.max_bins
+        folded = sum(bins.pop(key) for key in keys[:excess])
+        bins[keys[excess]] += folded
+
+    def update(self, value: float):
+        self.count += 1
+        if value > 0:
+            bins = self.positive
+        elif value < 0:
+            bins = self.negative
+            value = -value
+        else:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        bins[key] = bins.get(key, 0) + 1
+        if len(bins) > self.max_bins:
+            self._collapse(bins)
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        if self.gamma != other.gamma:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        for bins, other_bins in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_bins.items():
+                bins[key] = bins.get(key, 0) + count
+            if len(bins) > self.max_bins:
+                self._collapse(bins)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def _value(self, key: int) -> float:
+        # Centre of bin key in relative terms: within relative_accuracy of every value in it
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        """
+        Value of rank q * (count - 1) in the sorted values, NaN when empty
+        """
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+    def summary(self, quantiles: t.Sequence[float] = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)) -> t.Dict[str, t.Any]:
+        return {'count': self.count, 'quantiles': {str(q): self.quantile(q) for q in quantiles}}
+
+
+class RunLengths:
+    def __init__(self, max_length: int = 1000):
+        """
+        Streaks of consecutive steps where a condition holds
+
+        Completed streak lengths are counted per length, with lengths of
+        max_length or more sharing one count, so memory stays bounded.
+        end() closes the open streak at the end of a run; merge treats the
+        open streak of the other side as ended, as replicates are independent.
+
+        Parameters:
+        - max_length: Longest streak length counted on its own
+        """
+        self.max_length = max_length
+        self.current = 0
+        self.longest = 0
+        self.runs = 0
+        self.steps = 0
+        self.steps_in_condition = 0
+        # streak length -> number of completed streaks
+        self.lengths = {}
+
+    def update(self, condition: bool):
+        self.steps += 1
+        if condition:
+            self.current += 1
+            self.steps_in_condition += 1
+        elif self.current:
+            self._close(self.current)
+            self.current = 0
+
+    def _close(self, length: int):
+        self.runs += 1
+        self.longest = max(self.longest, length)
+        length = min(length, self.max_length)
+        self.lengths[length] = self.lengths.get(length, 0) + 1
+
+    def end(self):
+        if self.current:
+            self._close(self.current)
+            self.current = 0
+
+    def merge(self, other: 'RunLengths') -> 'RunLengths':
+        if self.max_length != other.max_length:
+            raise ValueError("Only run-length counters with the same max_length can be merged")
+        self.end()
+        for length, count in other.lengths.items():
+            self.lengths[length] = self.lengths.get(length, 0) + count
+        self.runs += other.runs
+        self.longest = max(self.longest, other.longest)
+        if other.current:
+            self._close(other.current)
+        self.steps += other.steps
+        self.steps_in_condition += other.steps_in_condition
+        return self
+
+    @property
+    def fraction(self) -> float:
+        # Fraction of steps spent in the condition
+        return self.steps_in_condition / self.steps if self.steps else math.nan
+
+    def summary(self) -> t.Dict[str, t.Any]:
+        return {
+            'runs': self.runs + (1 if self.current else 0),
+            'longest': max(self.longest, self.current),
+            'fraction': self.fraction,
+            'lengths': {str(length): count for length, count in sorted(self.lengths.items())},
+        }
+
+
+def in_homeostasis(values: t.Dict[str, t.Any], criterion: str = STRICT) -> bool:
+    # The check behind steps_out_of_homeostasis, with holon_engine's STRICT or TEMPERATURE_ONLY criterion
+    in_band = TEMPERATURE_BAND[0] <= values['temperature'] <= TEMPERATURE_BAND[1]
+    if criterion == STRICT:
+        in_band = (in_band and ENERGY_BAND[0] <= values['energy'] <= ENERGY_BAND[1]
+                   and MATERIALS_BAND[0] <= values['materials'] <= MATERIALS_BAND[1])
+    elif criterion != TEMPERATURE_ONLY:
+        raise ValueError(f"Unknown homeostasis criterion {criterion!r}")
+    return in_band
+
+
+def out_of_homeostasis(values: t.Dict[str, t.Any], criterion: str = STRICT) -> bool:
+    return not in_homeostasis(values, criterion)
+
+
+def delta_norm(values: t.Dict[str, t.Any]) -> float:
+    delta = values['delta']
+    return float((delta * delta).sum() ** 0.5)
+
+
+def delta_exceeded(values: t.Dict[str, t.Any]) -> bool:
+    # The per-step condition counted by BioHoloneticModel.stop_counter
+    return bool((abs(values['delta']) > DELTA_LIMIT).any())
+
+
+class StepStatistics:
+    def __init__(self, metrics: t.Dict[str, t.Tuple[t.Union[str, t.Callable], t.Any]], every: int = 1):
+        """
+        Streaming aggregators fed by a model's step pipeline
+
+        Attach as the model's trace (super_holon.trace = statistics): the
+        model hands the values it would record to record(), which updates every
+        aggregator in O(1) and stores nothing per step. The no-valid-reward row
+        of a SuperHolon is not a step and is skipped. Statistics of
+        independent replicates merge into one result.
+
+        Parameters:
+        - metrics: Name -> (recorded column or function of the recorded values, aggregator)
+        - every: Aggregate every Nth step; events are not oversampled, so distributions stay unbiased
+        """
+        self.metrics = metrics
+        self.every = every
+
+    def should_record(self, step: int, event: bool = False) -> bool:
+        return self.every > 0 and step % self.every == 0
+
+    def record(self, **values):
+        if values.get('reward') == NO_VALID_REWARD:
+            # Not a step: a trace keeps the row as an event, the distributions skip it
+            return
+        for column, aggregator in self.metrics.values():
+            aggregator.update(values[column] if isinstance(column, str) else column(values))
+
+    def end_run(self):
+        """
+        Close the open streaks at the end of a replicate
+        """
+        for _, aggregator in self.metrics.values():
+            if isinstance(aggregator, RunLengths):
+                aggregator.end()
+
+    def merge(self, other: 'StepStatistics') -> 'StepStatistics':
+        for name, (_, aggregator) in self.metrics.items():
+            aggregator.merge(other.metrics[name][1])
+        return self
+
+    def __getitem__(self, name: str):
+        return self.metrics[name][1]
+
+    def summary(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        return {name: aggregator.summary() for name, (_, aggregator) in self.metrics.items()}
+
+
+def merge_statistics(parts: t.Iterable[StepStatistics]) -> t.Optional[StepStatistics]:
+    """
+    Reduce the statistics of parallel workers into the first of them
+    """
+    merged = None
+    for part in parts:
+        merged = part if merged is None else merged.merge(part)
+    return merged
+
+
+def super_holon_statistics(variant: str) -> StepStatistics:
+    """
+    Energy, materials and temperature distributions, time in homeostasis and
+    out-of-homeostasis streaks of a SuperHolon variant
+
+    Temperature is aggregated for variants with the temperature holons, and
+    homeostasis by the variant's own criterion, so the streaks are those its
+    steps_out_of_homeostasis counts; variants without one get neither.
+    Pass functools.partial(super_holon_statistics, variant) as a factory.
+
+    Parameters:
+    - variant: Key of holon_models.VARIANTS
+    """
+    _, temperature, criterion = VARIANT_KERNELS[variant]
+    metrics = {
+        'energy': ('energy', Moments()),
+        'energy_quantiles': ('energy', QuantileSketch()),
+        'materials': ('materials', Moments()),
+        'materials_histogram': ('materials', Histogram(0, 200, 40)),
+    }
+    if criterion is not None:
+        metrics.update({
+            'in_homeostasis': (functools.partial(in_homeostasis, criterion=criterion), Moments()),
+            'out_of_homeostasis_runs': (functools.partial(out_of_homeostasis, criterion=criterion), RunLengths()),
+        })
+    if temperature:
+        metrics.update({
+            'temperature': ('temperature', Moments()),
+            'temperature_histogram': ('temperature', Histogram(10, 40, 60)),
+            'temperature_quantiles': ('temperature', QuantileSketch()),
+        })
+    return StepStatistics(metrics)
+
+
+def holonetic_statistics() -> StepStatistics:
+    """
+    State moments, |delta| distribution and streaks of the stop condition of a BioHoloneticModel
+    """
+    return StepStatistics({
+        'state': ('state', Moments()),
+        'delta_norm': (delta_norm, Moments()),
+        'delta_norm_quantiles': (delta_norm, QuantileSketch()),
+        'delta_exceeded_runs': (delta_exceeded, RunLengths()),
+    })
@@ -0,0 +1,208 @@
+import typing as t
+
+import numpy as np
+
+from holon_models import load_model
+from holon_random import StreamBatch
+
+_validating = load_model('validating')
+INITIAL_TEMPERATURE = _validating.INITIAL_TEMPERATURE
+TEMPERATURE_RANGE = _validating.TEMPERATURE_RANGE
+EXTERNAL_TEMPERATURE_RANGE = _validating.EXTERNAL_TEMPERATURE_RANGE
+NUM_FOOD_OPTIONS = _validating.NUM_FOOD_OPTIONS
+ENERGY_COST = _validating.ENERGY_COST
+TEMPERATURE_CHANGE_COST = _validating.TEMPERATURE_CHANGE_COST
+# Consecutive out-of-range steps beyond which Organism.is_alive() fails
+MAX_STEPS_OUT_OF_RANGE = 5
+
+# Environment draws of one Organism.simulate_step: external temperature, NUM_FOOD_OPTIONS food values, food choice
+DRAWS_PER_STEP = 2 + NUM_FOOD_OPTIONS
+# Doubles drawn per block across all running organisms; blocks cover more steps as organisms retire
+DRAW_BLOCK_SIZE = 1 << 20
+
+# Stop causes
+ALIVE = 0
+DEPLETED = 1
+OUT_OF_TEMPERATURE_RANGE = 2
+
+
+def regulate_temperature(temperature: np.ndarray, external_temperature: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    One temperature update of Organism.simulate_step
+
+    The external temperature pulls the internal one, then the core brings it
+    back into TEMPERATURE_RANGE. The internal temperature never depends on
+    energy, so this is the whole temperature process.
+
+    Returns:
+    - The regulated temperature and the degrees heated or cooled (0 where the core did nothing)
+    """
+    low, high = TEMPERATURE_RANGE
+
+    # Core adjusts internal temperature based on external conditions
+    temperature = np.where(
+        temperature < external_temperature, temperature + 0.01 * external_temperature,
+        np.where(temperature > external_temperature, temperature - 0.01 * (temperature - external_temperature), temperature)
+    )
+
+    # Core regulates temperature back into the range, paying per degree of heating or cooling
+    heating = temperature < low
+    cooling = temperature > high
+    change = np.where(heating, low - temperature, np.where(cooling, temperature - high, 0.0))
+    temperature = np.where(heating, temperature + change, np.where(cooling, temperature - change, temperature))
+    return temperature, change
+
+class ThermoregulationEngine:
+    def __init__(
+        self,
+        initial_energy: t.Union[float, np.ndarray],
+        external_temperature_range: t.Union[t.Tuple[float, float], np.ndarray] = EXTERNAL_TEMPERATURE_RANGE,
+        n_organisms: t.Optional[int] = None,
+        rng: t.Union[np.random.Generator, StreamBatch, None] = None
+    ):
+        """
+        N "Laws of biology validating 4" organisms stepped together as arrays
+
+        Each step follows Organism.simulate_step with the same floating-point
+        operations: the external temperature pulls the internal one, the core
+        pulls it back into TEMPERATURE_RANGE at TEMPERATURE_CHANGE_COST per
+        degree, and the organism pays ENERGY_COST and eats one of the food
+        options, capped at twice its initial energy. The p-adic metadata of the
+        holons never feeds back into energy or temperature, so it is not drawn.
+
+        Environment draws come in (organisms, steps, DRAWS_PER_STEP) blocks laid
+        out as the script consumes them, so with a StreamBatch row i reproduces
+        an Organism whose environment stream is rng.row_stream(i) exactly.
+        Organisms that stop are compacted out of the working arrays; their stop
+        step, cause and final values are kept in the result arrays.
+
+        Parameters:
+        - initial_energy: INITIAL_ENERGY shared by all organisms, or one per organism
+        - external_temperature_range: (low, high) climate shared by all organisms, or an (N, 2) array
+        - n_organisms: Number of organisms N, by default the length of the per-organism arrays
+        - rng: NumPy generator, or a StreamBatch with one row per organism
+        """
+        initial_energy = np.asarray(initial_energy, dtype=float)
+        climate = np.asarray(external_temperature_range, dtype=float)
+        if n_organisms is None:
+            sizes = {len(array) for array in (np.atleast_1d(initial_energy), np.atleast_2d(climate))}
+            n_organisms = max(sizes)
+        self.n_organisms = n_organisms
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        # Working arrays, holding only the organisms that are still alive
+        self.organism_id = np.arange(n_organisms)
+        self.initial_energy = np.broadcast_to(initial_energy, (n_organisms,)).copy()
+        climate = np.broadcast_to(climate, (n_organisms, 2))
+        self.external_low = climate[:, 0].copy()
+        self.external_span = climate[:, 1] - climate[:, 0]
+        self.energy = self.initial_energy.copy()
+        self.internal_temperature = np.full(n_organisms, INITIAL_TEMPERATURE)
+        self.num_iterations_out_of_temp_range = np.zeros(n_organisms, dtype=np.int64)
+
+        # Results for every organism, indexed by organism id
+        self.final_energy = self.energy.copy()
+        self.final_temperature = self.internal_temperature.copy()
+        self.stop_step = np.full(n_organisms, -1, dtype=np.int64)
+        self.stop_cause = np.full(n_organisms, ALIVE, dtype=np.int8)
+        self.step_count = 0
+
+        # Organisms that start without energy never step, as in main()
+        self._retire(self.energy <= 0)
+
+    @property
+    def n_alive(self) -> int:
+        return self.organism_id.size
+
+    def _draw_block(self, n_steps: int) -> np.ndarray:
+        # (n_alive, n_steps, DRAWS_PER_STEP) uniforms; per-organism streams draw only the rows still alive
+        n_draws = n_steps * DRAWS_PER_STEP
+        if isinstance(self.rng, StreamBatch):
+            draws = self.rng.uniforms(n_draws, rows=self.organism_id)
+        else:
+            draws = self.rng.random((self.n_alive, n_draws))
+        return draws.reshape(self.n_alive, n_steps, DRAWS_PER_STEP)
+
+    def _retire(self, stopped: np.ndarray, cause: t.Optional[np.ndarray] = None) -> np.ndarray:
+        # Record the stopped organisms and compact them out of the working arrays
+        if not stopped.any():
+            return stopped
+        stopped_id = self.organism_id[stopped]
+        self.final_energy[stopped_id] = self.energy[stopped]
+        self.final_temperature[stopped_id] = self.internal_temperature[stopped]
+        self.stop_step[stopped_id] = self.step_count
+        self.stop_cause[stopped_id] = DEPLETED if cause is None else cause[stopped]
+
+        running = ~stopped
+        self.organism_id = self.organism_id[running]
+        self.initial_energy = self.initial_energy[running]
+        self.external_low = self.external_low[running]
+        self.external_span = self.external_span[running]
+        self.energy = self.energy[running]
+        self.internal_temperature = self.internal_temperature[running]
+        self.num_iterations_out_of_temp_range = self.num_iterations_out_of_temp_range[running]
+        return stopped
+
+    def step(self, draws: np.ndarray) -> np.ndarray:
+        """
+        Advance every alive organism by one step
+
+        Parameters:
+        - draws: (n_alive, DRAWS_PER_STEP) uniforms of this step
+
+        Returns:
+        - Mask over the organisms alive before the step of those that stopped
+        """
+        low, high = TEMPERATURE_RANGE
+        external_temperature = self.external_low + self.external_span * draws[:, 0]
+        temperature, change = regulate_temperature(self.internal_temperature, external_temperature)
+        energy = np.where(change > 0, self.energy - TEMPERATURE_CHANGE_COST * change, self.energy)
+
+        # randint(1, 5) per food option and randint(0, NUM_FOOD_OPTIONS - 1) for the choice
+        selected = (draws[:, -1] * NUM_FOOD_OPTIONS).astype(np.int64)
+        food_energy = 1 + (draws[np.arange(len(draws)), 1 + selected] * 5).astype(np.int64)
+        energy = energy - ENERGY_COST
+        energy = energy + food_energy
+
+        out_of_range = (temperature < low) | (temperature > high)
+        self.num_iterations_out_of_temp_range = np.where(out_of_range, self.num_iterations_out_of_temp_range + 1, 0)
+        self.energy = np.minimum(energy, 2 * self.initial_energy)
+        self.internal_temperature = temperature
+        self.step_count += 1
+
+        depleted = self.energy <= 0
+        overheated = self.num_iterations_out_of_temp_range > MAX_STEPS_OUT_OF_RANGE
+        cause = np.where(depleted, DEPLETED, OUT_OF_TEMPERATURE_RANGE)
+        return self._retire(depleted | overheated, cause)
+
+    def run(self, num_iterations: int) -> np.ndarray:
+        """
+        Run up to num_iterations steps or until every organism has stopped
+
+        Returns:
+        - The stop step of every organism, -1 for organisms still alive
+        """
+        remaining = num_iterations
+        while remaining > 0 and self.n_alive:
+            n_steps = min(remaining, max(1, DRAW_BLOCK_SIZE // (self.n_alive * DRAWS_PER_STEP)))
+            block = self._draw_block(n_steps)
+            # Rows of the block follow the working arrays as organisms retire
+            for index in range(n_steps):
+                stopped = self.step(block[:, index])
+                if stopped.any():
+                    block = block[~stopped]
+                    if not self.n_alive:
+                        break
+            remaining -= n_steps
+
+        self.final_energy[self.organism_id] = self.energy
+        self.final_temperature[self.organism_id] = self.internal_temperature
+        return self.stop_step
+
+    def survival(self, num_iterations: int) -> np.ndarray:
+        """
+        Fraction of organisms alive after each of steps 0..num_iterations
+        """
+        steps = np.where(self.stop_step >= 0, self.stop_step, num_iterations + 1)
+        stopped = np.bincount(np.minimum(steps, num_iterations + 1), minlength=num_iterations + 2)[:num_iterations + 1]
+        return 1 - np.cumsum(stopped) / self.n_organisms
@@ -0,0 +1,181 @@
+import os
+import struct
+import typing as t
+
+import numpy as np
+
+# Storage formats
+NPY = 'npy'  # one appendable .npy file per column, loadable memory-mapped
+NPZ = 'npz'  # one .npz archive per flushed chunk
+
+# Columns recorded by the SuperHolon variants: name -> (dtype, shape per step)
+SUPER_HOLON_COLUMNS = {
+    'step': ('i8', ()),
+    'energy': ('f8', ()),
+    'materials': ('f8', ()),
+    'waste_level': ('f4', ()),
+    'energy_level': ('f4', ()),
+    'energy_disposal_level': ('f4', ()),
+    'reward': ('i4', ()),
+}
+TEMPERATURE_COLUMNS = {
+    'temperature': ('f8', ()),
+    'external_temperature': ('f8', ()),
+    'temperature_level': ('f4', ()),
+}
+
+# Room reserved for the .npy header so it can be rewritten in place with the final shape
+_NPY_HEADER_SIZE = 128
+
+
+def holonetic_columns(n_dimensions: int) -> t.Dict[str, t.Tuple[str, tuple]]:
+    """
+    Columns recorded by BioHoloneticModel
+    """
+    return {
+        'step': ('i8', ()),
+        'delta': ('f8', (n_dimensions,)),
+        'goal': ('f8', (n_dimensions,)),
+        'state': ('f8', (n_dimensions,)),
+    }
+
+
+def _npy_header(dtype: np.dtype, shape: tuple) -> bytes:
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape})
+    # Magic string, version 1.0 and header length take 10 bytes; the header ends with a newline
+    padding = _NPY_HEADER_SIZE - 10 - len(header) - 1
+    if padding < 0:
+        raise ValueError("Column shape too large for the reserved .npy header")
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', _NPY_HEADER_SIZE - 10) + header.encode('latin1') + b' ' * padding + b'\n'
+
+
+class TraceRecorder:
+    def __init__(
+        self,
+        path: str,
+        columns: t.Dict[str, t.Tuple[str, tuple]],
+        chunk_size: int = 4096,
+        every: int = 1,
+        events_only: bool = False,
+        storage: str = NPY
+    ):
+        """
+        Columnar binary trace of a simulation
+
+        Values go into preallocated per-column buffers of chunk_size rows that
+        are flushed to disk when full, so recording a step is a few array
+        stores and never formats a string.
+
+        Parameters:
+        - path: Directory receiving the trace files
+        - columns: Column name -> (dtype, shape per step)
+        - chunk_size: Rows buffered in memory between flushes
+        - every: Record every Nth step; 0 turns tracing off and creates no files
+        - events_only: Record only steps flagged as events (failures, goal changes)
+        - storage: NPY or NPZ
+        """
+        if storage not in (NPY, NPZ):
+            raise ValueError(f"Unknown trace storage: {storage}")
+        self.path = path
+        self.columns = {name: (np.dtype(dtype), tuple(shape)) for name, (dtype, shape) in columns.items()}
+        self.chunk_size = chunk_size
+        self.every = every
+        self.events_only = events_only
+        self.storage = storage
+
+        self.rows = 0
+        self.rows_flushed = 0
+        self.chunks_flushed = 0
+        self.closed = False
+        self.buffers = {}
+        self._files = {}
+        if every <= 0:
+            return
+
+        self.buffers = {
+            name: np.empty((chunk_size,) + shape, dtype=dtype) for name, (dtype, shape) in self.columns.items()
+        }
+        os.makedirs(path, exist_ok=True)
+        if storage == NPY:
+            for name, (dtype, shape) in self.columns.items():
+                handle = open(os.path.join(path, f"{name}.npy"), 'wb')
+                handle.write(_npy_header(dtype, (0,) + shape))
+                self._files[name] = handle
+
+    def should_record(self, step: int, event: bool = False) -> bool:
+        """
+        Sampling decision, cheap enough to call on every step before gathering values
+        """
+        if self.every <= 0 or self.closed:
+            return False
+        if self.events_only:
+            return event
+        return event or step % self.every == 0
+
+    def record(self, **values):
+        row = self.rows
+        for name, buffer in self.buffers.items():
+            buffer[row] = values[name]
+        self.rows = row + 1
+        if self.rows == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows to disk
+        """
+        if self.rows == 0:
+            return
+        if self.storage == NPY:
+            for name, handle in self._files.items():
+                handle.write(self.buffers[name][:self.rows].tobytes())
+        else:
+            chunk_path = os.path.join(self.path, f"chunk_{self.chunks_flushed:06d}.npz")
+            np.savez(chunk_path, **{name: buffer[:self.rows] for name, buffer in self.buffers.items()})
+        self.rows_flushed += self.rows
+        self.chunks_flushed += 1
+        self.rows = 0
+
+    def close(self):
+        """
+        Flush the remaining rows and finalize the files
+        """
+        if self.closed:
+            return
+        self.flush()
+        for name, handle in self._files.items():
+            dtype, shape = self.columns[name]
+            # Rewrite the header in place now that the number of rows is known
+            handle.seek(0)
+            handle.write(_npy_header(dtype, (self.rows_flushed,) + shape))
+            handle.close()
+        self._files = {}
+        self.closed = True
+
+    def __enter__(self) -> 'TraceRecorder':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_trace(path: str, mmap: bool = False) -> t.Dict[str, np.ndarray]:
+    """
+    Load a trace written by TraceRecorder
+
+    NPY traces can be opened memory-mapped; NPZ chunks are concatenated.
+    """
+    names = sorted(os.listdir(path))
+    chunks = [name for name in names if name.startswith('chunk_') and name.endswith('.npz')]
+    if not chunks:
+        return {
+            name[:-4]: np.load(os.path.join(path, name), mmap_mode='r' if mmap else None)
+            for name in names if name.endswith('.npy')
+        }
+
+    parts = {}
+    for chunk in chunks:
+        with np.load(os.path.join(path, chunk)) as archive:
+            for name in archive.files:
+                parts.setdefault(name, []).append(archive[name])
+    return {name: np.concatenate(arrays) for name, arrays in parts.items()}
@@ -0,0 +1,255 @@
+import numpy as np
+import typing as t
+
+from holon_random import StreamBatch
+from holonetic_kernel import ClusterRegulationKernel, SELECTED_VALUE
+
+# Goal transition rules of the two BioHoloneticModel versions
+RANDOM_GOAL = 'random'      # modelo biologico-holonetico25: a cue picks a random goal
+RULE_BASED_GOAL = 'rules'   # modelo biologico-holonetico28: cue, state and out-of-range triggers
+
+
+class BioHoloneticEnsemble:
+    def __init__(
+        self,
+        n_replicas: int,
+        goals: np.ndarray,
+        cluster_kernel: ClusterRegulationKernel,
+        noise_sigma: float = 0.1,
+        stop_threshold: int = 5,
+        transition_rule: str = RANDOM_GOAL,
+        rng: t.Union[np.random.Generator, StreamBatch, None] = None,
+        goal_library=None,
+        goal_neighbours: int = 1
+    ):
+        """
+        M replicas of BioHoloneticModel stepped together as one (M, D) batch
+
+        State, previous state, goal index and stop counter are stored per replica.
+        Replicas whose stop counter reaches stop_threshold are compacted out of the
+        working arrays, so they cost nothing on later steps; their final state and
+        stop step are kept in the result arrays.
+
+        Parameters:
+        - n_replicas: Number of replicas M
+        - goals: (n_goals, D) goal vectors, the first one is the initial goal
+        - cluster_kernel: Cluster contribution kernel shared by all replicas
+        - noise_sigma: Standard deviation for external noise
+        - stop_threshold: Consecutive out-of-range steps that stop a replica
+        - transition_rule: RANDOM_GOAL (v25) or RULE_BASED_GOAL (v28)
+        - rng: NumPy generator for the noise and cue draws, or a StreamBatch with
+          one row per replica so each replica draws from its own stream
+        - goal_library: Optional holonetic_goals.GoalLibrary; replicas whose state enters a
+          transition region switch to a nearby library goal, found by one batched query.
+          Goal index len(goals) + j stands for library goal j
+        - goal_neighbours: Number of nearest library goals a replica picks from at random
+        """
+        if transition_rule not in (RANDOM_GOAL, RULE_BASED_GOAL):
+            raise ValueError(f"Unknown goal transition rule: {transition_rule}")
+
+        self.n_replicas = n_replicas
+        self.goals = np.asarray(goals, dtype=float)
+        self.cluster_kernel = cluster_kernel
+        self.noise_sigma = noise_sigma
+        self.stop_threshold = stop_threshold
+        self.transition_rule = transition_rule
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.goal_library = goal_library
+        self.goal_neighbours = goal_neighbours
+        self.n_dimensions = self.goals.shape[1]
+
+        # Working arrays, holding only the replicas that are still running
+        self.replica_id = np.arange(n_replicas)
+        self.state = np.zeros((n_replicas, self.n_dimensions))
+        self.prev_state = np.zeros((n_replicas, self.n_dimensions))
+        self.goal_index = np.zeros(n_replicas, dtype=np.int64)
+        self.stop_counter = np.zeros(n_replicas, dtype=np.int64)
+
+        # Results for every replica, indexed by replica id
+        self.final_state = np.zeros((n_replicas, self.n_dimensions))
+        self.stop_step = np.full(n_replicas, -1, dtype=np.int64)
+        self.step_count = 0
+
+    @classmethod
+    def from_model(
+        cls,
+        model,
+        n_replicas: int,
+        transition_rule: t.Optional[str] = None,
+        rng: t.Union[np.random.Generator, StreamBatch, None] = None
+    ) -> 'BioHoloneticEnsemble':
+        """
+        Build an ensemble with the goals, clusters and noise of a BioHoloneticModel
+
+        Every replica starts from the model's current state and goal. The goal
+        transition rule follows the model version (v25 random, v28 rule based)
+        unless given explicitly.
+        """
+        if transition_rule is None:
+            transition_rule = RANDOM_GOAL if model.cluster_kernel.rule == SELECTED_VALUE else RULE_BASED_GOAL
+        ensemble = cls(
+            n_replicas,
+            model.goals,
+            model.cluster_kernel,
+            noise_sigma=model.noise_sigma,
+            stop_threshold=model.stop_threshold,
+            transition_rule=transition_rule,
+            rng=rng,
+            goal_library=model.goal_library,
+            goal_neighbours=model.goal_neighbours
+        )
+        ensemble.state[:] = model.state
+        ensemble.prev_state[:] = model.prev_state
+        ensemble.stop_counter[:] = model.stop_counter
+        matches = np.flatnonzero(np.all(ensemble.goals == model.goal, axis=1))
+        if matches.size:
+            ensemble.goal_index[:] = matches[0]
+        elif model.goal_library is not None:
+            ensemble.goal_index[:] = len(ensemble.goals) + model.goal_library.nearest(model.goal)[1]
+        return ensemble
+
+    @property
+    def n_running(self) -> int:
+        return self.replica_id.size
+
+    def compute_delta_state(self, external_force: np.ndarray) -> np.ndarray:
+        """
+        Batched BioHoloneticModel.compute_delta_state for all running replicas
+
+        Parameters:
+        - external_force: (D,) force shared by all replicas or (n_running, D) force
+          per running replica, in the order of replica_id
+        """
+        delta = self.state - self.goal_vectors()
+
+        # Check for stop condition
+        out_of_range = np.any(np.abs(delta) > 3, axis=1)
+        self.stop_counter = np.where(out_of_range, self.stop_counter + 1, 0)
+
+        cluster_contributions = self.cluster_kernel(delta)
+
+        # Noise is added to the force first, as the scalar model does, so replicas match it bit for bit
+        noise = self._draw('normal', 0, self.noise_sigma, size=self.state.shape)
+        return cluster_contributions + (external_force + noise)
+
+    def _draw(self, method: str, *args, size, where: t.Optional[np.ndarray] = None):
+        # Per-replica streams draw only the rows of the replicas still running, or of those where is set
+        if isinstance(self.rng, StreamBatch):
+            rows = self.replica_id if where is None else self.replica_id[where]
+            return getattr(self.rng, method)(*args, size=size, rows=rows)
+        return getattr(self.rng, method)(*args, size=size)
+
+    def goal_vectors(self) -> np.ndarray:
+        """
+        (n_running, D) current goal of every running replica
+        """
+        if self.goal_library is None:
+            return self.goals[self.goal_index]
+        n_goals = len(self.goals)
+        in_library = self.goal_index >= n_goals
+        goals = self.goals[np.where(in_library, 0, self.goal_index)]
+        goals[in_library] = self.goal_library.goals[self.goal_index[in_library] - n_goals]
+        return goals
+
+    def _library_goal_index(self, fired: np.ndarray) -> np.ndarray:
+        # Goal index of a nearby library goal for the replicas where fired, one batched query for all
+        index = np.zeros(self.n_running, dtype=np.int64)
+        if fired.any():
+            _, nearest = self.goal_library.nearest(self.state[fired], self.goal_neighbours)
+            if self.goal_neighbours > 1:
+                # Only the replicas that fired pick one of their neighbours, as the scalar model does
+                choice = self._draw('integers', nearest.shape[1], size=len(nearest), where=fired)
+                nearest = nearest[np.arange(len(nearest)), choice]
+            index[fired] = len(self.goals) + nearest
+        return index
+
+    def trigger_goal_transition(self) -> np.ndarray:
+        """
+        Batched goal transition, returning the new goal index of every running replica
+        """
+        cue = self._draw('integers', 1, 6, size=self.n_running)
+        triggered = cue == 5
+
+        transition_mask = (self.state > 0.8) | (self.state < -0.8) | (np.abs(self.state) < 0.1)
+        in_region = np.any(transition_mask, axis=1)
+
+        if self.transition_rule == RANDOM_GOAL:
+            random_goal = self._draw('integers', len(self.goals), size=self.n_running)
+            goal_index = self.goal_index
+            if self.goal_library is not None:
+                fired = in_region & ~triggered
+                goal_index = np.where(fired, self._library_goal_index(fired), goal_index)
+            return np.where(triggered, random_goal, goal_index)
+
+        goal_index = np.where(self.stop_counter >= 3, 2, self.goal_index)
+        if self.goal_library is not None:
+            fired = in_region & ~triggered
+            goal_index = np.where(fired, self._library_goal_index(fired), goal_index)
+        else:
+            goal_index = np.where(in_region, 0, goal_index)
+        return np.where(triggered, 1, goal_index)
+
+    def update(self, external_force: np.ndarray) -> np.ndarray:
+        """
+        Update every running replica by a single time step
+
+        Returns:
+        - The ids of the replicas that stopped at this step
+        """
+        delta_state = self.compute_delta_state(external_force)
+
+        self.prev_state = self.state.copy()
+        self.state += delta_state
+        self.goal_index = self.trigger_goal_transition()
+        self.step_count += 1
+
+        stopped = self.stop_counter >= self.stop_threshold
+        if not stopped.any():
+            return self.replica_id[:0]
+
+        # Record the stopped replicas and compact them out of the working arrays
+        stopped_id = self.replica_id[stopped]
+        self.final_state[stopped_id] = self.state[stopped]
+        self.stop_step[stopped_id] = self.step_count
+
+        running = ~stopped
+        self.replica_id = self.replica_id[running]
+        self.state = self.state[running]
+        self.prev_state = self.prev_state[running]
+        self.goal_index = self.goal_index[running]
+        self.stop_counter = self.stop_counter[running]
+        return stopped_id
+
+    def run(
+        self,
+        num_steps: int,
+        external_force: t.Optional[t.Callable[[int, int], np.ndarray]] = None
+    ) -> np.ndarray:
+        """
+        Run up to num_steps steps or until every replica has stopped
+
+        Parameters:
+        - external_force: Callable (step, n_running) -> force; by default each running
+          replica gets uniform(-0.5, 0.5) noise per dimension as in main()
+
+        Returns:
+        - The stop step of every replica, -1 for replicas that never stopped
+        """
+        for step in range(num_steps):
+            if self.n_running == 0:
+                break
+            if external_force is None:
+                force = self._draw('uniform', -0.5, 0.5, size=(self.n_running, self.n_dimensions))
+            else:
+                force = external_force(step, self.n_running)
+            self.update(force)
+
+        self.final_state[self.replica_id] = self.state
+        return self.stop_step
+
+    def stop_fraction(self) -> float:
+        """
+        Fraction of replicas whose stop_counter reached stop_threshold
+        """
+        return float(np.mean(self.stop_step >= 0))
+
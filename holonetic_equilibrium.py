@@ -0,0 +1,226 @@
+import numpy as np
+import typing as t
+
+# Largest system whose full spectrum is computed densely; larger ones report the rightmost eigenvalues only
+DENSE_EIGEN_LIMIT = 1000
+# Eigenvalues reported for systems above DENSE_EIGEN_LIMIT
+N_SPARSE_EIGENVALUES = 6
+# Backtracking halvings of a Newton step before it is taken anyway
+MAX_BACKTRACKS = 30
+# Relative tolerance of the iterative sparse solves; looser ones cost Newton its quadratic convergence
+LSMR_TOLERANCE = 1e-12
+# LSMR iterations allowed per unknown; ill-conditioned systems need several times the size
+LSMR_ITERATIONS = 10
+# Largest change of a cluster activation 10 * clusters @ delta per Newton step: beyond a few
+# units the sigmoids saturate, their slopes vanish and the linearisation says nothing
+MAX_ACTIVATION_STEP = 2.0
+# Delta standing in for "just below the surface" when evaluating the negative branch
+SURFACE_OFFSET = 1e-300
+
+
+class Equilibrium:
+    def __init__(
+        self,
+        goal: np.ndarray,
+        state: np.ndarray,
+        residual: float,
+        iterations: int,
+        converged: bool,
+        sliding: np.ndarray,
+        eigenvalues: np.ndarray,
+        map_spectral_radius: float
+    ):
+        """
+        Fixed point of the noise-free BioHoloneticModel dynamics for one goal
+
+        Components in sliding sit exactly at their goal, where the contributions
+        switch branch and both branches point back towards the goal. The
+        continuous-time flow rests there (Filippov); the discrete update()
+        oscillates around it instead. The other components solve
+        contributions + force = 0, where the flow and the map both stand still.
+
+        Parameters:
+        - goal: Goal vector
+        - state: Equilibrium state
+        - residual: Largest |contribution + force| over the non-sliding components
+        - iterations: Newton iterations used
+        - converged: Whether the residual reached the tolerance
+        - sliding: Mask of the components held at the goal by the branch switch
+        - eigenvalues: Eigenvalues of the Jacobian over the non-sliding components
+          (all of them, or the rightmost ones for large systems)
+        - map_spectral_radius: Spectral radius of I + Jacobian, the linearised update() map
+        """
+        self.goal = goal
+        self.state = state
+        self.residual = residual
+        self.iterations = iterations
+        self.converged = converged
+        self.sliding = sliding
+        self.eigenvalues = eigenvalues
+        self.map_spectral_radius = map_spectral_radius
+
+    @property
+    def delta(self) -> np.ndarray:
+        return self.state - self.goal
+
+    @property
+    def flow_stable(self) -> bool:
+        # Attracting for the continuous-time dynamics
+        return bool(np.all(self.eigenvalues.real < 0)) if self.eigenvalues.size else True
+
+    @property
+    def map_stable(self) -> bool:
+        # Attracting for the unit-step update(); sliding components oscillate around the goal instead
+        return self.map_spectral_radius < 1 and not self.sliding.any()
+
+
+def _branch_values(kernel, delta: np.ndarray, force: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray]:
+    # Right-hand side with components at delta = 0 on their positive and on their negative branch
+    above = kernel(delta) + force
+    below = kernel(np.where(delta == 0, -SURFACE_OFFSET, delta)) + force
+    return above, below
+
+
+def _residual(kernel, delta: np.ndarray, force: np.ndarray) -> t.Tuple[float, np.ndarray, np.ndarray]:
+    # Largest residual over the non-sliding components, the sliding mask and the residual
+    above, below = _branch_values(kernel, delta, force)
+    sliding = (delta == 0) & (above < 0) & (below > 0)
+    residual = np.where(sliding, 0.0, above)
+    return float(np.max(np.abs(residual), initial=0.0)), sliding, residual
+
+
+def _regulators(kernel) -> np.ndarray:
+    # Dense kernels regulate dimension i with cluster i
+    return getattr(kernel, 'regulators', np.arange(kernel.n_dimensions))
+
+
+def jacobian(kernel, delta: np.ndarray):
+    """
+    Analytic Jacobian of the cluster contributions with respect to delta
+
+    Contribution i is r_k(x) * gain_i + passive_i with k the regulator of i,
+    x = 10 * clusters_positive @ delta and r = 1.5 * sigmoid(x) - 1, on the
+    branch given by the sign of delta_i. Hence
+
+        J = diag(gain * 15 * sigmoid'(x)[k]) @ clusters_positive[k, :]
+
+    which is sparse, with the pattern of the cluster matrix, for sparse kernels.
+    """
+    clusters = kernel.clusters_positive
+    regulators = _regulators(kernel)
+    activation = np.clip((clusters @ delta) * 10, -500, 500)
+    sigmoid = 1 / (1 + np.exp(-activation))
+    gain = np.where(delta < 0, kernel.gain_negative, kernel.gain_positive)
+    scale = gain * 15 * (sigmoid * (1 - sigmoid))[regulators]
+    if hasattr(clusters, 'tocsr'):
+        import scipy.sparse as sparse
+        return sparse.diags_array(scale) @ clusters[regulators]
+    return scale[:, None] * clusters[regulators]
+
+
+def _solve(matrix, rhs: np.ndarray) -> np.ndarray:
+    # Newton direction; least squares where the Jacobian is singular (dimensions no cluster touches,
+    # or sharing a regulator). Sparse systems are solved iteratively: LU of a scattered cluster
+    # pattern fills in nearly dense
+    if hasattr(matrix, 'tocsr'):
+        import scipy.sparse.linalg as sparse_linalg
+        return sparse_linalg.lsmr(matrix, rhs, atol=LSMR_TOLERANCE, btol=LSMR_TOLERANCE, maxiter=LSMR_ITERATIONS * rhs.size)[0]
+    try:
+        return np.linalg.solve(matrix, rhs)
+    except np.linalg.LinAlgError:
+        return np.linalg.lstsq(matrix, rhs, rcond=None)[0]
+
+
+def _spectrum(matrix, n_eigenvalues: t.Optional[int]) -> t.Tuple[np.ndarray, float]:
+    # Eigenvalues of J and the spectral radius of I + J
+    size = matrix.shape[0]
+    if size == 0:
+        return np.zeros(0, dtype=complex), 0.0
+    if size <= DENSE_EIGEN_LIMIT:
+        dense = matrix.toarray() if hasattr(matrix, 'toarray') else matrix
+        eigenvalues = np.linalg.eigvals(dense)
+        radius = float(np.max(np.abs(1 + eigenvalues)))
+        if n_eigenvalues is not None:
+            eigenvalues = eigenvalues[np.argsort(-eigenvalues.real)[:n_eigenvalues]]
+        return eigenvalues, radius
+
+    import scipy.sparse as sparse
+    import scipy.sparse.linalg as sparse_linalg
+    k = min(n_eigenvalues or N_SPARSE_EIGENVALUES, size - 2)
+    eigenvalues = sparse_linalg.eigs(matrix, k=k, which='LR', return_eigenvectors=False)
+    shifted = sparse.identity(size, format='csr') + matrix
+    radius = float(np.max(np.abs(sparse_linalg.eigs(shifted, k=1, which='LM', return_eigenvectors=False))))
+    return eigenvalues[np.argsort(-eigenvalues.real)], radius
+
+
+def solve_equilibrium(
+    kernel,
+    goal: np.ndarray,
+    external_force: t.Optional[np.ndarray] = None,
+    initial_state: t.Optional[np.ndarray] = None,
+    tol: float = 1e-10,
+    max_iterations: int = 100,
+    n_eigenvalues: t.Optional[int] = None
+) -> Equilibrium:
+    """
+    Equilibrium of the noise-free dynamics around one goal
+
+    Solves contributions(state - goal) + force = 0 by damped Newton with the
+    analytic Jacobian. The contributions are piecewise smooth, switching
+    branch with the sign of each delta component: a component crossing its
+    goal during a step stops on it, and a component at its goal whose two
+    branches point back at it is held there as sliding, leaving the others to
+    the linear solves, which are sparse for sparse kernels.
+
+    Convergence is local: where the force has no root near initial_state
+    the iteration stalls on the saturated sigmoids and converged is False.
+
+    Parameters:
+    - kernel: ClusterRegulationKernel or SparseClusterKernel of the model
+    - goal: Goal vector
+    - external_force: Constant force, zero by default
+    - initial_state: Starting point, the goal by default
+    - tol: Tolerance on the largest residual component
+    - max_iterations: Newton iterations before giving up
+    - n_eigenvalues: Number of rightmost eigenvalues to report, all of them by default for small systems
+    """
+    goal = np.asarray(goal, dtype=float)
+    force = np.zeros_like(goal) if external_force is None else np.asarray(external_force, dtype=float)
+    delta = np.zeros_like(goal) if initial_state is None else np.asarray(initial_state, dtype=float) - goal
+
+    norm, sliding, residual = _residual(kernel, delta, force)
+    iteration = 0
+    while norm > tol and iteration < max_iterations:
+        iteration += 1
+        free_index = np.flatnonzero(~sliding)
+        matrix = jacobian(kernel, delta)
+        direction = np.zeros_like(delta)
+        direction[free_index] = _solve(matrix[free_index][:, free_index], -residual[free_index])
+
+        # Components crossing their goal stop on it: beyond it the other branch holds, and the
+        # sliding test of the next iteration decides whether they stay there
+        activation_step = float(np.max(np.abs(kernel.clusters_positive @ direction), initial=0.0)) * 10
+        step = min(1.0, MAX_ACTIVATION_STEP / activation_step) if activation_step else 1.0
+        for _ in range(MAX_BACKTRACKS):
+            candidate = delta + step * direction
+            landed = delta * candidate < 0
+            candidate[landed] = 0.0
+            candidate_norm, candidate_sliding, candidate_residual = _residual(kernel, candidate, force)
+            if candidate_norm < norm:
+                break
+            step /= 2
+        delta, norm, sliding, residual = candidate, candidate_norm, candidate_sliding, candidate_residual
+
+    matrix = jacobian(kernel, delta)
+    free_index = np.flatnonzero(~sliding)
+    eigenvalues, radius = _spectrum(matrix[free_index][:, free_index], n_eigenvalues)
+    return Equilibrium(goal, goal + delta, norm, iteration, norm <= tol, sliding, eigenvalues, radius)
+
+
+def goal_equilibria(model, external_force: t.Optional[np.ndarray] = None, **kwargs) -> t.List[Equilibrium]:
+    """
+    Equilibrium of a BioHoloneticModel for every goal in model.goals
+
+    Keyword arguments are passed on to solve_equilibrium.
+    """
+    return [solve_equilibrium(model.cluster_kernel, goal, external_force, **kwargs) for goal in model.goals]
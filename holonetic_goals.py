@@ -0,0 +1,121 @@
+import numpy as np
+import typing as t
+
+from scipy.spatial import cKDTree
+
+# Points per KD-tree leaf: smaller leaves prune more, larger ones vectorise the final scan better
+DEFAULT_LEAF_SIZE = 16
+# Initial room for goals; the storage doubles as goals are added
+INITIAL_CAPACITY = 64
+
+
+class GoalLibrary:
+    def __init__(
+        self,
+        goals: t.Optional[np.ndarray] = None,
+        n_dimensions: t.Optional[int] = None,
+        leaf_size: int = DEFAULT_LEAF_SIZE
+    ):
+        """
+        Goal vectors of a BioHoloneticModel with a nearest-goal index
+
+        Goals are kept in insertion order, so a goal's index never changes. The
+        index is a short list of KD-trees over consecutive ranges of goals, each
+        at most half the size of the one before (the logarithmic method): adding
+        goals builds a tree over them and the newest trees more than half its
+        size, so every goal is rebuilt O(log n) times over the life of the
+        library and a query visits O(log n) trees of O(log n) depth each.
+
+        Parameters:
+        - goals: Initial (n_goals, D) goal vectors
+        - n_dimensions: D, needed when no initial goals are given
+        - leaf_size: Points per KD-tree leaf
+        """
+        if goals is not None:
+            goals = np.atleast_2d(np.asarray(goals, dtype=float))
+            n_dimensions = goals.shape[1]
+        if n_dimensions is None:
+            raise ValueError("A GoalLibrary without initial goals needs n_dimensions")
+
+        self.n_dimensions = n_dimensions
+        self.leaf_size = leaf_size
+        self._goals = np.empty((INITIAL_CAPACITY, n_dimensions))
+        self._size = 0
+        # (first goal index, KD-tree) per block, oldest and largest first
+        self._blocks = []
+        if goals is not None:
+            self.add(goals)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def goals(self) -> np.ndarray:
+        # (n_goals, D) view in insertion order; rows are never modified, so views handed out stay valid
+        return self._goals[:self._size]
+
+    def add(self, goals: np.ndarray) -> np.ndarray:
+        """
+        Insert one goal (D,) or a batch of goals (m, D)
+
+        Returns:
+        - The indices of the new goals
+        """
+        goals = np.atleast_2d(np.asarray(goals, dtype=float))
+        if goals.shape[1] != self.n_dimensions:
+            raise ValueError(f"Goals must have {self.n_dimensions} dimensions, got {goals.shape[1]}")
+        first = self._size
+        end = first + len(goals)
+        if end > len(self._goals):
+            grown = np.empty((max(end, 2 * len(self._goals)), self.n_dimensions))
+            grown[:first] = self._goals[:first]
+            self._goals = grown
+        self._goals[first:end] = goals
+        self._size = end
+
+        # Merge the newest blocks into the new one until the block before it is at least twice
+        # its size; blocks cover consecutive ranges, so the newest one ends where the new one starts
+        start = first
+        while self._blocks and start - self._blocks[-1][0] < 2 * (end - start):
+            start = self._blocks.pop()[0]
+        if end > start:
+            self._blocks.append((start, cKDTree(self._goals[start:end].copy(), leafsize=self.leaf_size)))
+        return np.arange(first, end)
+
+    def nearest(self, points: np.ndarray, k: int = 1) -> t.Tuple[np.ndarray, np.ndarray]:
+        """
+        Euclidean k-nearest goals of one point (D,) or a batch of points (M, D)
+
+        k is capped at the number of goals. The goals returned are listed by
+        distance and, at equal distance, by index; when several goals tie at
+        the k-th distance, which of them are returned is up to the KD-trees.
+
+        Returns:
+        - distances and goal indices, shaped like cKDTree.query: (M,) for k = 1
+          and (M, k) otherwise, without the M axis for a single point
+        """
+        if self._size == 0:
+            raise ValueError("The goal library is empty")
+        points = np.asarray(points, dtype=float)
+        batch = np.atleast_2d(points)
+        n_points = len(batch)
+        n_neighbours = min(k, self._size)
+
+        distances, indices = [], []
+        for start, tree in self._blocks:
+            block_k = min(n_neighbours, tree.n)
+            block_distances, block_indices = tree.query(batch, k=block_k)
+            distances.append(np.reshape(block_distances, (n_points, block_k)))
+            indices.append(np.reshape(block_indices, (n_points, block_k)) + start)
+        distances = np.concatenate(distances, axis=1)
+        indices = np.concatenate(indices, axis=1)
+        # Best n_neighbours across the blocks, by distance and then by index
+        order = np.lexsort((indices, distances))[:, :n_neighbours]
+        distances = np.take_along_axis(distances, order, axis=1)
+        indices = np.take_along_axis(indices, order, axis=1)
+
+        if k == 1:
+            distances, indices = distances[:, 0], indices[:, 0]
+        if points.ndim == 1:
+            distances, indices = distances[0], indices[0]
+        return distances, indices
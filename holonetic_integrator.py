@@ -0,0 +1,365 @@
+import math
+
+import numpy as np
+import typing as t
+
+from holon_random import CounterStream
+
+# Dormand-Prince 5(4) tableau: stage weights, 5th order weights and the error weights (5th - 4th order).
+# The right-hand side does not depend on time (the force is held over an interval), so the nodes are not needed.
+DOPRI_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+DOPRI_B = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0])
+DOPRI_E = np.array([71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40])
+# Quartic continuous extension: state(theta h) = state + h * stages.T @ DOPRI_P @ [theta, theta^2, theta^3, theta^4]
+DOPRI_P = np.array([
+    [1, -8048581381 / 2820520608, 8663915743 / 2820520608, -12715105075 / 11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200 / 32700410799, -68118460800 / 10900136933, 87487479700 / 32700410799],
+    [0, -1754552775 / 470086768, 14199869525 / 1410260304, -10690763975 / 1880347072],
+    [0, 127303824393 / 49829197408, -318862633887 / 49829197408, 701980252875 / 199316789632],
+    [0, -282668133 / 205662961, 2019193451 / 616988883, -1453857185 / 822651844],
+    [0, 40617522 / 29380423, -110615467 / 29380423, 69997945 / 29380423],
+])
+POWERS = np.arange(1, 5)
+
+# Step size controller: safety factor and bounds of the step change per attempt
+SAFETY = 0.9
+MIN_FACTOR = 0.2
+MAX_FACTOR = 5.0
+# Regula falsi iterations locating a switching surface on the dense output of a step
+MAX_EVENT_ITERATIONS = 20
+# Longest step with noise, as a fraction of sigma^2 / drift^2: the time over which a Wiener increment
+# moves a component as far as the drift does. Around a surface the noise spreads the state over
+# sigma^2 / (2 drift), so longer steps would apply noise the drift never gets to pull back
+NOISE_RESOLUTION = 0.1
+# Standard normal draws per dimension taken from the noise generator at once
+NOISE_BLOCK = 256
+
+
+class ContinuousHoloneticIntegrator:
+    def __init__(
+        self,
+        model,
+        rtol: float = 1e-3,
+        atol: float = 1e-6,
+        decision_interval: float = 1.0,
+        max_step: t.Optional[float] = None,
+        min_step: float = 1e-10,
+        streams=None
+    ):
+        """
+        Continuous-time mode of a BioHoloneticModel (v25 or v28)
+
+        Between decisions the state follows ds/dt = clusters(s - goal) + F + sigma dW/dt:
+        the cluster contributions plus the external force are integrated with
+        an adaptive Dormand-Prince 5(4) scheme, and the noise enters as a Wiener
+        increment sigma * sqrt(h) * N(0, 1) after each accepted step, so its
+        variance per unit time is that of the discrete model. The step shrinks
+        where the sigmoid regulation turns, close to the goal, and grows to
+        the whole interval in quiet stretches. With noise, steps are held
+        below NOISE_RESOLUTION * sigma^2 / drift^2, and where that bound is
+        the shorter one an Euler-Maruyama step replaces Dormand-Prince.
+
+        The contributions switch branch where a component of delta changes sign,
+        and both branches push towards delta = 0, so the goal is a sliding
+        surface on which the discrete model oscillates step after step. Here
+        every step keeps each component on one branch, steps that reach a
+        surface end on it, and the component then slides along it (Filippov)
+        instead of chattering. An interval in which every component slides
+        costs two evaluations of the contributions when there is no noise.
+        Noise acts on every component, sliding or not, and may carry it off
+        or across its surface; the branches are then taken again from the
+        noisy state, so excursions from the goal, and the stop counter they
+        drive, follow the noise level.
+
+        Every decision_interval the discrete part of update() runs as an event:
+        the stop counter sees the current delta, the model's own
+        trigger_goal_transition picks the goal, and the trace records the step.
+        With decision_interval = 1 decisions come at the cadence of update().
+
+        Parameters:
+        - model: BioHoloneticModel; its state, goal, counters and generators are used in place
+        - rtol, atol: Relative and absolute tolerance of the local error, by
+          default those of scipy's solve_ivp, far below the noise of the model
+        - decision_interval: Time between goal decisions
+        - max_step: Longest step, by default only bounded by the decision interval
+        - min_step: Shortest step before giving up on the tolerance
+        - streams: Optional holon_random.RandomStreams of the model; the default
+          force of run() draws from its 'force' stream, as holon_models does
+        """
+        self.model = model
+        self.rtol = rtol
+        self.atol = atol
+        self.decision_interval = decision_interval
+        self.max_step = max_step if max_step is not None else math.inf
+        self.min_step = min_step
+        self.force_generator = streams.stream('force') if streams is not None else model.noise_generator
+        self.time = 0.0
+        # Step size carried over between intervals, reset when the goal changes
+        self.step_size = None
+        # Components sliding along their switching surface delta = 0
+        self.sliding = np.zeros(model.n_dimensions, dtype=bool)
+        # Largest one-sided slope at the last branch evaluation, which bounds the steps with noise
+        self.drift = 0.0
+        self._noise = np.zeros((0, model.n_dimensions))
+        self._noise_position = 0
+        self.n_accepted = 0
+        self.n_rejected = 0
+        self.n_evaluations = 0
+
+    def rhs(self, state: np.ndarray, external_force: np.ndarray, negative: np.ndarray) -> np.ndarray:
+        self.n_evaluations += 1
+        slope = self.model.cluster_kernel(state - self.model.goal, negative) + external_force
+        # Sliding components stay on their switching surface (Filippov solution)
+        slope[self.sliding] = 0.0
+        return slope
+
+    def _branches(self, state: np.ndarray, external_force: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray]:
+        """
+        Branch of every component for the next step, and the slope at state
+
+        The contribution of a dimension switches between its positive and
+        negative branch where its delta changes sign; off the surface the
+        branch is that sign. A component sitting at delta = 0 whose positive
+        branch points down and negative branch points up cannot leave the
+        surface, and slides along it; any other leaves it on the branch it
+        points into.
+        """
+        delta = state - self.model.goal
+        negative = delta < 0
+        on_surface = delta == 0
+        self.sliding = np.zeros_like(on_surface)
+        if not on_surface.any():
+            slope = self.rhs(state, external_force, negative)
+            self.drift = float(np.max(np.abs(slope), initial=0.0))
+            return negative, slope
+        # The contribution of a dimension only depends on its own branch, so two evaluations give both sides
+        above = self.rhs(state, external_force, negative)
+        below = self.rhs(state, external_force, negative | on_surface)
+        self.sliding = on_surface & (above < 0) & (below > 0)
+        self.drift = float(np.max(np.maximum(np.abs(above), np.abs(below)), initial=0.0))
+        negative = negative | (on_surface & ~self.sliding & (above < 0))
+        slope = np.where(negative, below, above)
+        slope[self.sliding] = 0.0
+        return negative, slope
+
+    def _standard_noise(self) -> np.ndarray:
+        # Next N(0, 1) vector; steps with noise are short, so the generator is called once per block of them
+        if self._noise_position == len(self._noise):
+            self._noise = self.model.noise_generator.normal(0, 1, (NOISE_BLOCK, self.model.n_dimensions))
+            self._noise_position = 0
+        self._noise_position += 1
+        return self._noise[self._noise_position - 1]
+
+    def _initial_step(self, state: np.ndarray, slope: np.ndarray, external_force: np.ndarray, negative: np.ndarray) -> float:
+        # Step moving the state by about 1% of its distance to the goal, where the surfaces are,
+        # refined by the change of the slope over it (Hairer, Norsett and Wanner)
+        scale = self.atol + self.rtol * np.abs(state)
+        d0 = np.sqrt(np.mean(((state - self.model.goal) / scale) ** 2))
+        d1 = np.sqrt(np.mean((slope / scale) ** 2))
+        first = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+        first = min(first, self.max_step)
+        d2 = np.sqrt(np.mean(((self.rhs(state + first * slope, external_force, negative) - slope) / scale) ** 2)) / first
+        second = max(1e-6, first * 1e-3) if max(d1, d2) <= 1e-15 else (0.01 / max(d1, d2)) ** (1 / 5)
+        return min(max(min(100 * first, second), self.min_step), self.max_step)
+
+    def _dopri_step(
+        self,
+        state: np.ndarray,
+        step: float,
+        external_force: np.ndarray,
+        k1: np.ndarray,
+        negative: np.ndarray
+    ) -> t.Tuple[np.ndarray, float, t.List[np.ndarray]]:
+        # One Dormand-Prince step on fixed branches: the 5th order solution, its scaled error norm and
+        # the stages, the last of which is the slope at the solution
+        stages = [k1]
+        for row in DOPRI_A[1:]:
+            increment = sum(a * k for a, k in zip(row, stages) if a)
+            stages.append(self.rhs(state + step * increment, external_force, negative))
+        new_state = state + step * sum(b * k for b, k in zip(DOPRI_B, stages) if b)
+        error = step * sum(e * k for e, k in zip(DOPRI_E, stages) if e)
+        scale = self.atol + self.rtol * np.maximum(np.abs(state), np.abs(new_state))
+        return new_state, float(np.sqrt(np.mean((error / scale) ** 2))), stages
+
+    @staticmethod
+    def _crossing_fraction(delta: np.ndarray, coefficients: np.ndarray, crossed: np.ndarray, tolerance: np.ndarray) -> float:
+        """
+        Fraction of a step at which the first crossing component reaches its surface
+
+        Solved on the dense output of the step by regula falsi (Illinois), so
+        locating a crossing costs no evaluation of the right-hand side.
+        """
+        start = delta[crossed]
+        coefficients = coefficients[crossed]
+        tolerance = tolerance[crossed]
+        low, high = np.zeros(len(start)), np.ones(len(start))
+        low_value, high_value = start, start + coefficients.sum(axis=1)
+        for _ in range(MAX_EVENT_ITERATIONS):
+            fraction = low - low_value * (high - low) / (high_value - low_value)
+            value = start + (coefficients * fraction[:, None] ** POWERS).sum(axis=1)
+            if np.all(np.abs(value) <= tolerance):
+                break
+            # The end kept twice in a row has its value halved, so both ends keep moving
+            before = np.sign(value) == np.sign(low_value)
+            low, high = np.where(before, fraction, low), np.where(before, high, fraction)
+            low_value, high_value = np.where(before, value, low_value / 2), np.where(before, high_value / 2, value)
+        return float(fraction.min())
+
+    def integrate(self, duration: float, external_force: np.ndarray) -> np.ndarray:
+        """
+        Advance the model state by duration at the current goal, without decisions
+
+        Each step keeps the branch of every component fixed, so its stages see
+        a smooth field and the error control measures the dynamics rather than
+        the switch. A step that carries a component across its surface is cut
+        where the dense output reaches the surface, and the component is
+        snapped onto it. Noise is then added to every component.
+        """
+        model = self.model
+        goal = model.goal
+        state = model.state
+        # Overshoots below this are snapped onto the surface instead of being located further
+        tolerance = self.atol + self.rtol * np.abs(goal)
+        remaining = duration
+        k1 = None
+        # Rounding in the remaining time must not leave a last step of a few ulps
+        while remaining > duration * 1e-12:
+            if k1 is None:
+                negative, k1 = self._branches(state, external_force)
+            if self.sliding.all() and not model.noise_sigma:
+                # Every component slides at its goal and nothing moves it off
+                self.time += remaining
+                break
+            if self.step_size is None:
+                self.step_size = self._initial_step(state, k1, external_force, negative)
+            noise_step = math.inf
+            if model.noise_sigma and self.drift:
+                noise_step = NOISE_RESOLUTION * model.noise_sigma ** 2 / self.drift ** 2
+            if noise_step < self.step_size:
+                # Over so short a step the noise moves the state further than the drift, and an Euler
+                # step on the slope at hand is as accurate as the noise allows; it ends where the
+                # first component reaches its surface
+                step = min(noise_step, remaining)
+                new_state = state + step * k1
+                delta = state - goal
+                new_delta = new_state - goal
+                crossed = delta * new_delta < 0
+                if crossed.any():
+                    fraction = float(np.min(delta[crossed] / (delta[crossed] - new_delta[crossed])))
+                    new_state = state + fraction * step * k1
+                    new_delta = new_state - goal
+                    step *= fraction
+                k_last = None
+            else:
+                step = min(self.step_size, remaining)
+                rejected = False
+                while True:
+                    new_state, error, stages = self._dopri_step(state, step, external_force, k1, negative)
+                    if error <= 1 or step <= self.min_step:
+                        break
+                    self.n_rejected += 1
+                    rejected = True
+                    self.step_size = max(self.min_step, step * max(MIN_FACTOR, SAFETY * error ** -0.2))
+                    step = min(self.step_size, remaining)
+                if step == self.step_size:
+                    # Only full steps tune the step size, and not upwards right after a rejection
+                    factor = MAX_FACTOR if error == 0 else min(MAX_FACTOR, max(MIN_FACTOR, SAFETY * error ** -0.2))
+                    self.step_size = min(self.max_step, max(self.min_step, step * (min(factor, 1.0) if rejected else factor)))
+
+                delta = state - goal
+                new_delta = new_state - goal
+                k_last = stages[-1]
+                crossed = (delta * new_delta < 0) & (np.abs(new_delta) > tolerance)
+                if crossed.any():
+                    # The field beyond the surface belongs to the other branch: end the step on it
+                    coefficients = step * (np.stack(stages, axis=1) @ DOPRI_P)
+                    fraction = self._crossing_fraction(delta, coefficients, crossed, tolerance)
+                    new_state = state + coefficients @ fraction ** POWERS
+                    new_delta = new_state - goal
+                    step *= fraction
+                    k_last = None
+            landed = (delta != 0) & ((delta * new_delta < 0) | (np.abs(new_delta) <= tolerance))
+            new_state[landed] = goal[landed]
+            # The last stage is the slope of the next step while the state and its branches stay as they are
+            k1 = k_last if not landed.any() and not self.sliding.any() else None
+            if model.noise_sigma:
+                # The Wiener increment moves every component, off its surface or across it;
+                # the next step takes the branches from where the noise left the state
+                new_state = new_state + model.noise_sigma * step ** 0.5 * self._standard_noise()
+                k1 = None
+            state = new_state
+            remaining -= step
+            self.time += step
+            self.n_accepted += 1
+        model.state = state
+        return state
+
+    def update(self, external_force: np.ndarray) -> bool:
+        """
+        Integrate over one decision interval, then run the goal decision event
+
+        Returns:
+        - A boolean indicating whether the simulation should continue
+        """
+        model = self.model
+        model.prev_state = model.state.copy()
+        self.integrate(self.decision_interval, external_force)
+
+        # Stop condition on the delta reached at the end of the interval
+        model.delta = model.state - model.goal
+        if np.any(np.abs(model.delta) > 3):
+            model.stop_counter += 1
+        else:
+            model.stop_counter = 0
+
+        previous_goal = model.goal
+        model.goal = model.trigger_goal_transition()
+        if not np.array_equal(model.goal, previous_goal):
+            # The right-hand side jumps with the goal: start over from a fresh step estimate
+            self.step_size = None
+
+        continue_simulation = model.stop_counter < model.stop_threshold
+        model.record_trace(previous_goal, continue_simulation)
+        model.step_count += 1
+        return continue_simulation
+
+    def _default_force(self) -> np.ndarray:
+        # uniform(-0.5, 0.5) per dimension, as in main()
+        if isinstance(self.force_generator, CounterStream):
+            return self.force_generator.uniforms(self.model.n_dimensions) - 0.5
+        return self.force_generator.uniform(-0.5, 0.5, self.model.n_dimensions)
+
+    def run(
+        self,
+        n_decisions: int,
+        external_force: t.Optional[t.Callable[[float], np.ndarray]] = None
+    ) -> int:
+        """
+        Run up to n_decisions decision intervals or until the stop condition
+
+        Parameters:
+        - external_force: Callable time -> force held over the next interval; by
+          default uniform(-0.5, 0.5) per dimension as in main(), drawn from the
+          force stream, or from the model's noise generator without streams
+
+        Returns:
+        - Number of decision intervals completed
+        """
+        model = self.model
+        for decision in range(n_decisions):
+            if external_force is None:
+                force = self._default_force()
+            else:
+                force = external_force(self.time)
+            if not self.update(force):
+                return decision + 1
+        return n_decisions
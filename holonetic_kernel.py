@@ -0,0 +1,222 @@
+import numpy as np
+import typing as t
+
+# Contribution rules of the two BioHoloneticModel versions
+SELECTED_VALUE = 'value'    # modelo biologico-holonetico25: most extreme value of the cluster column
+SELECTED_COLUMN = 'column'  # modelo biologico-holonetico28: whole cluster column
+
+
+class ClusterRegulationKernel:
+    def __init__(
+        self,
+        clusters_positive: np.ndarray,
+        clusters_negative: np.ndarray,
+        rule: str = SELECTED_VALUE
+    ):
+        """
+        Vectorized cluster contributions of BioHoloneticModel.compute_delta_state
+
+        The per-dimension selection (argmin/argmax or whole column) and the sums
+        of the non-selected clusters only depend on the cluster matrices, so they
+        are tabulated here once. A step then costs one mat-vec and one sigmoid.
+
+        Parameters:
+        - clusters_positive: (n_clusters, n_dimensions) positive cluster matrix
+        - clusters_negative: Twin matrix used for dimensions with negative delta
+        - rule: SELECTED_VALUE (v25) or SELECTED_COLUMN (v28)
+        """
+        clusters_positive = np.asarray(clusters_positive, dtype=float)
+        clusters_negative = np.asarray(clusters_negative, dtype=float)
+        if clusters_positive.shape != clusters_negative.shape:
+            raise ValueError("Positive and negative cluster matrices must have the same shape")
+        n_clusters, n_dimensions = clusters_positive.shape
+        if n_clusters < n_dimensions:
+            # Dimension i is regulated by cluster i
+            raise ValueError("The regulation of dimension i needs cluster i, so n_clusters must be >= n_dimensions")
+
+        self.clusters_positive = clusters_positive
+        self.clusters_negative = clusters_negative
+        self.rule = rule
+        self.n_dimensions = n_dimensions
+
+        if rule == SELECTED_VALUE:
+            selected_positive = clusters_positive.max(axis=0)
+            selected_negative = clusters_negative.min(axis=0)
+            self.gain_positive = selected_positive
+            self.gain_negative = selected_negative
+            self.passive_positive = self._passive_sum(lambda values: values != selected_positive)
+            self.passive_negative = self._passive_sum(lambda values: values != selected_negative)
+        elif rule == SELECTED_COLUMN:
+            self.gain_positive = clusters_positive.sum(axis=0)
+            self.gain_negative = clusters_negative.sum(axis=0)
+            self.passive_positive = self._passive_sum(lambda values: ~self._in_column(values, clusters_positive))
+            self.passive_negative = self._passive_sum(lambda values: ~self._in_column(values, clusters_negative))
+        else:
+            raise ValueError(f"Unknown contribution rule: {rule}")
+
+    def _passive_sum(self, is_passive) -> np.ndarray:
+        """
+        Sum per dimension of the cluster values that are not part of the selection
+        """
+        passive = np.zeros(self.n_dimensions)
+        for clusters in (self.clusters_positive, self.clusters_negative):
+            passive += np.where(is_passive(clusters), clusters, 0).sum(axis=0)
+        return passive
+
+    @staticmethod
+    def _in_column(values: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """
+        Whether values[j, i] occurs anywhere in columns[:, i]
+        """
+        return np.stack([np.isin(values[:, i], columns[:, i]) for i in range(values.shape[1])], axis=1)
+
+    def regulation(self, delta: np.ndarray) -> np.ndarray:
+        """
+        Dynamic regulation factors of all clusters
+
+        Sigmoid of 10 * (delta . clusters_positive[i]) adjusted to 1.5 / (1 + e^-x) - 1.
+        Works on a single delta of shape (D,) or a batch of shape (M, D).
+        """
+        activation_level = (delta @ self.clusters_positive.T) * 10
+        # Beyond |x| = 500 the sigmoid is already saturated in double precision
+        return 1.5 / (1 + np.exp(-np.clip(activation_level, -500, 500))) - 1
+
+    def __call__(self, delta: np.ndarray, negative: t.Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Cluster contributions for a single delta (D,) or a batch of deltas (M, D)
+
+        negative selects the branch of each dimension, by default the sign of
+        delta; a fixed one gives the smooth extension of a branch past delta = 0.
+        """
+        regulation_factor = self.regulation(delta)[..., :self.n_dimensions]
+        if negative is None:
+            negative = delta < 0
+        gain = np.where(negative, self.gain_negative, self.gain_positive)
+        passive = np.where(negative, self.passive_negative, self.passive_positive)
+        return regulation_factor * gain + passive
+
+
+def _column_reduce(ufunc, columns: np.ndarray, values: np.ndarray, n_dimensions: int, initial: float) -> np.ndarray:
+    # ufunc reduction of values per column index, 0 for columns without entries
+    reduced = np.full(n_dimensions, initial)
+    ufunc.at(reduced, columns, values)
+    reduced[np.bincount(columns, minlength=n_dimensions) == 0] = 0.0
+    return reduced
+
+
+def _entry_keys(columns: np.ndarray, value_ids: np.ndarray, n_values: int) -> np.ndarray:
+    # One integer per (column, value) pair, for exact membership tests per column
+    return columns.astype(np.int64) * n_values + value_ids
+
+
+class SparseClusterKernel:
+    def __init__(
+        self,
+        clusters_positive,
+        clusters_negative=None,
+        rule: str = SELECTED_VALUE,
+        regulators: t.Optional[np.ndarray] = None
+    ):
+        """
+        Cluster contributions of arbitrary (n_clusters, n_dimensions) sparse cluster matrices
+
+        Same contribution rules as ClusterRegulationKernel, with the matrices held
+        in CSR form, so a step costs O(nnz + n_clusters + n_dimensions): one
+        sparse mat-vec for the activations, then per-dimension tables. Stored
+        entries are the dimensions a cluster touches; the selection and the
+        passive sums run over the stored entries of each column only, which
+        matches the dense kernel for matrices without zero entries.
+
+        The negative twin defaults to the opposite sign of the positive matrix
+        and is never built: only the positive matrix enters the activations,
+        and the twin's tables follow from the positive entries.
+
+        Parameters:
+        - clusters_positive: (C, D) scipy.sparse matrix or array, converted to CSR
+        - clusters_negative: Optional explicit twin of the same shape
+        - rule: SELECTED_VALUE (v25) or SELECTED_COLUMN (v28)
+        - regulators: Cluster whose regulation factor drives each dimension; by
+          default cluster i for dimension i when C >= D, as in the dense kernel,
+          otherwise the cluster with the largest |value| in the dimension's column
+        """
+        import scipy.sparse as sparse
+
+        self.clusters_positive = sparse.csr_array(clusters_positive, dtype=float)
+        self.clusters_positive.sum_duplicates()
+        n_clusters, n_dimensions = self.clusters_positive.shape
+        self.clusters_negative = None
+        if clusters_negative is not None:
+            self.clusters_negative = sparse.csr_array(clusters_negative, dtype=float)
+            self.clusters_negative.sum_duplicates()
+            if self.clusters_negative.shape != self.clusters_positive.shape:
+                raise ValueError("Positive and negative cluster matrices must have the same shape")
+        self.rule = rule
+        self.n_clusters = n_clusters
+        self.n_dimensions = n_dimensions
+
+        positive = self.clusters_positive.tocoo()
+        positive_columns, positive_values = positive.col, positive.data
+        if self.clusters_negative is None:
+            negative_columns, negative_values = positive_columns, -positive_values
+        else:
+            negative = self.clusters_negative.tocoo()
+            negative_columns, negative_values = negative.col, negative.data
+
+        if regulators is None:
+            if n_clusters >= n_dimensions:
+                regulators = np.arange(n_dimensions)
+            else:
+                # Dominant cluster of each dimension; untouched dimensions contribute nothing anyway
+                magnitude = np.abs(positive_values)
+                strongest = _column_reduce(np.maximum, positive_columns, magnitude, n_dimensions, -np.inf)
+                regulators = np.zeros(n_dimensions, dtype=np.int64)
+                dominant = magnitude == strongest[positive_columns]
+                regulators[positive_columns[dominant][::-1]] = positive.row[dominant][::-1]
+        regulators = np.asarray(regulators, dtype=np.int64)
+        if regulators.shape != (n_dimensions,) or np.any((regulators < 0) | (regulators >= n_clusters)):
+            raise ValueError("regulators must give one cluster index per dimension")
+        self.regulators = regulators
+
+        all_columns = np.concatenate([positive_columns, negative_columns])
+        all_values = np.concatenate([positive_values, negative_values])
+        if rule == SELECTED_VALUE:
+            self.gain_positive = _column_reduce(np.maximum, positive_columns, positive_values, n_dimensions, -np.inf)
+            self.gain_negative = _column_reduce(np.minimum, negative_columns, negative_values, n_dimensions, np.inf)
+            self.passive_positive = np.bincount(
+                all_columns, np.where(all_values != self.gain_positive[all_columns], all_values, 0), minlength=n_dimensions)
+            self.passive_negative = np.bincount(
+                all_columns, np.where(all_values != self.gain_negative[all_columns], all_values, 0), minlength=n_dimensions)
+        elif rule == SELECTED_COLUMN:
+            self.gain_positive = np.bincount(positive_columns, positive_values, minlength=n_dimensions)
+            self.gain_negative = np.bincount(negative_columns, negative_values, minlength=n_dimensions)
+            _, value_ids = np.unique(all_values, return_inverse=True)
+            n_values = int(value_ids.max()) + 1 if len(value_ids) else 1
+            keys = _entry_keys(all_columns, value_ids, n_values)
+            positive_keys, negative_keys = keys[:len(positive_values)], keys[len(positive_values):]
+            self.passive_positive = np.bincount(
+                all_columns, np.where(np.isin(keys, positive_keys), 0, all_values), minlength=n_dimensions)
+            self.passive_negative = np.bincount(
+                all_columns, np.where(np.isin(keys, negative_keys), 0, all_values), minlength=n_dimensions)
+        else:
+            raise ValueError(f"Unknown contribution rule: {rule}")
+
+    def regulation(self, delta: np.ndarray) -> np.ndarray:
+        """
+        Dynamic regulation factors of all clusters, for a delta (D,) or a batch (M, D)
+        """
+        activation_level = (self.clusters_positive @ delta.T).T * 10
+        return 1.5 / (1 + np.exp(-np.clip(activation_level, -500, 500))) - 1
+
+    def __call__(self, delta: np.ndarray, negative: t.Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Cluster contributions for a single delta (D,) or a batch of deltas (M, D)
+
+        negative selects the branch of each dimension, by default the sign of
+        delta; a fixed one gives the smooth extension of a branch past delta = 0.
+        """
+        regulation_factor = self.regulation(delta)[..., self.regulators]
+        if negative is None:
+            negative = delta < 0
+        gain = np.where(negative, self.gain_negative, self.gain_positive)
+        passive = np.where(negative, self.passive_negative, self.passive_positive)
+        return regulation_factor * gain + passive
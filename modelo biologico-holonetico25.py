@@ -1,12 +1,15 @@
 import numpy as np
 import typing as t
 
+from holonetic_kernel import ClusterRegulationKernel, SparseClusterKernel, SELECTED_VALUE
+
 class BioHoloneticModel:
     def __init__(
         self, 
         n_dimensions: int, 
         n_clusters: int,
-        noise_sigma: float = 0.1
+        noise_sigma: float = 0.1,
+        streams=None
     ):
         """
         Initialize the Bio-Holonetic Model
@@ -15,6 +18,7 @@ class BioHoloneticModel:
         - n_dimensions: State space dimensionality
         - n_clusters: Number of regulatory clusters
         - noise_sigma: Standard deviation for external noise
+        - streams: Optional holon_random.RandomStreams giving the noise and the cue their own streams
         """
         self.n_dimensions = n_dimensions
         self.n_clusters = n_clusters
@@ -32,23 +36,39 @@ class BioHoloneticModel:
         ])
         
         # Fixed cluster configurations with twin clusters and opposite signs
-        self.clusters_positive = np.array([
+        self.set_clusters(np.array([
             [0.9, 0.5, 0.3],
             [0.3, 0.9, 0.5],
             [0.5, 0.3, 0.9]
-        ])
-        self.clusters_negative = -self.clusters_positive  # Corrected negative cluster creation
+        ]))
         
-        # Initialize the cue generator
-        self.cue_generator = np.random.RandomState()
+        # Initialize the noise and cue generators: per-component streams when given, otherwise the
+        # original draws from NumPy's global state and a RandomState cue generator
+        if streams is None:
+            self.noise_generator = np.random
+            self.cue_generator = np.random.RandomState()
+        else:
+            self.noise_generator = streams.stream('noise')
+            self.cue_generator = streams.stream('cue')
 
         # Initialize the current goal
         self.goal = self.goals[0]
 
+        # Optional holonetic_goals.GoalLibrary: when the state enters a transition region the new goal
+        # is the library goal nearest to it, or one of the goal_neighbours nearest picked by the cue stream
+        self.goal_library = None
+        self.goal_neighbours = 1
+
         # Counter for stop signal condition
         self.stop_counter = 0
         self.stop_threshold = 5
 
+        # Per-step output: printed lines when verbose, binary columns when a TraceRecorder is attached
+        self.verbose = False
+        self.trace = None
+        self.step_count = 0
+        self.delta = np.zeros(n_dimensions)
+
     def compute_delta_state(self, external_force: np.ndarray) -> np.ndarray:
         """
         Compute state change based on regulated clusters and external force
@@ -57,7 +77,9 @@ class BioHoloneticModel:
         """
         # Compute delta as the difference between state and goal
         delta = self.state - self.goal
-        print(f"Delta: {delta}")
+        self.delta = delta
+        if self.verbose:
+            print(f"Delta: {delta}")
     
         # Check for stop condition
         if np.any(np.abs(delta) > 3):
@@ -65,56 +87,52 @@ class BioHoloneticModel:
         else:
             self.stop_counter = 0  # Reset counter if condition is not met
 
-        # Compute cluster contributions
-        cluster_contributions = np.zeros(self.n_dimensions)
-    
-        for i in range(self.n_dimensions):
-            # Determine the most negative or most positive cluster value based on delta
-            if delta[i] < 0:
-                # Select the most negative value from clusters_negative
-                selected_cluster = self.clusters_negative[np.argmin(self.clusters_negative[:, i]), i]
-            else:
-                # Select the most positive value from clusters_positive
-                selected_cluster = self.clusters_positive[np.argmax(self.clusters_positive[:, i]), i]
-        
-            # Compute dynamic regulation factor
-            Di = self._compute_dynamic_regulation(delta, i)
-        
-            # Calculate contribution from the selected cluster
-            cluster_contribution = Di * selected_cluster
-            cluster_contributions[i] += cluster_contribution
-
-            # Adding non-regulated contributions (just activation)
-            for j in range(self.n_clusters):
-                if self.clusters_positive[j, i] != selected_cluster:
-                    cluster_contributions[i] += self.clusters_positive[j, i]
-                if self.clusters_negative[j, i] != selected_cluster:
-                    cluster_contributions[i] += self.clusters_negative[j, i]
-        
-            print(f"Dimension {i}: Selected Cluster Contribution = {cluster_contribution}, Total Contribution = {cluster_contributions[i]}")
+        # Compute cluster contributions for all dimensions at once
+        cluster_contributions = self.cluster_kernel(delta)
+        if self.verbose:
+            print(f"Cluster Contributions: {cluster_contributions}")
 
         # Add external force with noise
-        noise = np.random.normal(0, self.noise_sigma, self.n_dimensions)
+        noise = self.noise_generator.normal(0, self.noise_sigma, self.n_dimensions)
         external_force_with_noise = external_force + noise
     
         delta_state = cluster_contributions + external_force_with_noise
         return delta_state
     
+    def set_clusters(
+        self,
+        clusters_positive: np.ndarray,
+        clusters_negative: t.Optional[np.ndarray] = None
+    ):
+        """
+        Set the cluster configuration and precompute the cluster-selection tables
+
+        The negative twin clusters default to the opposite sign of the positive ones.
+        Sparse (scipy.sparse) matrices of any (n_clusters, n_dimensions) shape use
+        the O(nnz) SparseClusterKernel, which derives the twin without building it.
+        n_clusters follows the matrices; matrices over another number of
+        dimensions need goals and a state of that size, which the caller sets.
+        """
+        if hasattr(clusters_positive, 'tocsr'):
+            self.cluster_kernel = SparseClusterKernel(clusters_positive, clusters_negative, rule=SELECTED_VALUE)
+            self.clusters_positive = self.cluster_kernel.clusters_positive
+            self.clusters_negative = self.cluster_kernel.clusters_negative
+            self.n_clusters = self.cluster_kernel.n_clusters
+            return
+        self.clusters_positive = np.asarray(clusters_positive, dtype=float)
+        if clusters_negative is None:
+            clusters_negative = -self.clusters_positive
+        self.clusters_negative = np.asarray(clusters_negative, dtype=float)
+        self.cluster_kernel = ClusterRegulationKernel(self.clusters_positive, self.clusters_negative, rule=SELECTED_VALUE)
+        self.n_clusters = self.clusters_positive.shape[0]
+
     def _compute_dynamic_regulation(self, delta: np.ndarray, cluster_idx: int) -> float:
         """
         Compute dynamic regulation factor for a cluster
     
         Use a combination of a fixed amplification factor and a sigmoid activation
         """
-        # Sigmoid function to determine regulation strength
-        sigmoid_activation = lambda x: 1.5 / (1 + np.exp(-x)) - 1  # Adjusted sigmoid to range [-1, 1]
-    
-        # Calculate the activation level based on delta
-        # Scaling the dot product to ensure a meaningful range for sigmoid input
-        activation_level = np.dot(delta, self.clusters_positive[cluster_idx]) * 10
-        regulation_factor = sigmoid_activation(activation_level)
-    
-        return regulation_factor
+        return self.cluster_kernel.regulation(delta)[cluster_idx]
     
     def trigger_goal_transition(
         self, 
@@ -124,14 +142,34 @@ class BioHoloneticModel:
         Goal transition mechanism with internal state dependency
         """
         # Generate a random cue
-        cue = self.cue_generator.randint(1, 6)
+        cue = self._cue_integers(1, 6)
         
         if cue == 5:
             # Trigger goal change
-            return self.goals[np.random.choice(len(self.goals))]
+            return self.goals[self._random_goal_index()]
+
+        # With a goal library, transition regions of the state select a nearby library goal
+        if self.goal_library is not None and np.any(self._identify_transition_regions()):
+            return self._nearest_library_goal()
         
         return self.goal
     
+    def _cue_integers(self, *args) -> int:
+        """
+        Integer draw of the cue generator: randint of the original RandomState, integers of a stream
+        """
+        if isinstance(self.cue_generator, np.random.RandomState):
+            return self.cue_generator.randint(*args)
+        return self.cue_generator.integers(*args)
+
+    def _random_goal_index(self) -> int:
+        """
+        Index of a random goal: np.random.choice as originally, or the cue stream when it is one
+        """
+        if isinstance(self.cue_generator, np.random.RandomState):
+            return np.random.choice(len(self.goals))
+        return self.cue_generator.integers(len(self.goals))
+
     def _identify_transition_regions(self) -> np.ndarray:
         """
         Identify critical regions in state space for goal transition
@@ -143,6 +181,15 @@ class BioHoloneticModel:
             (np.abs(self.state) < 0.1)
         )
         return transition_mask
+
+    def _nearest_library_goal(self) -> np.ndarray:
+        """
+        Library goal nearest to the current state, or a random one of its goal_neighbours nearest
+        """
+        _, index = self.goal_library.nearest(self.state, self.goal_neighbours)
+        if self.goal_neighbours > 1:
+            index = index[self._cue_integers(index.size)]
+        return self.goal_library.goals[index]
     
     def update(self, external_force: np.ndarray) -> bool:
         """
@@ -159,14 +206,32 @@ class BioHoloneticModel:
         self.state += delta_state
         
         # Trigger goal transition if necessary
+        previous_goal = self.goal
         self.goal = self.trigger_goal_transition()
 
         # Check if stop condition is met
-        return self.stop_counter < self.stop_threshold
+        continue_simulation = self.stop_counter < self.stop_threshold
+
+        self.record_trace(previous_goal, continue_simulation)
+        self.step_count += 1
+        return continue_simulation
+
+    def record_trace(self, previous_goal: np.ndarray, continue_simulation: bool):
+        """
+        Record the current step to the attached TraceRecorder, if it samples this step
+        """
+        trace = self.trace
+        if trace is None:
+            return
+        # Goal changes and stops are the events of an event-only trace
+        event = not continue_simulation or not np.array_equal(self.goal, previous_goal)
+        if trace.should_record(self.step_count, event):
+            trace.record(step=self.step_count, delta=self.delta, goal=self.goal, state=self.state)
 
 # Example usage and demonstration
 def main():
     model = BioHoloneticModel(n_dimensions=3, n_clusters=3, noise_sigma=0.1)
+    model.verbose = True
     
     # Simulate several time steps
     for t in range(100):
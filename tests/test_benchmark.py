@@ -0,0 +1,75 @@
+import copy
+import json
+
+import pytest
+
+from holon_benchmark import compare, run_suite, workloads
+from holon_models import HOLONETIC_MODELS, VARIANTS
+
+# Relative changes of a metric and whether compare flags them at the default tolerance of 10%
+CHANGES = [(-0.2, False), (0.05, False), (0.2, True)]
+
+
+def test_every_model_has_a_workload():
+    names = set(workloads())
+    assert names == set(VARIANTS) | {'fused_' + variant for variant in VARIANTS} | {'validating'} | set(HOLONETIC_MODELS)
+
+
+def test_configurations_vary_one_parameter_at_a_time():
+    configurations = workloads()['homeostasis'].configurations()
+    # Swept values equal to the defaults are not repeated
+    assert configurations == [
+        {'population': 10, 'max_memory_size': 6},
+        {'population': 1, 'max_memory_size': 6},
+        {'population': 100, 'max_memory_size': 6},
+        {'population': 10, 'max_memory_size': 24},
+        {'population': 10, 'max_memory_size': 96},
+    ]
+
+
+def test_configurations_are_labelled_with_what_runs():
+    configurations = workloads()['holonetico25'].configurations()
+    # Clusters are raised to the number of dimensions, which merges n_clusters=3 into the default
+    assert configurations == [
+        {'population': 10, 'n_dimensions': 3, 'n_clusters': 3},
+        {'population': 1, 'n_dimensions': 3, 'n_clusters': 3},
+        {'population': 100, 'n_dimensions': 3, 'n_clusters': 3},
+        {'population': 10, 'n_dimensions': 8, 'n_clusters': 8},
+        {'population': 10, 'n_dimensions': 32, 'n_clusters': 32},
+        {'population': 10, 'n_dimensions': 3, 'n_clusters': 8},
+        {'population': 10, 'n_dimensions': 3, 'n_clusters': 32},
+    ]
+
+
+@pytest.fixture(scope='module')
+def baseline_document():
+    return run_suite(['validating'], n_steps=2, repeats=1)
+
+
+@pytest.mark.parametrize('metric', ['ns_per_step', 'peak_memory_per_organism'])
+def test_compare_flags_regressions_past_the_tolerance(baseline_document, metric, tmp_path):
+    path = tmp_path / 'baseline.json'
+    with open(path, 'w') as handle:
+        json.dump(baseline_document, handle)
+    with open(path) as handle:
+        baseline = json.load(handle)
+    assert compare(baseline, baseline) == []
+
+    current = copy.deepcopy(baseline)
+    keys = list(current['results']['validating'])
+    assert len(keys) == len(CHANGES)
+    flagged = set()
+    for key, (change, regressed) in zip(keys, CHANGES):
+        current['results']['validating'][key][metric] *= 1 + change
+        if regressed:
+            flagged.add(key)
+    # A configuration the baseline does not have is not compared
+    current['results']['validating']['population=1000'] = {'ns_per_step': 1.0, 'peak_memory_per_organism': 1.0}
+
+    regressions = compare(current, baseline)
+    assert {regression['config'] for regression in regressions} == flagged
+    for regression in regressions:
+        assert regression['workload'] == 'validating'
+        assert regression['metric'] == metric
+        assert regression['change'] == pytest.approx(0.2)
+    assert compare(current, baseline, tolerance=0.25) == []
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from holon_checkpoint import SuperHolonSnapshot
+from holon_models import DEFAULT_PARAMETERS, VARIANTS, advance_super_holon, load_variant
+from holon_random import RandomStreams
+
+BUILD_PARAMETERS = {key: value for key, value in DEFAULT_PARAMETERS.items() if key != 'num_iterations'}
+CHECKPOINT_STEP = 5
+N_STEPS = 300
+
+
+def _continue(super_holon):
+    outcome = advance_super_holon(super_holon, N_STEPS)
+    return outcome, SuperHolonSnapshot.capture(super_holon).values()
+
+
+def _round_trip(super_holon):
+    return SuperHolonSnapshot.from_bytes(SuperHolonSnapshot.capture(super_holon).to_bytes())
+
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_restore_continues_as_uninterrupted(variant):
+    module = load_variant(variant)
+    super_holon = module.build_super_holon(**BUILD_PARAMETERS, streams=RandomStreams(3).child('replica', 0))
+    advance_super_holon(super_holon, CHECKPOINT_STEP)
+    snapshot = _round_trip(super_holon)
+
+    assert _continue(snapshot.restore(module)) == _continue(super_holon)
+
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_restore_resumes_the_random_module(variant):
+    module = load_variant(variant)
+    random.seed(8)
+    super_holon = module.build_super_holon(**BUILD_PARAMETERS)
+    advance_super_holon(super_holon, CHECKPOINT_STEP)
+    snapshot = _round_trip(super_holon)
+    expected = _continue(super_holon)
+
+    random.seed(0)
+    assert _continue(snapshot.restore(module)) == expected
+
+
+def test_forks_start_from_the_snapshot_and_are_reproducible():
+    module = load_variant('memory_energy')
+    super_holon = module.build_super_holon(**BUILD_PARAMETERS, streams=RandomStreams(3).child('replica', 0))
+    advance_super_holon(super_holon, CHECKPOINT_STEP)
+    snapshot = _round_trip(super_holon)
+
+    forks = snapshot.fork(module, 20)
+    assert all(SuperHolonSnapshot.capture(fork).values() == snapshot.values() for fork in forks)
+    outcomes = [_continue(fork) for fork in forks]
+    assert outcomes == [_continue(fork) for fork in snapshot.fork(module, 20)]
+    assert len({repr(outcome) for outcome in outcomes}) > 1
+
+
+def test_capture_rejects_an_rng_it_cannot_restore():
+    super_holon = load_variant('homeostasis').build_super_holon(**BUILD_PARAMETERS)
+    super_holon.perception_holon.rng = random.Random(1)
+    with pytest.raises(ValueError):
+        SuperHolonSnapshot.capture(super_holon)
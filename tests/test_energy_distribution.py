@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from holon_energy_distribution import EnergyDistribution
+from holon_thermoregulation import ThermoregulationEngine
+
+N_ORGANISMS = 200_000
+HORIZONS = [5, 20, 50]
+# A climate cold enough that heating costs deplete the organisms
+COLD_CLIMATE = (-2500.0, -1500.0)
+
+
+@pytest.mark.parametrize('initial_energy', [3.3, 5.0, 10.0])
+def test_survival_follows_the_engine(initial_energy):
+    distribution = EnergyDistribution(initial_energy, COLD_CLIMATE, subdivisions=32, rng=np.random.default_rng(1))
+    survival = distribution.survival_curve(max(HORIZONS))
+    np.testing.assert_allclose(distribution.evolve(max(HORIZONS))[1], survival, atol=1e-12)
+
+    engine = ThermoregulationEngine(initial_energy, COLD_CLIMATE, n_organisms=N_ORGANISMS, rng=np.random.default_rng(5))
+    stop_step = engine.run(max(HORIZONS))
+    for horizon in HORIZONS:
+        alive = np.mean((stop_step == -1) | (stop_step > horizon))
+        standard_error = np.sqrt(max(alive * (1 - alive), 1e-4) / N_ORGANISMS)
+        assert abs(survival[horizon] - alive) < 4 * standard_error
+
+
+def test_first_step_pays_from_the_initial_temperature():
+    # From INITIAL_TEMPERATURE = 37 the first heating to 36 costs 0.99 degrees less than from 36
+    distribution = EnergyDistribution(5.0, COLD_CLIMATE, rng=np.random.default_rng(3))
+    assert distribution.mean_cost - distribution.mean_initial_cost == pytest.approx(0.15 * 0.99, abs=5e-3)
+
+
+def test_mass_above_the_cap_is_folded_onto_it():
+    # Free regulation: every step gains at least 0.75, and food of 2 or more reaches the cap of 2 from 1
+    distribution = EnergyDistribution(1.0, costs=[0.0], initial_costs=[0.0])
+    assert distribution.energy[-1] == distribution.cap == 2.0
+    after, survival = distribution.evolve(2)
+    np.testing.assert_allclose(distribution.first_step()[-1], 0.8, atol=1e-12)
+    np.testing.assert_allclose(after[-1], 1.0, atol=1e-12)
+    np.testing.assert_allclose(survival, 1.0, atol=1e-12)
+
+
+def test_mass_at_or_below_zero_is_absorbed():
+    # A regulation cost of 5 leaves only food 5 alive, losing 0.25 a step: energy 1 lasts three steps
+    distribution = EnergyDistribution(1.0, costs=[5.0], initial_costs=[5.0])
+    np.testing.assert_allclose(distribution.survival_curve(10), [1, 0.2, 0.04, 0.008] + [0] * 7, atol=1e-12)
+    assert distribution.depletion_probability(10) == 1.0
+
+
+def test_organisms_never_deplete_in_the_script_climate():
+    # 6400 grid points; no step lowers the energy, so the curve stops after the first step
+    distribution = EnergyDistribution(100.0, rng=np.random.default_rng(2))
+    assert distribution.n_states == 6400
+    assert distribution.min_shift >= 0
+    survival = distribution.survival_curve(100_000)
+    np.testing.assert_allclose(survival, 1.0, atol=1e-12)
+    assert distribution.depletion_probability(100_000) == pytest.approx(0.0, abs=1e-12)
+
+    # Every organism reaches the cap of twice its initial energy
+    after, _ = distribution.evolve(200)
+    np.testing.assert_allclose(after[-1], 1.0, atol=1e-9)
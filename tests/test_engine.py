@@ -0,0 +1,81 @@
+import math
+import random
+
+import pytest
+
+from holon_engine import build_engine, simulate_engine
+from holon_models import DEFAULT_PARAMETERS, VARIANTS, load_variant, simulate_super_holon
+from holon_random import RandomStreams
+
+BUILD_PARAMETERS = {key: value for key, value in DEFAULT_PARAMETERS.items() if key != 'num_iterations'}
+N_SEEDS = 40
+N_STEPS = 300
+
+
+class _Recorder:
+    # Trace recorder keeping every row
+    def __init__(self):
+        self.rows = []
+
+    def should_record(self, step, event):
+        return True
+
+    def record(self, **values):
+        self.rows.append(sorted(values.items()))
+
+
+def _state(super_holon, engine):
+    # (script, engine) pairs of everything the two must agree on after a step
+    pairs = [
+        (super_holon.core_holon.energy, engine.energy),
+        (super_holon.core_holon.materials, engine.materials),
+        (super_holon.memory_holon.memory, engine.memory_holon().memory),
+    ]
+    if hasattr(super_holon, 'steps_out_of_homeostasis'):
+        pairs += [
+            (super_holon.steps_out_of_homeostasis, engine.steps_out_of_homeostasis),
+            (super_holon.core_holon.internal_temperature, engine.internal_temperature),
+            (super_holon.perception_temperature_Holon.temperature1, engine.external_temperature),
+        ]
+    return pairs
+
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_engine_steps_as_the_script(variant):
+    module = load_variant(variant)
+    for seed in range(N_SEEDS):
+        parameters = dict(BUILD_PARAMETERS, starting_energy=30 + seed, energy_maintenance_cost=1 + seed % 7)
+        super_holon = module.build_super_holon(**parameters, streams=RandomStreams(seed))
+        engine = build_engine(variant, **parameters, streams=RandomStreams(seed))
+        super_holon.trace, engine.trace = _Recorder(), _Recorder()
+        for _ in range(N_STEPS):
+            alive = super_holon.simulate_step()
+            assert engine.simulate_step() == alive
+            if not alive:
+                break
+        for script_value, engine_value in _state(super_holon, engine):
+            assert engine_value == script_value
+        assert engine.trace.rows == super_holon.trace.rows
+
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_simulate_engine_matches_the_replicates(variant):
+    module = load_variant(variant)
+    parameters = dict(DEFAULT_PARAMETERS, num_iterations=N_STEPS)
+    streams = RandomStreams(2)
+    for replica in range(N_SEEDS):
+        expected = simulate_super_holon(module, parameters, streams.child('replica', replica))
+        outcome = simulate_engine(variant, parameters, streams.child('replica', replica))
+        assert outcome[:2] == expected[:2]
+        for value, expected_value in zip(outcome[2:], expected[2:]):
+            assert value == expected_value or math.isnan(value) and math.isnan(expected_value)
+
+
+def test_engine_draws_from_the_random_module_without_streams():
+    random.seed(3)
+    super_holon = load_variant('homeostasis').build_super_holon(**BUILD_PARAMETERS)
+    expected = [super_holon.simulate_step() for _ in range(50)]
+    random.seed(3)
+    engine = build_engine('homeostasis', **BUILD_PARAMETERS)
+    assert [engine.simulate_step() for _ in range(50)] == expected
+    assert engine.energy == super_holon.core_holon.energy
@@ -0,0 +1,46 @@
+import math
+
+import numpy as np
+import pytest
+
+from holon_gating import SigmoidModulationKernel
+
+KERNEL = SigmoidModulationKernel(k=2)
+
+
+def _original_gate(edge, state, exponential=False):
+    # The math.isclose(sigmoid, 1) tests of the original CoreHolon.modulate, k=2
+    try:
+        if exponential:
+            sigmoid = 1/(1*math.exp(-2*(edge-state)))
+        else:
+            sigmoid = 1/(1+math.exp(-2*(edge-state)))
+    except (OverflowError, ZeroDivisionError):
+        # The original raised here; far out of band the gate is simply closed
+        return False
+    return math.isclose(sigmoid, 1)
+
+
+def _states(gate):
+    # A grid around the edge, the gate boundaries to the last float and far out-of-band states
+    states = list(np.arange(gate.edge - 20, gate.edge + 20, 0.001))
+    for boundary in (gate.lower, gate.upper):
+        if math.isfinite(boundary):
+            states += [math.nextafter(boundary, -math.inf), boundary, math.nextafter(boundary, math.inf)]
+    return states + [-1e6, -400.0, 400.0, 1e6]
+
+
+@pytest.mark.parametrize('name, edge, exponential', [
+    ('energy_low', 30, False),
+    ('energy_high', 70, False),
+    ('materials_low', 30, False),
+    ('materials_high', 70, False),
+    ('temperature_low', 21, False),
+    ('temperature_high', 27, True),
+])
+def test_gate_matches_the_math_exp_sigmoid(name, edge, exponential):
+    gate = getattr(KERNEL, name)
+    states = _states(gate)
+    expected = [_original_gate(edge, state, exponential) for state in states]
+    assert [bool(gate(state)) for state in states] == expected
+    assert list(gate(np.array(states))) == expected
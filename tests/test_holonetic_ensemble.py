@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+
+from holon_models import load_model
+from holon_random import RandomStreams
+from holonetic_ensemble import BioHoloneticEnsemble
+from holonetic_goals import GoalLibrary
+
+N_REPLICAS = 32
+N_STEPS = 150
+N_LIBRARY_GOALS = 50
+# States of the replicas: the first, third and last lie in a transition region (a coordinate near 0 or past 0.8)
+TRANSITION_STATES = np.array([
+    [0.05, 0.5, 0.5],
+    [0.5, 0.5, 0.5],
+    [0.3, -0.9, 0.4],
+    [0.2, 0.3, 0.6],
+    [0.4, 0.6, 1.2],
+])
+FIRED = np.array([True, False, True, False, True])
+
+
+class _RecordingGenerator:
+    # Generator handed to the ensemble, keeping every batched draw with the replicas it was drawn for
+    def __init__(self, seed):
+        self.generator = np.random.default_rng(seed)
+        self.ensemble = None
+        self.draws = []
+
+    def _record(self, method, values):
+        self.draws.append((method, self.ensemble.replica_id.copy(), values))
+        return values
+
+    def normal(self, *args, size):
+        return self._record('normal', self.generator.normal(*args, size=size))
+
+    def integers(self, *args, size):
+        return self._record('integers', self.generator.integers(*args, size=size))
+
+
+class _PickLast:
+    # Cue generator that never fires the cue and picks the last of the nearest library goals
+    def __init__(self):
+        self.picks = []
+
+    def integers(self, low, high=None, size=None):
+        if high is not None:
+            # The cue between 1 and 5
+            return 1 if size is None else np.ones(size, dtype=np.int64)
+        self.picks.append((low, size))
+        return low - 1 if size is None else np.full(size, low - 1, dtype=np.int64)
+
+
+def _goal_library():
+    return GoalLibrary(np.random.default_rng(7).standard_normal((N_LIBRARY_GOALS, 3)))
+
+
+class _Replay:
+    # Noise and cue generator of one scalar model, replaying the ensemble's draws of its replica
+    def __init__(self, draws, replica):
+        self.values = {'normal': [], 'integers': []}
+        for method, replica_id, values in draws:
+            row = np.flatnonzero(replica_id == replica)
+            if row.size:
+                self.values[method].append(values[row[0]])
+        self.pending_goal = None
+
+    def normal(self, loc, scale, size):
+        return self.values['normal'].pop(0)
+
+    def integers(self, low, high=None):
+        if high is None:
+            # The random goal of v25, drawn in the same step as the cue
+            return self.pending_goal
+        cue = self.values['integers'].pop(0)
+        self.pending_goal = self.values['integers'].pop(0) if self.random_goal else None
+        return cue
+
+
+@pytest.mark.parametrize('model_name', ['holonetico25', 'holonetico28'])
+def test_ensemble_follows_the_scalar_model(model_name):
+    module = load_model(model_name)
+    forces = np.random.default_rng(5).uniform(-0.5, 0.5, (N_STEPS, 3))
+    recorder = _RecordingGenerator(3)
+    ensemble = BioHoloneticEnsemble.from_model(module.BioHoloneticModel(3, 3, noise_sigma=0.3), N_REPLICAS, rng=recorder)
+    recorder.ensemble = ensemble
+    ensemble.run(N_STEPS, external_force=lambda step, n_running: forces[step])
+
+    for replica in range(N_REPLICAS):
+        model = module.BioHoloneticModel(3, 3, noise_sigma=0.3)
+        replay = _Replay(recorder.draws, replica)
+        replay.random_goal = model_name == 'holonetico25'
+        model.noise_generator = model.cue_generator = replay
+        stop_step = -1
+        for step in range(N_STEPS):
+            if not model.update(forces[step]):
+                stop_step = step + 1
+                break
+        assert ensemble.stop_step[replica] == stop_step
+        # The batched activations sum in BLAS gemm order, last-bit differences the dynamics amplify
+        np.testing.assert_allclose(ensemble.final_state[replica], model.state, rtol=1e-4, atol=1e-4)
+
+
+@pytest.mark.parametrize('goal_neighbours', [1, 4])
+@pytest.mark.parametrize('model_name', ['holonetico25', 'holonetico28'])
+def test_model_switches_to_a_nearby_library_goal(model_name, goal_neighbours):
+    module = load_model(model_name)
+    library = _goal_library()
+    model = module.BioHoloneticModel(3, 3)
+    model.goal_library = library
+    model.goal_neighbours = goal_neighbours
+    model.cue_generator = _PickLast()
+
+    for state, fired in zip(TRANSITION_STATES, FIRED):
+        model.state = state.copy()
+        goal = model.trigger_goal_transition()
+        if not fired:
+            np.testing.assert_array_equal(goal, model.goal)
+            continue
+        _, nearest = library.nearest(state, goal_neighbours)
+        expected = nearest[-1] if goal_neighbours > 1 else nearest
+        np.testing.assert_array_equal(goal, library.goals[expected])
+    # Only the states in a transition region pick a neighbour
+    assert model.cue_generator.picks == ([(goal_neighbours, None)] * FIRED.sum() if goal_neighbours > 1 else [])
+
+
+@pytest.mark.parametrize('goal_neighbours', [1, 4])
+@pytest.mark.parametrize('model_name', ['holonetico25', 'holonetico28'])
+def test_ensemble_switches_to_a_nearby_library_goal(model_name, goal_neighbours):
+    module = load_model(model_name)
+    library = _goal_library()
+    model = module.BioHoloneticModel(3, 3)
+    model.goal_library = library
+    model.goal_neighbours = goal_neighbours
+    generator = _PickLast()
+    ensemble = BioHoloneticEnsemble.from_model(model, len(TRANSITION_STATES), rng=generator)
+    ensemble.state[:] = TRANSITION_STATES
+
+    goal_index = ensemble.trigger_goal_transition()
+    _, nearest = library.nearest(TRANSITION_STATES[FIRED], goal_neighbours)
+    expected = nearest[:, -1] if goal_neighbours > 1 else nearest
+    np.testing.assert_array_equal(goal_index[FIRED], len(ensemble.goals) + expected)
+    np.testing.assert_array_equal(goal_index[~FIRED], ensemble.goal_index[~FIRED])
+    # The neighbour is drawn for the replicas that fired only
+    picks = [pick for pick in generator.picks if pick[0] == goal_neighbours]
+    assert picks == ([(goal_neighbours, FIRED.sum())] if goal_neighbours > 1 else [])
+
+    # Per-replica streams pick one of the nearest goals of each replica that fired
+    ensemble = BioHoloneticEnsemble.from_model(model, len(TRANSITION_STATES), rng=RandomStreams(1).batch(len(TRANSITION_STATES), 'cue'))
+    ensemble.state[:] = TRANSITION_STATES
+    ensemble.goal_index[:] = 0
+    triggered = ensemble.trigger_goal_transition()
+    in_library = triggered >= len(ensemble.goals)
+    assert not in_library[~FIRED].any()
+    for row in np.flatnonzero(in_library):
+        assert triggered[row] - len(ensemble.goals) in np.atleast_1d(library.nearest(TRANSITION_STATES[row], goal_neighbours)[1])
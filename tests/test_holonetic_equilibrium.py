@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+import scipy.sparse as sparse
+
+from holon_models import HOLONETIC_MODELS, load_model
+from holonetic_equilibrium import DENSE_EIGEN_LIMIT, goal_equilibria, jacobian, solve_equilibrium
+from holonetic_kernel import SELECTED_COLUMN, SELECTED_VALUE, ClusterRegulationKernel, SparseClusterKernel
+
+N_DIMENSIONS = 5
+N_SPARSE_DIMENSIONS = DENSE_EIGEN_LIMIT + 200
+N_EIGENVALUES = 4
+STEP = 1e-7
+
+
+def _clusters(rng, n_dimensions):
+    # Each dimension dominated by its own cluster: stable below the goal, unstable above it
+    off_diagonal = rng.uniform(-0.3, 0.3, (n_dimensions, n_dimensions)) * (1 - np.eye(n_dimensions))
+    return np.eye(n_dimensions) + off_diagonal
+
+
+def _offset(rng, n_dimensions, sign):
+    # Displacement of the equilibrium from its goal, away from the branch switch
+    return sign * rng.uniform(0.02, 0.1, n_dimensions)
+
+
+def _directional_derivative(kernel, delta, direction):
+    # Central difference on the branches of delta
+    negative = delta < 0
+    return (kernel(delta + STEP * direction, negative) - kernel(delta - STEP * direction, negative)) / (2 * STEP)
+
+
+@pytest.mark.parametrize('rule', [SELECTED_VALUE, SELECTED_COLUMN])
+@pytest.mark.parametrize('sign', [-1, 1])
+def test_equilibrium_off_the_goal(rule, sign):
+    rng = np.random.default_rng(4)
+    clusters = _clusters(rng, N_DIMENSIONS)
+    kernel = ClusterRegulationKernel(clusters, -clusters, rule)
+    goal = rng.uniform(-1, 1, N_DIMENSIONS)
+    offset = _offset(rng, N_DIMENSIONS, sign)
+    # The force that holds the state at goal + offset
+    force = -kernel(offset)
+
+    equilibrium = solve_equilibrium(kernel, goal, force, initial_state=goal + 0.7 * offset)
+    assert equilibrium.converged and equilibrium.iterations > 0
+    assert not equilibrium.sliding.any()
+    np.testing.assert_allclose(equilibrium.delta, offset, atol=1e-9)
+    assert np.max(np.abs(kernel(equilibrium.delta) + force)) == pytest.approx(equilibrium.residual, abs=1e-15)
+    assert equilibrium.residual <= 1e-10
+
+    numeric = np.stack([_directional_derivative(kernel, equilibrium.delta, unit) for unit in np.eye(N_DIMENSIONS)], axis=1)
+    expected = np.linalg.eigvals(numeric)
+    np.testing.assert_allclose(np.sort_complex(equilibrium.eigenvalues), np.sort_complex(expected), atol=1e-6)
+    assert equilibrium.flow_stable == (sign < 0) == bool(np.all(expected.real < 0))
+    assert equilibrium.map_spectral_radius == pytest.approx(np.max(np.abs(1 + expected)), abs=1e-6)
+
+
+@pytest.mark.parametrize('sign', [-1, 1])
+def test_sparse_equilibrium_reports_the_rightmost_eigenvalues(sign):
+    rng = np.random.default_rng(5)
+    clusters = sparse.random(
+        N_SPARSE_DIMENSIONS, N_SPARSE_DIMENSIONS, density=3 / N_SPARSE_DIMENSIONS, random_state=5,
+        data_rvs=lambda n: rng.uniform(-0.3, 0.3, n)
+    ) + sparse.identity(N_SPARSE_DIMENSIONS)
+    kernel = SparseClusterKernel(clusters)
+    offset = _offset(rng, N_SPARSE_DIMENSIONS, sign)
+    force = -kernel(offset)
+
+    equilibrium = solve_equilibrium(
+        kernel, np.zeros(N_SPARSE_DIMENSIONS), force, initial_state=0.7 * offset, n_eigenvalues=N_EIGENVALUES)
+    assert equilibrium.converged and not equilibrium.sliding.any()
+    np.testing.assert_allclose(equilibrium.delta, offset, atol=1e-9)
+    assert np.max(np.abs(kernel(equilibrium.delta) + force)) <= 1e-10
+
+    matrix = jacobian(kernel, equilibrium.delta)
+    assert sparse.issparse(matrix)
+    direction = rng.standard_normal(N_SPARSE_DIMENSIONS)
+    np.testing.assert_allclose(matrix @ direction, _directional_derivative(kernel, equilibrium.delta, direction), atol=1e-6)
+
+    # Sparse eigs against the full dense spectrum
+    expected = np.linalg.eigvals(matrix.toarray())
+    rightmost = expected[np.argsort(-expected.real)[:N_EIGENVALUES]]
+    assert len(equilibrium.eigenvalues) == N_EIGENVALUES
+    np.testing.assert_allclose(np.sort(equilibrium.eigenvalues.real), np.sort(rightmost.real), atol=1e-8)
+    assert equilibrium.flow_stable == (sign < 0) == bool(np.all(expected.real < 0))
+    assert equilibrium.map_spectral_radius == pytest.approx(np.max(np.abs(1 + expected)), rel=1e-8)
+
+
+@pytest.mark.parametrize('model_name', HOLONETIC_MODELS)
+def test_default_goals_slide(model_name):
+    model = load_model(model_name).BioHoloneticModel(3, 3, noise_sigma=0.0)
+    for goal, equilibrium in zip(model.goals, goal_equilibria(model)):
+        assert equilibrium.converged and equilibrium.sliding.all()
+        assert np.array_equal(equilibrium.state, goal)
+        assert equilibrium.eigenvalues.size == 0 and equilibrium.flow_stable and not equilibrium.map_stable
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from holonetic_goals import GoalLibrary
+
+N_DIMENSIONS = 3
+BATCH_SIZES = (1, 1, 5, 2, 40, 3, 1, 100, 7)
+
+
+def _brute_force(goals, points, k):
+    distances = np.linalg.norm(points[:, None, :] - goals[None, :, :], axis=2)
+    order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(distances, order, axis=1), order
+
+
+def _library(rng):
+    library = GoalLibrary(n_dimensions=N_DIMENSIONS, leaf_size=4)
+    for size in BATCH_SIZES:
+        library.add(rng.standard_normal((size, N_DIMENSIONS)))
+    return library
+
+
+def test_blocks_cover_the_goals_at_halving_sizes():
+    rng = np.random.default_rng(1)
+    library = GoalLibrary(n_dimensions=N_DIMENSIONS)
+    for size in BATCH_SIZES:
+        first = len(library)
+        assert np.array_equal(library.add(rng.standard_normal((size, N_DIMENSIONS))), np.arange(first, first + size))
+        ends = [start for start, _ in library._blocks[1:]] + [len(library)]
+        sizes = [end - start for (start, _), end in zip(library._blocks, ends)]
+        assert library._blocks[0][0] == 0
+        assert all(tree.n == size for (_, tree), size in zip(library._blocks, sizes))
+        assert all(older >= 2 * newer for older, newer in zip(sizes, sizes[1:]))
+        for (start, tree), end in zip(library._blocks, ends):
+            assert np.array_equal(tree.data, library.goals[start:end])
+    assert len(library._blocks) > 1
+
+
+# 50 is more than the newest blocks hold, 1000 more than the library
+@pytest.mark.parametrize('k', [1, 3, 50, 1000])
+def test_nearest_matches_brute_force(k):
+    rng = np.random.default_rng(k)
+    library = _library(rng)
+    points = rng.standard_normal((20, N_DIMENSIONS))
+    distances, indices = library.nearest(points, k)
+    expected_distances, expected_indices = _brute_force(library.goals, points, min(k, len(library)))
+    if k == 1:
+        expected_distances, expected_indices = expected_distances[:, 0], expected_indices[:, 0]
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-12)
+    assert np.array_equal(indices, expected_indices)
+
+    single_distances, single_indices = library.nearest(points[0], k)
+    assert np.array_equal(single_indices, indices[0])
+    assert np.array_equal(single_distances, distances[0])
+
+
+def test_equal_distances_are_listed_by_index():
+    # Integer goals repeated across blocks; every tie is returned, so the order is fixed
+    rng = np.random.default_rng(2)
+    library = GoalLibrary(n_dimensions=N_DIMENSIONS, leaf_size=2)
+    lattice = rng.integers(-2, 3, (30, N_DIMENSIONS)).astype(float)
+    for size in (13, 9, 5, 3):
+        library.add(lattice[:size])
+    points = rng.integers(-2, 3, (20, N_DIMENSIONS)).astype(float)
+    distances, indices = library.nearest(points, len(library))
+    expected_distances, expected_indices = _brute_force(library.goals, points, len(library))
+    assert np.array_equal(distances, expected_distances)
+    assert np.array_equal(indices, expected_indices)
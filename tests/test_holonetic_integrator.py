@@ -0,0 +1,105 @@
+import math
+
+import numpy as np
+import pytest
+
+from holon_models import HOLONETIC_MODELS, load_model
+from holon_random import RandomStreams
+from holonetic_integrator import ContinuousHoloneticIntegrator
+
+FORCE = np.array([0.2, -0.1, 0.05])
+NOISE_SIGMA = 1.0
+N_NOISY_RUNS = 200
+N_NOISY_DECISIONS = 6
+N_REFERENCE_RUNS = 2000
+REFERENCE_STEP = 1e-3
+
+
+def _integrator(model_name, **options):
+    model = load_model(model_name).BioHoloneticModel(3, 3, noise_sigma=0.0)
+    return ContinuousHoloneticIntegrator(model, **options)
+
+
+@pytest.mark.parametrize('model_name', HOLONETIC_MODELS)
+def test_default_tolerances_follow_a_tight_reference(model_name):
+    reference = _integrator(model_name, rtol=1e-12, atol=1e-14)
+    integrator = _integrator(model_name)
+    for duration in (0.5, 0.5):
+        reference.integrate(duration, FORCE)
+        integrator.integrate(duration, FORCE)
+        np.testing.assert_allclose(integrator.model.state, reference.model.state, atol=1e-4)
+    # Fixed unit-time Euler steps of update() need thousands of evaluations for this accuracy
+    assert integrator.n_evaluations < 100
+
+
+@pytest.mark.parametrize('model_name', HOLONETIC_MODELS)
+def test_sliding_intervals_cost_two_evaluations(model_name):
+    integrator = _integrator(model_name)
+    integrator.integrate(5.0, FORCE)
+    assert np.array_equal(integrator.model.state, integrator.model.goal)
+    evaluations = integrator.n_evaluations
+    integrator.integrate(1.0, FORCE)
+    assert integrator.n_evaluations - evaluations == 2
+
+
+@pytest.mark.parametrize('model_name', HOLONETIC_MODELS)
+def test_run_draws_the_default_force_from_the_streams(model_name):
+    outcomes = []
+    for global_seed in (1, 2):
+        np.random.seed(global_seed)
+        streams = RandomStreams(3)
+        # Noise at the default sigma is resolved in thousands of steps per interval; a larger one keeps this short
+        model = load_model(model_name).BioHoloneticModel(3, 3, noise_sigma=1.0, streams=streams)
+        integrator = ContinuousHoloneticIntegrator(model, streams=streams)
+        outcomes.append((integrator.run(100), model.state.tolist()))
+    assert outcomes[0] == outcomes[1]
+
+
+def _noisy_integrator(model_name, noise_sigma, seed):
+    # At its goal and kept there by the cue, with the stop counter only counting
+    streams = RandomStreams(seed)
+    model = load_model(model_name).BioHoloneticModel(3, 3, noise_sigma=noise_sigma, streams=streams)
+    model.trigger_goal_transition = lambda: model.goal
+    model.stop_threshold = math.inf
+    model.state = model.goal.copy()
+    return ContinuousHoloneticIntegrator(model, streams=streams)
+
+
+@pytest.mark.parametrize('model_name', HOLONETIC_MODELS)
+def test_noise_moves_the_state_off_the_goal(model_name):
+    integrator = _noisy_integrator(model_name, 0.5, 1)
+    for _ in range(30):
+        accepted = integrator.n_accepted
+        integrator.update(FORCE)
+        assert integrator.n_accepted > accepted
+        assert np.all(integrator.model.delta != 0)
+
+
+@pytest.mark.parametrize('model_name', HOLONETIC_MODELS)
+def test_noise_spreads_the_state_as_the_stochastic_equation(model_name):
+    integrator = None
+    deltas = np.empty((N_NOISY_RUNS, N_NOISY_DECISIONS, 3))
+    stops = 0
+    for run in range(N_NOISY_RUNS):
+        integrator = _noisy_integrator(model_name, NOISE_SIGMA, run)
+        for decision in range(N_NOISY_DECISIONS):
+            integrator.update(FORCE)
+            deltas[run, decision] = integrator.model.delta
+        stops += integrator.model.stop_counter > 0
+
+    # Euler-Maruyama with a step far below the integrator's, on many replicas at once
+    kernel = integrator.model.cluster_kernel
+    rng = np.random.default_rng(0)
+    reference = np.zeros((N_REFERENCE_RUNS, N_NOISY_DECISIONS, 3))
+    delta = np.zeros((N_REFERENCE_RUNS, 3))
+    steps = round(1 / REFERENCE_STEP)
+    for decision in range(N_NOISY_DECISIONS):
+        for _ in range(steps):
+            delta += (kernel(delta) + FORCE) * REFERENCE_STEP + NOISE_SIGMA * REFERENCE_STEP ** 0.5 * rng.standard_normal(delta.shape)
+        reference[:, decision] = delta
+
+    # Mean squared delta at the last decision, and the fraction of decisions counted by the stop counter
+    assert np.mean(deltas[:, -1] ** 2) == pytest.approx(np.mean(reference[:, -1] ** 2), rel=0.25)
+    stop_fraction = np.mean(np.any(np.abs(deltas) > 3, axis=2))
+    assert stop_fraction == pytest.approx(np.mean(np.any(np.abs(reference) > 3, axis=2)), abs=0.02)
+    assert stop_fraction > 0 and stops > 0
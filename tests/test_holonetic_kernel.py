@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+import scipy.sparse as sparse
+
+from holon_models import HOLONETIC_MODELS, load_model
+from holonetic_kernel import SELECTED_COLUMN, SELECTED_VALUE, ClusterRegulationKernel, SparseClusterKernel
+
+N_TRIALS = 500
+N_DELTAS = 4
+
+
+def _clusters(rng, n_clusters, n_dimensions):
+    # Few distinct values, so selections and passive sums meet repeated values; no zeros, which sparse storage drops
+    values = rng.choice(np.arange(1, 10) / 10, size=(n_clusters, n_dimensions))
+    return values * rng.choice((-1, 1), size=(n_clusters, n_dimensions))
+
+
+@pytest.mark.parametrize('rule', [SELECTED_VALUE, SELECTED_COLUMN])
+def test_sparse_kernel_matches_the_dense_kernel(rule):
+    rng = np.random.default_rng(0)
+    for trial in range(N_TRIALS):
+        n_dimensions = int(rng.integers(1, 6))
+        n_clusters = n_dimensions + int(rng.integers(0, 3))
+        clusters_positive = _clusters(rng, n_clusters, n_dimensions)
+        # Half the trials with an explicit twin, half with the default opposite sign
+        clusters_negative = _clusters(rng, n_clusters, n_dimensions) if trial % 2 else -clusters_positive
+        dense = ClusterRegulationKernel(clusters_positive, clusters_negative, rule)
+        twin = sparse.csr_array(clusters_negative) if trial % 2 else None
+        kernel = SparseClusterKernel(sparse.csr_array(clusters_positive), twin, rule)
+
+        deltas = rng.normal(size=(N_DELTAS, n_dimensions))
+        deltas[0, rng.integers(n_dimensions)] = 0.0
+        np.testing.assert_allclose(kernel(deltas), dense(deltas), rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(kernel(deltas[1]), dense(deltas[1]), rtol=1e-12, atol=1e-12)
+        negative = rng.random(n_dimensions) < 0.5
+        np.testing.assert_allclose(kernel(deltas[2], negative), dense(deltas[2], negative), rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('model_name', HOLONETIC_MODELS)
+def test_set_clusters_follows_the_matrix_shape(model_name):
+    model = load_model(model_name).BioHoloneticModel(3, 3, noise_sigma=0.0)
+    clusters = _clusters(np.random.default_rng(1), 5, 3)
+    model.set_clusters(sparse.csr_array(clusters))
+    assert isinstance(model.cluster_kernel, SparseClusterKernel)
+    assert model.n_clusters == 5
+    model.set_clusters(clusters[:4])
+    assert isinstance(model.cluster_kernel, ClusterRegulationKernel)
+    assert model.n_clusters == 4
+    model.update(np.zeros(3))
+    assert model.state.shape == (3,)
+
+
+def _loop_contributions(clusters_positive, clusters_negative, delta, rule):
+    # compute_delta_state of the scripts before ClusterRegulationKernel, without the noise and the prints
+    n_clusters, n_dimensions = clusters_positive.shape
+    contributions = np.zeros(n_dimensions)
+    for i in range(n_dimensions):
+        if rule == SELECTED_VALUE:
+            if delta[i] < 0:
+                selected = clusters_negative[np.argmin(clusters_negative[:, i]), i]
+            else:
+                selected = clusters_positive[np.argmax(clusters_positive[:, i]), i]
+        else:
+            selected = clusters_negative[:, i] if delta[i] < 0 else clusters_positive[:, i]
+        regulation = 1.5 / (1 + np.exp(-np.dot(delta, clusters_positive[i]) * 10)) - 1
+        contributions[i] += np.sum(regulation * selected)
+        for j in range(n_clusters):
+            if np.all(clusters_positive[j, i] != selected):
+                contributions[i] += clusters_positive[j, i]
+            if np.all(clusters_negative[j, i] != selected):
+                contributions[i] += clusters_negative[j, i]
+    return contributions
+
+
+@pytest.mark.parametrize('rule', [SELECTED_VALUE, SELECTED_COLUMN])
+def test_kernel_matches_the_script_loop(rule):
+    rng = np.random.default_rng(2)
+    for trial in range(4 * N_TRIALS):
+        n_dimensions = int(rng.integers(1, 6))
+        clusters_positive = _clusters(rng, n_dimensions + int(rng.integers(0, 3)), n_dimensions)
+        clusters_negative = _clusters(rng, *clusters_positive.shape) if trial % 2 else -clusters_positive
+        kernel = ClusterRegulationKernel(clusters_positive, clusters_negative, rule)
+        delta = rng.normal(size=n_dimensions)
+        delta[rng.random(n_dimensions) < 0.2] = 0.0
+        expected = _loop_contributions(clusters_positive, clusters_negative, delta, rule)
+        np.testing.assert_allclose(kernel(delta), expected, rtol=1e-12, atol=1e-12)
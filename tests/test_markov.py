@@ -0,0 +1,30 @@
+import math
+
+import numpy as np
+
+from holon_markov import SuperHolonMarkovChain
+from holon_models import DEFAULT_PARAMETERS
+from holon_population import SuperHolonPopulation
+
+BUILD_PARAMETERS = {key: value for key, value in DEFAULT_PARAMETERS.items() if key != 'num_iterations'}
+N_ORGANISMS = 10000
+HORIZONS = (10, 30, 100, 300)
+
+
+def test_survival_matches_memory_free_population():
+    chain = SuperHolonMarkovChain(**BUILD_PARAMETERS)
+    survival = chain.survival_curve(max(HORIZONS))
+
+    population = SuperHolonPopulation(
+        N_ORGANISMS, BUILD_PARAMETERS['starting_energy'], BUILD_PARAMETERS['starting_materials'],
+        BUILD_PARAMETERS['energy_maintenance_cost'], BUILD_PARAMETERS['reward_cost_percentage'],
+        BUILD_PARAMETERS['materials_needed'], BUILD_PARAMETERS['energy_generated'],
+        max_memory_size=0, rng=np.random.default_rng(3)
+    )
+    population.run(max(HORIZONS))
+    for horizon in HORIZONS:
+        # An organism is alive after horizon steps when it survived all of them
+        estimate = np.mean(population.steps_survived >= horizon)
+        error = math.sqrt(survival[horizon] * (1 - survival[horizon]) / N_ORGANISMS)
+        # Five standard errors, plus a few organisms where failures are too rare for a normal bound
+        assert abs(estimate - survival[horizon]) < 5 * error + 5 / N_ORGANISMS
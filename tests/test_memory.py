@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from holon_memory import MemoryHolon
+
+N_ENTRIES = 2000
+REWARDS = (5, 10, 15, 20)
+
+
+class _SortedMemoryHolon:
+    # The sort-then-pop memory the scripts used before holon_memory
+    def __init__(self, max_memory_size=6):
+        self.max_memory_size = max_memory_size
+        self.memory = []
+
+    def remember(self, reward, feedback_type, feedback_value, core_holon):
+        if feedback_type == 'dopamine':
+            outcome_tag = 'h' if 30 <= core_holon.energy <= 70 and 30 <= core_holon.materials <= 70 else '-h'
+        elif feedback_type == 'pain':
+            outcome_tag = '-h' if core_holon.energy < 30 or core_holon.materials < 30 else 'h'
+        else:
+            outcome_tag = '-h'
+
+        self.memory.append((reward, feedback_type, feedback_value, outcome_tag))
+        self.memory.sort(key=lambda x: abs(x[2]), reverse=True)
+        if len(self.memory) > self.max_memory_size:
+            self.memory.pop()
+
+
+class _Core:
+    def __init__(self, energy, materials):
+        self.energy, self.materials = energy, materials
+
+
+def _entries(rng, feedback_value):
+    for _ in range(N_ENTRIES):
+        feedback_type = rng.choice(('dopamine', 'pain', 'other'))
+        core = _Core(rng.randint(0, 100), rng.randint(0, 100))
+        yield rng.choice(REWARDS), feedback_type, feedback_value(rng), core
+
+
+def _reference_sums(memory, reward):
+    dopamine = sum(item[2] for item in memory if item[0] == reward and item[1] == 'dopamine')
+    pain = sum(item[2] for item in memory if item[0] == reward and item[1] == 'pain')
+    return dopamine, pain
+
+
+@pytest.mark.parametrize('max_memory_size', [1, 6, 20])
+@pytest.mark.parametrize('feedback_value', [
+    # Few distinct strengths, so most evictions choose among ties
+    lambda rng: rng.choice((-3, -1, 1, 2, 3)),
+    lambda rng: rng.uniform(-10, 10),
+], ids=['ties', 'continuous'])
+def test_memory_matches_the_sorted_list(max_memory_size, feedback_value):
+    rng = random.Random(max_memory_size)
+    memory_holon = MemoryHolon(max_memory_size)
+    reference = _SortedMemoryHolon(max_memory_size)
+    for reward, feedback_type, value, core in _entries(rng, feedback_value):
+        memory_holon.remember(reward, feedback_type, value, core)
+        reference.remember(reward, feedback_type, value, core)
+        assert memory_holon.memory == reference.memory
+        for reward in REWARDS:
+            assert memory_holon.feedback_sums(reward) == pytest.approx(_reference_sums(reference.memory, reward), abs=1e-9)
+    dopamine, pain = memory_holon.get_significant_feedback()
+    assert dopamine == [item for item in reference.memory if item[1] == 'dopamine']
+    assert pain == [item for item in reference.memory if item[1] == 'pain']
+
+
+def test_ties_evict_the_newest_entry():
+    memory_holon = MemoryHolon(2)
+    core = _Core(50, 50)
+    memory_holon.remember(5, 'dopamine', 2, core)
+    memory_holon.remember(10, 'pain', -2, core)
+    memory_holon.remember(15, 'dopamine', 2, core)
+    assert [item[0] for item in memory_holon.memory] == [5, 10]
+    assert memory_holon.feedback_sums(15) == (0, 0)
+    memory_holon.remember(20, 'dopamine', 3, core)
+    assert [item[0] for item in memory_holon.memory] == [20, 5]
+    assert memory_holon.feedback_sums(10) == (0, 0)
+
+
+def test_restore_continues_exactly():
+    rng = random.Random(3)
+    entries = list(_entries(rng, lambda rng: rng.choice((-2, -1, 1, 2))))
+    memory_holon = MemoryHolon()
+    for entry in entries[:N_ENTRIES // 2]:
+        memory_holon.remember(*entry)
+
+    restored = MemoryHolon()
+    restored.restore(*memory_holon.snapshot())
+    assert restored.memory == memory_holon.memory
+    for reward in REWARDS:
+        assert restored.feedback_sums(reward) == pytest.approx(memory_holon.feedback_sums(reward), abs=1e-9)
+    for entry in entries[N_ENTRIES // 2:]:
+        memory_holon.remember(*entry)
+        restored.remember(*entry)
+        assert restored.memory == memory_holon.memory
+    assert restored.snapshot() == memory_holon.snapshot()
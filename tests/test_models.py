@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import holon_random
+from holon_models import FAILURE_CAUSES, VARIANTS, run
+from holon_montecarlo import run_monte_carlo
+
+N_REPLICAS = 4
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH_TOML = '''
+[defaults]
+seed = 3
+parameters = { num_iterations = 40 }
+
+[[runs]]
+model = "homeostasis"
+repeat = 3
+
+[[runs]]
+model = "validating"
+seed = 8
+parameters = { num_iterations = 25, initial_energy = 10.0 }
+'''
+
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_run_is_the_monte_carlo_replicate(variant):
+    parameters = {'num_iterations': 200}
+    results = run_monte_carlo(variant, parameters, n_replicates=N_REPLICAS, seed=1, processes=1)
+    for replica in range(N_REPLICAS):
+        outcome = run(variant, parameters, seed=1, replica=replica)
+        assert outcome['steps'] == results.steps_survived[replica]
+        assert outcome['cause'] == FAILURE_CAUSES[results.failure_cause[replica]]
+        assert outcome['energy'] == results.final_energy[replica]
+        assert outcome['materials'] == results.final_materials[replica]
+
+
+def _loads_numpy(variant, num_iterations):
+    # A fresh interpreter, as a pool worker starts
+    script = (
+        f"import sys; from holon_models import run; "
+        f"run({variant!r}, {{'num_iterations': {num_iterations}}}, seed=1); print('numpy' in sys.modules)"
+    )
+    output = subprocess.run([sys.executable, '-c', script], cwd=REPOSITORY, capture_output=True, text=True, check=True).stdout
+    return output.split() == ['True']
+
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_short_runs_leave_numpy_unloaded(variant):
+    assert not _loads_numpy(variant, 10)
+
+
+# Switch to NumPy refills after the first plain-integer block, or never
+@pytest.mark.parametrize('scalar_draws', [holon_random._SCALAR_BLOCK, 10 ** 9])
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_long_runs_draw_as_short_ones(variant, scalar_draws, monkeypatch):
+    # Streams refill in plain integers while young, as short runs do, and from NumPy later; both give the same draws
+    parameters = {'num_iterations': 1000}
+    expected = run(variant, parameters, seed=1)
+    monkeypatch.setattr(holon_random, '_SCALAR_DRAWS', scalar_draws)
+    assert run(variant, parameters, seed=1) == expected
+
+
+def test_batch_file_runs_from_the_command_line(tmp_path):
+    batch = tmp_path / 'batch.toml'
+    batch.write_text(BATCH_TOML)
+    output = tmp_path / 'results.jsonl'
+    subprocess.run(
+        [sys.executable, 'holon_models.py', str(batch), '--output', str(output)], cwd=REPOSITORY, check=True
+    )
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+
+    assert [(row['model'], row['seed'], row['replica']) for row in rows] == [
+        ('homeostasis', 3, 0), ('homeostasis', 3, 1), ('homeostasis', 3, 2), ('validating', 8, 0)
+    ]
+    assert rows[0]['parameters']['num_iterations'] == 40
+    assert rows[3]['parameters']['num_iterations'] == 25
+    assert rows[3]['parameters']['initial_energy'] == 10.0
+    for row in rows:
+        expected = run(row['model'], row['parameters'], row['seed'], row['replica'])
+        assert row == json.loads(json.dumps(expected))
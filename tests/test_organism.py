@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+import pytest
+
+from holon_checkpoint import SuperHolonSnapshot
+from holon_models import DEFAULT_PARAMETERS, VARIANTS, advance_super_holon, load_variant
+from holon_organism import OrganismTable
+from holon_random import RandomStreams
+
+BUILD_PARAMETERS = {key: value for key, value in DEFAULT_PARAMETERS.items() if key != 'num_iterations'}
+N_ORGANISMS = 40
+N_STEPS = 150
+
+
+class _RowStreams:
+    # Streams of one organism of a populated table, as build_super_holon takes them
+    def __init__(self, streams, n_organisms, index):
+        self.streams, self.n_organisms, self.index = streams, n_organisms, index
+
+    def stream(self, stream_id):
+        return self.streams.batch(self.n_organisms, stream_id).row_stream(self.index)
+
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_table_rows_step_as_the_script(variant):
+    module = load_variant(variant)
+    streams = RandomStreams(7)
+    energies = np.arange(40, 40 + N_ORGANISMS)
+    table = OrganismTable.populate(module, N_ORGANISMS, dict(BUILD_PARAMETERS, starting_energy=energies), streams=streams)
+    for index in range(N_ORGANISMS):
+        parameters = dict(BUILD_PARAMETERS, starting_energy=int(energies[index]))
+        super_holon = module.build_super_holon(**parameters, streams=_RowStreams(streams, N_ORGANISMS, index))
+        assert table.snapshot(index).values() == SuperHolonSnapshot.capture(super_holon).values()
+        for _ in range(2):
+            assert table.run(index, module, N_STEPS) == advance_super_holon(super_holon, N_STEPS)
+            assert table.snapshot(index).values() == SuperHolonSnapshot.capture(super_holon).values()
+            assert table.view(index, module).memory_holon.memory == super_holon.memory_holon.memory
+        restored = table.super_holon(index, module)
+        assert SuperHolonSnapshot.capture(restored).to_bytes() == table.snapshot(index).to_bytes()
+
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_stored_graph_continues_in_the_table(variant):
+    module = load_variant(variant)
+    super_holon = module.build_super_holon(**BUILD_PARAMETERS, streams=RandomStreams(7).child('stored'))
+    advance_super_holon(super_holon, 37)
+    table = OrganismTable(1)
+    table.store(0, super_holon)
+    assert table.run(0, module, 100) == advance_super_holon(super_holon, 100)
+    assert table.snapshot(0).values() == SuperHolonSnapshot.capture(super_holon).values()
+
+
+def test_rows_draw_from_the_random_module_without_streams():
+    module = load_variant('homeostasis')
+    random.seed(3)
+    table = OrganismTable.populate(module, 5, BUILD_PARAMETERS)
+    outcomes = [table.run(index, module, 100) for index in range(5)]
+    random.seed(3)
+    super_holons = [module.build_super_holon(**BUILD_PARAMETERS) for _ in range(5)]
+    assert outcomes == [advance_super_holon(super_holon, 100) for super_holon in super_holons]
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from holon_padic import PAdicNumber
+from holon_random import RandomStreams
+
+P = 5
+PRECISION = 6
+MODULUS = P ** PRECISION
+# Values whose sums carry across several digits, wrap around p^precision, or are negative
+VALUES = [0, 1, 4, 24, 124, 3124, MODULUS - 1, 7, 50, 12345, -1, -7, -MODULUS + 3]
+N_BATCH = 200
+
+
+def _batch(seed):
+    return PAdicNumber(P, np.random.default_rng(seed).integers(0, P, size=(N_BATCH, PRECISION)))
+
+
+def _integers(batch):
+    # Integers of a batch, digit by digit in plain Python
+    return [sum(int(digit) * P ** n for n, digit in enumerate(digits)) for digits in batch.digits]
+
+
+def test_stream_digits_are_drawn_where_all_of_them_would_be():
+    lazy_stream = RandomStreams(4).stream('metadata')
+    eager_stream = RandomStreams(4).stream('metadata')
+    for k in (0, 3, 1, 100):
+        lazy = PAdicNumber.random(5, 100, rng=lazy_stream)
+        digits = eager_stream.integers(0, 5, size=100)
+        assert lazy.residue(k) == PAdicNumber(5, digits).residue(k)
+        assert lazy_stream.position == eager_stream.position
+    np.testing.assert_array_equal(lazy.digits, digits)
+    assert (lazy + PAdicNumber(5, digits)).to_int() == 2 * PAdicNumber(5, digits).to_int() % 5 ** 100
+
+
+def test_from_int_wraps_negative_values():
+    for value in VALUES:
+        number = PAdicNumber.from_int(value, P, PRECISION)
+        assert number.to_int() == value % MODULUS
+        assert ((number.digits >= 0) & (number.digits < P)).all()
+    np.testing.assert_array_equal(PAdicNumber.from_int(-1, P, PRECISION).digits, [P - 1] * PRECISION)
+    assert (PAdicNumber.from_int(-7, P, PRECISION) + PAdicNumber.from_int(7, P, PRECISION)).to_int() == 0
+
+
+def test_addition_carries_and_wraps_around():
+    # 4 + 1 carries once, 3124 + 1 through four digits, MODULUS - 1 + 1 out of the precision
+    assert (PAdicNumber.from_int(3124, P, PRECISION) + PAdicNumber.from_int(1, P, PRECISION)).digits.tolist() == [0, 0, 0, 0, 0, 1]
+    assert (PAdicNumber.from_int(MODULUS - 1, P, PRECISION) + PAdicNumber.from_int(1, P, PRECISION)).to_int() == 0
+    for a in VALUES:
+        for b in VALUES:
+            total = PAdicNumber.from_int(a, P, PRECISION) + PAdicNumber.from_int(b, P, PRECISION)
+            assert total.to_int() == (a + b) % MODULUS
+
+
+def test_addition_needs_the_same_base_and_precision():
+    with pytest.raises(ValueError):
+        PAdicNumber.from_int(1, P, PRECISION) + PAdicNumber.from_int(1, 3, PRECISION)
+    with pytest.raises(ValueError):
+        PAdicNumber.from_int(1, P, PRECISION) + PAdicNumber.from_int(1, P, PRECISION + 1)
+
+
+def test_valuation_and_norm():
+    # 50 = 2 * 5^2, 12345 = 2469 * 5
+    for value, valuation in [(1, 0), (7, 0), (50, 2), (12345, 1), (MODULUS // P, PRECISION - 1), (-25, 2)]:
+        number = PAdicNumber.from_int(value, P, PRECISION)
+        assert number.valuation() == valuation
+        assert number.norm() == P ** -valuation
+    zero = PAdicNumber.from_int(0, P, PRECISION)
+    assert zero.valuation() == PRECISION
+    assert zero.norm() == 0.0
+
+    batch = PAdicNumber(P, [PAdicNumber.from_int(value, P, PRECISION).digits for value in (50, 0, 7)])
+    np.testing.assert_array_equal(batch.valuation(), [2, PRECISION, 0])
+    np.testing.assert_array_equal(batch.norm(), [1 / 25, 0.0, 1.0])
+
+
+def test_truncate_reduces_modulo_a_power_of_p():
+    for value in VALUES:
+        number = PAdicNumber.from_int(value, P, PRECISION)
+        for k in range(PRECISION + 1):
+            truncated = number.truncate(k)
+            assert truncated.precision == PRECISION
+            assert truncated.to_int() == value % P ** k
+            assert truncated.residue(k) == number.residue(k)
+    batch = _batch(1)
+    np.testing.assert_array_equal(batch.truncate(3).residue(PRECISION), batch.residue(3))
+
+
+def test_batched_residues_follow_integer_arithmetic():
+    a, b = _batch(2), _batch(3)
+    a_int, b_int = _integers(a), _integers(b)
+    total = a + b
+    for k in range(PRECISION + 1):
+        np.testing.assert_array_equal(a.residue(k), [value % P ** k for value in a_int])
+        np.testing.assert_array_equal(total.residue(k), [(x + y) % P ** k for x, y in zip(a_int, b_int)])
+    for i in (0, 17, N_BATCH - 1):
+        assert a[i].to_int() == a_int[i]
+        assert (a[i] + b[i]).to_int() == (a_int[i] + b_int[i]) % MODULUS
+    with pytest.raises(OverflowError):
+        PAdicNumber(P, np.zeros((2, 40), dtype=np.int64)).residue(40)
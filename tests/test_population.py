@@ -0,0 +1,43 @@
+import pytest
+
+from holon_models import DEFAULT_PARAMETERS, advance_super_holon, load_variant
+from holon_population import SuperHolonPopulation
+from holon_random import RandomStreams
+
+N_ORGANISMS = 64
+N_STEPS = 200
+
+
+class _RowStreams:
+    # The per-holon streams of organism i of a population drawing from a StreamBatch
+    def __init__(self, batch, row):
+        self.batch = batch
+        self.row = row
+
+    def stream(self, stream_id):
+        return self.batch.row_stream(self.row)
+
+
+@pytest.mark.parametrize('max_memory_size', [0, 1, 6])
+def test_population_follows_the_scalar_super_holon(max_memory_size):
+    parameters = {key: value for key, value in DEFAULT_PARAMETERS.items() if key != 'num_iterations'}
+    parameters['max_memory_size'] = max_memory_size
+    streams = RandomStreams(11)
+    population = SuperHolonPopulation(
+        N_ORGANISMS, parameters['starting_energy'], parameters['starting_materials'],
+        parameters['energy_maintenance_cost'], parameters['reward_cost_percentage'],
+        parameters['materials_needed'], parameters['energy_generated'],
+        max_memory_size=max_memory_size, rng=streams.batch(N_ORGANISMS, 'perception')
+    )
+    for _ in range(N_STEPS):
+        population.simulate_step()
+
+    module = load_variant('memory_energy')
+    batch = streams.batch(N_ORGANISMS, 'perception')
+    for row in range(N_ORGANISMS):
+        super_holon = module.build_super_holon(**parameters, streams=_RowStreams(batch, row))
+        steps, cause = advance_super_holon(super_holon, N_STEPS)
+        assert population.steps_survived[row] == steps
+        assert population.failure_cause[row] == cause
+        assert population.energy[row] == super_holon.core_holon.energy
+        assert population.materials[row] == super_holon.core_holon.materials
@@ -0,0 +1,55 @@
+import tracemalloc
+
+from holon_models import DEFAULT_PARAMETERS, advance_super_holon, load_variant
+from holon_profiling import HolonProfiler
+from holon_random import RandomStreams
+
+TEMPORARY_BYTES = 1 << 20
+
+
+class _Holon:
+    def scratch(self):
+        # Allocated and freed inside the call
+        return len(bytearray(TEMPORARY_BYTES))
+
+    def keep(self):
+        self.kept = bytearray(TEMPORARY_BYTES)
+
+
+class _Organism:
+    def __init__(self):
+        self.holon = _Holon()
+
+    def step(self):
+        self.holon.keep()
+        return self.holon.scratch()
+
+
+def test_memory_freed_inside_a_call_counts_toward_its_peak():
+    organism = _Organism()
+    with HolonProfiler({None: ('step',), 'holon': ('scratch', 'keep')}).attach(organism) as profiler:
+        for _ in range(3):
+            organism.step()
+    assert not tracemalloc.is_tracing()
+    summary = profiler.summary()
+
+    scratch = summary['holon.scratch']
+    assert scratch['calls'] == 3
+    assert scratch['peak_bytes'] >= 3 * TEMPORARY_BYTES
+    assert abs(scratch['net_bytes']) < TEMPORARY_BYTES // 10
+    # The first step keeps a buffer, later ones replace it
+    assert summary['holon.keep']['net_bytes'] >= TEMPORARY_BYTES - TEMPORARY_BYTES // 10
+    # Nested calls reset the peak, yet the enclosing step still sees their allocations:
+    # the first step holds the kept and the scratch buffer at once, later ones one buffer more than they started with
+    assert summary['_Organism.step']['peak_bytes'] >= 4 * TEMPORARY_BYTES
+
+
+def test_profiled_super_holon_steps_as_before():
+    module = load_variant('homeostasis')
+    parameters = {key: value for key, value in DEFAULT_PARAMETERS.items() if key != 'num_iterations'}
+    plain = module.build_super_holon(**parameters, streams=RandomStreams(2))
+    profiled = module.build_super_holon(**parameters, streams=RandomStreams(2))
+    with HolonProfiler().attach(profiled) as profiler:
+        assert advance_super_holon(profiled, 50) == advance_super_holon(plain, 50)
+    assert profiler.summary()['SuperHolon.simulate_step']['calls'] == profiled.step_count
+    assert 'simulate_step' not in vars(profiled)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from holon_random import RandomStreams, _philox4x32_scalar, _round_keys, philox4x32, uniform_block
+
+# Known-answer vectors of philox4x32-10 from Random123 (kat_vectors): counter, key, output words
+PHILOX_KAT = [
+    ((0x00000000, 0x00000000, 0x00000000, 0x00000000), (0x00000000, 0x00000000),
+     (0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8)),
+    ((0xffffffff, 0xffffffff, 0xffffffff, 0xffffffff), (0xffffffff, 0xffffffff),
+     (0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd)),
+    ((0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344), (0xa4093822, 0x299f31d0),
+     (0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1)),
+]
+N_ROWS = 5
+
+
+def test_mixed_draws_follow_the_uniform_block():
+    stream = RandomStreams(3).stream('mixed')
+    reference = uniform_block(stream.key, 0, 3000)[0]
+    draws = []
+    # Scalar draws, arrays within and across refills, and one array longer than a refill
+    for n_draws in (1, 5, 3, 40, 1, 200, 1, 700, 2):
+        if n_draws == 1:
+            draws.append(stream.random())
+        else:
+            draws.extend(stream.uniforms(n_draws))
+    draws.append(stream.random())
+    np.testing.assert_array_equal(draws, reference[:len(draws)])
+    assert stream.position == len(draws)
+
+
+@pytest.mark.parametrize('counter, key, expected', PHILOX_KAT)
+def test_philox_matches_the_known_answers(counter, key, expected):
+    np.testing.assert_array_equal(philox4x32(np.array(counter), np.array(key)), expected)
+    assert _philox4x32_scalar(*counter, _round_keys(*key)) == expected
+
+
+def test_philox_is_vectorized_over_counters_and_keys():
+    counters = np.array([counter for counter, _, _ in PHILOX_KAT], dtype=np.uint32)
+    keys = np.array([key for _, key, _ in PHILOX_KAT], dtype=np.uint32)
+    np.testing.assert_array_equal(philox4x32(counters, keys), [expected for _, _, expected in PHILOX_KAT])
+
+
+def _mixed_draws(source, rows=None):
+    # Uniforms, integers and normals of a batch (rows given) or of one of its row streams
+    if rows is None:
+        return [source.uniforms(3), source.integers(2, 9, size=4), source.normal(1.0, 2.0, size=2), source.uniforms(1)]
+    return [
+        source.uniforms(3, rows),
+        source.integers(2, 9, size=(len(rows), 4), rows=rows),
+        source.normal(1.0, 2.0, size=(len(rows), 2), rows=rows),
+        source.uniforms(1, rows),
+    ]
+
+
+def test_batch_rows_follow_their_row_streams():
+    batch = RandomStreams(7).batch(N_ROWS, 'population')
+    batch.advance(11)
+    streams = [batch.row_stream(row) for row in range(N_ROWS)]
+    rows = np.array([4, 1, 3])
+    draws = _mixed_draws(batch, rows)
+    for i, row in enumerate(rows):
+        expected = _mixed_draws(streams[row])
+        for batch_draws, stream_draws in zip(draws, expected):
+            np.testing.assert_array_equal(batch_draws[i], stream_draws)
+        # Both end at the same position, so the next draws agree too
+        assert streams[row].position == batch.position
+        np.testing.assert_array_equal(batch.row_stream(row).uniforms(5), streams[row].uniforms(5))
+    # The rows that were not drawn skip to the shared position
+    skipped = RandomStreams(7).batch(N_ROWS, 'population').row_stream(0)
+    skipped.advance(batch.position)
+    assert batch.row_stream(0).random() == skipped.random()
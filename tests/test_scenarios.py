@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from holon_engine import EXTERNAL_BOUNDS, EXTERNAL_CHANGE_RANGE, INITIAL_EXTERNAL_RANGE, MAX_REWARD, MIN_REWARD
+from holon_models import run
+from holon_random import RandomStreams
+from holon_scenarios import FOOD_RANGE, NUM_REWARDS, SERIES, ScenarioLibrary, open_library
+from holon_thermoregulation import NUM_FOOD_OPTIONS
+
+N_SCENARIOS = 5
+N_STEPS = 40
+
+
+@pytest.fixture
+def library(tmp_path):
+    return ScenarioLibrary.generate(str(tmp_path / 'library'), N_SCENARIOS, N_STEPS, seed=3)
+
+
+def test_scenarios_do_not_depend_on_the_library_size(library, tmp_path):
+    smaller = ScenarioLibrary.generate(str(tmp_path / 'smaller'), 2, N_STEPS, seed=3)
+    for name in SERIES:
+        assert np.array_equal(smaller.series[name], library.series[name][:2])
+    assert open_library(library.path) is open_library(library.path)
+
+
+def test_series_follow_the_script_ranges(library):
+    for scenario in (library[i] for i in range(N_SCENARIOS)):
+        walk = int(scenario.initial_temperature)
+        assert INITIAL_EXTERNAL_RANGE[0] <= walk < INITIAL_EXTERNAL_RANGE[1]
+        assert np.all((EXTERNAL_CHANGE_RANGE[0] <= scenario.temperature_change) & (scenario.temperature_change < EXTERNAL_CHANGE_RANGE[1]))
+        for step, change in enumerate(scenario.temperature_change.tolist()):
+            walk = min(max(walk + change, EXTERNAL_BOUNDS[0]), EXTERNAL_BOUNDS[1])
+            assert scenario.temperature_walk[step + 1] == walk
+        assert np.all((MIN_REWARD <= scenario.rewards) & (scenario.rewards <= MAX_REWARD))
+        assert np.all((FOOD_RANGE[0] <= scenario.food_offers) & (scenario.food_offers <= FOOD_RANGE[1]))
+        assert np.all((0 <= scenario.food_choice) & (scenario.food_choice < NUM_FOOD_OPTIONS))
+    with pytest.raises(IndexError):
+        library[N_SCENARIOS]
+
+
+def test_readers_serve_the_series_then_stop(library):
+    scenario = library[1]
+    streams = scenario.streams(RandomStreams(0))
+    low, high = library.metadata['external_temperature_range']
+
+    food = streams.stream('environment')
+    for step in range(N_STEPS):
+        assert food.uniform(low, high) == scenario.external_temperature[step]
+        assert [food.randint(*FOOD_RANGE) for _ in range(NUM_FOOD_OPTIONS)] == scenario.food_offers[step].tolist()
+        assert food.randint(0, NUM_FOOD_OPTIONS - 1) == scenario.food_choice[step]
+    for call in (lambda: food.uniform(low, high), lambda: food.randint(*FOOD_RANGE), lambda: food.randint(0, NUM_FOOD_OPTIONS - 1)):
+        with pytest.raises(IndexError, match=f"covers only {N_STEPS} steps"):
+            call()
+    with pytest.raises(ValueError):
+        food.randint(0, 10)
+
+    temperature = streams.stream('perception_temperature')
+    assert temperature.randrange(*INITIAL_EXTERNAL_RANGE) == scenario.initial_temperature
+    assert [temperature.randrange(*EXTERNAL_CHANGE_RANGE) for _ in range(N_STEPS)] == scenario.temperature_change.tolist()
+    with pytest.raises(IndexError, match=f"covers only {N_STEPS} steps"):
+        temperature.randrange(*EXTERNAL_CHANGE_RANGE)
+
+    perception = streams.stream('perception')
+    assert [perception.randint(MIN_REWARD, MAX_REWARD) for _ in range(N_STEPS * NUM_REWARDS)] == scenario.rewards.ravel().tolist()
+    with pytest.raises(IndexError, match=f"covers only {N_STEPS} steps"):
+        perception.randint(MIN_REWARD, MAX_REWARD)
+
+    # Streams outside the scenario come from the fallback
+    assert streams.stream('metadata').random() == RandomStreams(0).stream('metadata').random()
+
+
+@pytest.mark.parametrize('model', ['homeostasis', 'validating'])
+def test_runs_on_a_scenario_repeat(library, model):
+    outcomes = [run(model, {'num_iterations': N_STEPS}, seed=1, scenarios=library.path, scenario=2) for _ in range(2)]
+    assert outcomes[0] == outcomes[1]
+    with pytest.raises(ValueError):
+        run(model, {'num_iterations': N_STEPS + 1}, seed=1, scenarios=library.path)
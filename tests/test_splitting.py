@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+
+from holon_models import DEFAULT_PARAMETERS, FAILURE_CAUSES, load_variant
+from holon_montecarlo import run_monte_carlo
+from holon_random import RandomStreams
+from holon_splitting import estimate_failure_probability, homeostasis_score
+
+HORIZON = 15
+N_REPLICATES = 1000
+# Fifteen steps in a row out of homeostasis within twenty steps fail about 1.5% of these runs
+RARE_PARAMETERS = {'energy_maintenance_cost': 5, 'materials_needed': 16, 'energy_generated': 16}
+RARE_THRESHOLD = 15
+RARE_HORIZON = 20
+N_RARE_REPLICATES = 3000
+
+
+def _super_holon():
+    module = load_variant('homeostasis')
+    parameters = {key: value for key, value in DEFAULT_PARAMETERS.items() if key != 'num_iterations'}
+    return module.build_super_holon(**parameters, streams=RandomStreams(0))
+
+
+def test_score_grows_with_the_distance_from_the_band():
+    super_holon = _super_holon()
+    core = super_holon.core_holon
+    super_holon.steps_out_of_homeostasis = 2
+    core.energy, core.materials, core.internal_temperature = 50, 50, 25
+    assert homeostasis_score(super_holon) == 2
+
+    core.energy = 20
+    assert homeostasis_score(super_holon) == 2.5
+    core.internal_temperature = 57
+    assert homeostasis_score(super_holon) == 2 + 30 / 40
+    assert homeostasis_score(super_holon, scale=30) == 2.5
+
+    core.materials = 0
+    assert homeostasis_score(super_holon) == math.inf
+
+
+def test_splitting_follows_plain_monte_carlo():
+    result = estimate_failure_probability('homeostasis', horizon=HORIZON, n_per_stage=200, n_repetitions=5, seed=1)
+    # Half a step past three steps out of homeostasis, then the threshold
+    assert result.stage_probabilities.shape[1] == 2
+
+    plain = run_monte_carlo('homeostasis', {'num_iterations': HORIZON}, n_replicates=N_REPLICATES, seed=2, processes=1)
+    failures = [FAILURE_CAUSES.index('depleted'), FAILURE_CAUSES.index('out_of_homeostasis')]
+    failed = np.mean(np.isin(plain.failure_cause, failures))
+    plain_error = math.sqrt(failed * (1 - failed) / N_REPLICATES)
+    assert abs(result.estimate - failed) < 3 * math.hypot(result.standard_error, plain_error)
+
+
+def test_splitting_follows_plain_monte_carlo_on_rare_failures():
+    result = estimate_failure_probability(
+        'homeostasis', RARE_PARAMETERS, horizon=RARE_HORIZON, n_per_stage=100, n_repetitions=10, seed=1,
+        homeostasis_threshold=RARE_THRESHOLD
+    )
+    assert result.stage_probabilities.shape[1] == 5
+
+    # A single level at the failure itself is plain Monte Carlo
+    plain = estimate_failure_probability(
+        'homeostasis', RARE_PARAMETERS, horizon=RARE_HORIZON, levels=[RARE_THRESHOLD],
+        n_per_stage=N_RARE_REPLICATES, n_repetitions=1, seed=2, homeostasis_threshold=RARE_THRESHOLD
+    )
+    failed = plain.estimate
+    assert 0 < failed < 0.05
+    plain_error = math.sqrt(failed * (1 - failed) / N_RARE_REPLICATES)
+    assert abs(result.estimate - failed) < 3 * math.hypot(result.standard_error, plain_error)
@@ -0,0 +1,171 @@
+import functools
+
+import numpy as np
+import pytest
+
+from holon_models import DEFAULT_PARAMETERS, VARIANTS, load_variant
+from holon_montecarlo import run_monte_carlo
+from holon_random import RandomStreams
+from holon_stats import Histogram, Moments, QuantileSketch, RunLengths, super_holon_statistics
+
+BUILD_PARAMETERS = {key: value for key, value in DEFAULT_PARAMETERS.items() if key != 'num_iterations'}
+N_SEEDS = 20
+N_STEPS = 300
+N_VALUES = 5000
+# Uneven cut points of the value stream into the parts that are merged
+SPLITS = [0, 7, 1800, 1801, 3500, N_VALUES]
+N_REPLICATES = 8
+
+
+def _values():
+    # Positive, negative and zero values, so every side of the sketch is exercised
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(2, 1.5, N_VALUES) * rng.choice([-1, 1, 1, 1], N_VALUES)
+    values[::97] = 0
+    return values
+
+
+def _merged(make, update, values):
+    # One aggregator per part of the stream, reduced into the first
+    parts = []
+    for start, stop in zip(SPLITS[:-1], SPLITS[1:]):
+        part = make()
+        for value in values[start:stop]:
+            update(part, value)
+        parts.append(part)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    return merged
+
+
+def _single(make, update, values):
+    single = make()
+    for value in values:
+        update(single, value)
+    return single
+
+
+def test_merged_moments_follow_a_single_pass():
+    values = _values()
+    merged = _merged(Moments, Moments.update, values)
+    single = _single(Moments, Moments.update, values)
+    assert merged.count == single.count == N_VALUES
+    assert merged.mean == pytest.approx(single.mean, rel=1e-12)
+    assert merged.variance == pytest.approx(single.variance, rel=1e-12)
+    assert merged.variance == pytest.approx(np.var(values, ddof=1), rel=1e-12)
+
+
+def test_merged_histograms_follow_a_single_pass():
+    values = _values()
+    make = functools.partial(Histogram, -50, 50, 20)
+    merged = _merged(make, Histogram.update, values)
+    single = _single(make, Histogram.update, values)
+    assert merged.summary() == single.summary()
+    assert merged.total == N_VALUES
+    assert merged.counts == np.histogram(values, bins=20, range=(-50, 50))[0].tolist()
+    assert merged.underflow == np.sum(values < -50)
+
+
+@pytest.mark.parametrize('relative_accuracy', [0.01, 0.05])
+def test_merged_sketches_follow_a_single_pass_within_their_accuracy(relative_accuracy):
+    values = _values()
+    make = functools.partial(QuantileSketch, relative_accuracy)
+    merged = _merged(make, QuantileSketch.update, values)
+    single = _single(make, QuantileSketch.update, values)
+    assert (merged.positive, merged.negative, merged.zero_count, merged.count) == (single.positive, single.negative, single.zero_count, single.count)
+
+    ordered = np.sort(values)
+    for q in np.linspace(0, 1, 41):
+        exact = ordered[int(q * (N_VALUES - 1))]
+        assert merged.quantile(q) == single.quantile(q)
+        assert abs(merged.quantile(q) - exact) <= relative_accuracy * abs(exact) * (1 + 1e-9)
+
+
+def test_merged_run_lengths_follow_a_single_pass():
+    # Replicates of different lengths, cut between parts mid-streak and at replicate ends
+    rng = np.random.default_rng(4)
+    replicates = [rng.random(rng.integers(1, 60)) < 0.6 for _ in range(40)]
+    single = RunLengths(max_length=8)
+    for conditions in replicates:
+        for condition in conditions:
+            single.update(condition)
+        single.end()
+
+    merged = None
+    for start, stop in zip(range(0, 40, 7), range(7, 47, 7)):
+        part = RunLengths(max_length=8)
+        for index, conditions in enumerate(replicates[start:stop]):
+            for condition in conditions:
+                part.update(condition)
+            # The last replicate of a part is left open: merge ends it
+            if index < len(replicates[start:stop]) - 1:
+                part.end()
+        merged = part if merged is None else merged.merge(part)
+    merged.end()
+    assert merged.summary() == single.summary()
+    assert merged.steps == sum(len(conditions) for conditions in replicates)
+
+
+@pytest.mark.parametrize('variant', ['homeostasis', 'semi_homeostasis'])
+def test_streaks_are_the_steps_out_of_homeostasis(variant):
+    module = load_variant(variant)
+    for seed in range(N_SEEDS):
+        super_holon = module.build_super_holon(**BUILD_PARAMETERS, streams=RandomStreams(seed))
+        statistics = super_holon_statistics(variant)
+        super_holon.trace = statistics
+        runs = statistics['out_of_homeostasis_runs']
+        longest = 0
+        for _ in range(N_STEPS):
+            alive = super_holon.simulate_step()
+            if not alive and super_holon.steps_out_of_homeostasis < super_holon.homeostasis_threshold:
+                # Depleted, or no valid reward: the latter step leaves the counter untouched
+                break
+            assert runs.current == super_holon.steps_out_of_homeostasis
+            longest = max(longest, super_holon.steps_out_of_homeostasis)
+            if not alive:
+                break
+        statistics.end_run()
+        assert runs.summary()['longest'] == longest <= super_holon.homeostasis_threshold
+
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_statistics_follow_the_recorded_columns(variant):
+    statistics = functools.partial(super_holon_statistics, variant)
+    results = run_monte_carlo(variant, {'num_iterations': 100}, n_replicates=4, seed=1, processes=1, statistics=statistics)
+    summary = results.statistics.summary()
+    assert summary['energy']['count'] > 0
+    assert ('temperature' in summary) == ('out_of_homeostasis_runs' in summary) == (variant in ('homeostasis', 'semi_homeostasis'))
+
+
+@pytest.mark.parametrize('variant', ['homeostasis', 'memory_energy'])
+def test_statistics_do_not_depend_on_the_processes(variant):
+    statistics = functools.partial(super_holon_statistics, variant)
+    parameters = {'num_iterations': 60}
+    # A single chunk aggregates every replicate in one pass
+    single = run_monte_carlo(variant, parameters, n_replicates=N_REPLICATES, seed=5, processes=1, chunksize=N_REPLICATES, statistics=statistics)
+    parallel = run_monte_carlo(variant, parameters, n_replicates=N_REPLICATES, seed=5, processes=2, chunksize=3, statistics=statistics)
+    np.testing.assert_array_equal(parallel.failure_cause, single.failure_cause)
+
+    for name, (_, aggregator) in single.statistics.metrics.items():
+        other = parallel.statistics[name]
+        if isinstance(aggregator, Moments):
+            assert other.count == aggregator.count
+            assert other.mean == pytest.approx(aggregator.mean, rel=1e-12)
+            assert other.variance == pytest.approx(aggregator.variance, rel=1e-12)
+        else:
+            assert other.summary() == aggregator.summary()
+
+
+@pytest.mark.parametrize('fused', [False, True])
+def test_no_valid_reward_is_not_a_step(fused):
+    # Every reward costs more than the starting energy, so the first step stops without acting
+    statistics = functools.partial(super_holon_statistics, 'homeostasis')
+    results = run_monte_carlo(
+        'homeostasis', {'num_iterations': 10, 'starting_energy': 1}, n_replicates=2, seed=1, processes=1,
+        statistics=statistics, fused=fused
+    )
+    assert results.failure_counts()['no_valid_reward'] == 2
+    summary = results.statistics.summary()
+    assert summary['energy']['count'] == summary['temperature']['count'] == 0
+    assert summary['out_of_homeostasis_runs']['runs'] == 0
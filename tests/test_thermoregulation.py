@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from holon_models import load_model
+from holon_random import RandomStreams
+from holon_thermoregulation import ALIVE, DEPLETED, OUT_OF_TEMPERATURE_RANGE, ThermoregulationEngine
+
+N_ORGANISMS = 24
+N_STEPS = 200
+
+
+class _RowStreams:
+    # Streams of one organism: its row of the engine's batch for the environment
+    def __init__(self, batch, row):
+        self.batch = batch
+        self.row = row
+
+    def stream(self, stream_id):
+        if stream_id == 'environment':
+            return self.batch.row_stream(self.row)
+        return RandomStreams(0).stream(stream_id, self.row)
+
+
+# The script's climate, where every organism lives, and extreme ones where heating or cooling starves them
+@pytest.mark.parametrize('climate', [(20.0, 40.0), (-2500.0, -1500.0), (1000.0, 3000.0)])
+def test_engine_follows_the_organisms(climate, monkeypatch):
+    module = load_model('validating')
+    monkeypatch.setattr(module, 'EXTERNAL_TEMPERATURE_RANGE', climate)
+    initial_energy = np.linspace(0.5, 12.0, N_ORGANISMS)
+    engine = ThermoregulationEngine(initial_energy, climate, rng=RandomStreams(5).batch(N_ORGANISMS, 'environment'))
+    engine.run(N_STEPS)
+
+    batch = RandomStreams(5).batch(N_ORGANISMS, 'environment')
+    for i in range(N_ORGANISMS):
+        organism = module.build_organism(initial_energy[i], _RowStreams(batch, i))
+        stop_step, cause = -1, ALIVE
+        for _ in range(N_STEPS):
+            if not organism.simulate_step():
+                stop_step = organism.step_count
+                cause = DEPLETED if organism.energy <= 0 else OUT_OF_TEMPERATURE_RANGE
+                break
+        assert engine.stop_step[i] == stop_step
+        assert engine.stop_cause[i] == cause
+        assert engine.final_energy[i] == organism.energy
+        assert engine.final_temperature[i] == organism.internal_temperature
@@ -0,0 +1,138 @@
+import os
+
+import numpy as np
+import pytest
+
+from holon_models import DEFAULT_PARAMETERS, advance_super_holon, load_model, load_variant
+from holon_random import RandomStreams
+from holon_trace import _NPY_HEADER_SIZE, NPY, NPZ, SUPER_HOLON_COLUMNS, TEMPERATURE_COLUMNS, TraceRecorder, holonetic_columns, load_trace
+
+COLUMNS = {'step': ('i8', ()), 'value': ('f4', ()), 'vector': ('f8', (3,))}
+N_STEPS = 23
+CHUNK_SIZE = 5
+
+
+def _row(step):
+    return {'step': step, 'value': step / 4, 'vector': [step, -step, step * 2]}
+
+
+def _record(recorder, steps, events=()):
+    recorded = []
+    for step in steps:
+        if recorder.should_record(step, step in events):
+            recorder.record(**_row(step))
+            recorded.append(step)
+    return recorded
+
+
+def _expected(steps):
+    return {
+        'step': np.array(steps, dtype='i8'),
+        'value': np.array([step / 4 for step in steps], dtype='f4'),
+        'vector': np.array([[step, -step, step * 2] for step in steps], dtype='f8').reshape(-1, 3),
+    }
+
+
+def _assert_trace(trace, steps):
+    expected = _expected(steps)
+    assert sorted(trace) == sorted(expected)
+    for name, values in expected.items():
+        assert trace[name].dtype == values.dtype
+        assert np.array_equal(trace[name], values)
+
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_npy_columns_round_trip(tmp_path, mmap):
+    with TraceRecorder(str(tmp_path), COLUMNS, chunk_size=CHUNK_SIZE) as recorder:
+        steps = _record(recorder, range(N_STEPS))
+    assert recorder.rows_flushed == N_STEPS
+    # close() rewrote the zero-row header in place, in the room reserved for it
+    with open(tmp_path / 'vector.npy', 'rb') as handle:
+        assert np.lib.format.read_magic(handle) == (1, 0)
+        shape, _, dtype = np.lib.format.read_array_header_1_0(handle)
+        assert (shape, dtype) == ((N_STEPS, 3), np.dtype('f8'))
+        assert handle.tell() == _NPY_HEADER_SIZE
+    trace = load_trace(str(tmp_path), mmap=mmap)
+    assert isinstance(trace['vector'], np.memmap) == mmap
+    _assert_trace(trace, steps)
+
+
+def test_npz_chunks_concatenate(tmp_path):
+    with TraceRecorder(str(tmp_path), COLUMNS, chunk_size=CHUNK_SIZE, storage=NPZ) as recorder:
+        steps = _record(recorder, range(N_STEPS))
+    chunks = sorted(name for name in os.listdir(tmp_path) if name.endswith('.npz'))
+    assert len(chunks) == recorder.chunks_flushed == -(-N_STEPS // CHUNK_SIZE)
+    _assert_trace(load_trace(str(tmp_path)), steps)
+
+
+@pytest.mark.parametrize('storage', [NPY, NPZ])
+def test_sampling(tmp_path, storage):
+    with TraceRecorder(str(tmp_path / 'every'), COLUMNS, chunk_size=CHUNK_SIZE, every=4, storage=storage) as recorder:
+        steps = _record(recorder, range(N_STEPS), events=(5,))
+    assert steps == [0, 4, 5, 8, 12, 16, 20]
+    _assert_trace(load_trace(str(tmp_path / 'every')), steps)
+
+    with TraceRecorder(str(tmp_path / 'events'), COLUMNS, events_only=True, storage=storage) as recorder:
+        steps = _record(recorder, range(N_STEPS), events=(3, 17))
+    assert steps == [3, 17]
+    _assert_trace(load_trace(str(tmp_path / 'events')), steps)
+
+
+def test_every_zero_records_and_creates_nothing(tmp_path):
+    with TraceRecorder(str(tmp_path / 'off'), COLUMNS, every=0) as recorder:
+        assert _record(recorder, range(N_STEPS), events=(3,)) == []
+    assert not (tmp_path / 'off').exists()
+
+
+def test_closed_recorder_stops_sampling(tmp_path):
+    recorder = TraceRecorder(str(tmp_path), COLUMNS)
+    _record(recorder, range(3))
+    recorder.close()
+    recorder.close()
+    assert not recorder.should_record(3, True)
+    assert len(load_trace(str(tmp_path))['step']) == 3
+
+
+def test_super_holon_hook_records_every_step(tmp_path):
+    module = load_variant('homeostasis')
+    parameters = {key: value for key, value in DEFAULT_PARAMETERS.items() if key != 'num_iterations'}
+    super_holon = module.build_super_holon(**parameters, streams=RandomStreams(4))
+    expected = []
+    with TraceRecorder(str(tmp_path), {**SUPER_HOLON_COLUMNS, **TEMPERATURE_COLUMNS}, chunk_size=CHUNK_SIZE) as recorder:
+        super_holon.trace = recorder
+        for _ in range(N_STEPS):
+            alive = super_holon.simulate_step()
+            core = super_holon.core_holon
+            expected.append((core.energy, core.materials, core.internal_temperature))
+            if not alive:
+                break
+    trace = load_trace(str(tmp_path))
+    assert np.array_equal(trace['step'], np.arange(len(expected)))
+    assert np.array_equal(trace['energy'], [row[0] for row in expected])
+    assert np.array_equal(trace['materials'], [row[1] for row in expected])
+    assert np.array_equal(trace['temperature'], [row[2] for row in expected])
+    assert np.all((trace['reward'] >= 1) | (trace['reward'] == -1))
+
+
+@pytest.mark.parametrize('model_name', ['holonetico25', 'holonetico28'])
+def test_holonetic_hook_records_goal_changes(tmp_path, model_name):
+    streams = RandomStreams(2)
+    model = load_model(model_name).BioHoloneticModel(3, 3, streams=streams)
+    force = streams.stream('force')
+    states, goals, changes = [], [], []
+    with TraceRecorder(str(tmp_path), holonetic_columns(3), events_only=True) as recorder:
+        model.trace = recorder
+        for step in range(200):
+            goal = model.goal
+            running = model.update(force.uniforms(3) - 0.5)
+            if not running or not np.array_equal(model.goal, goal):
+                changes.append(step)
+                states.append(model.state.copy())
+                goals.append(model.goal.copy())
+            if not running:
+                break
+    trace = load_trace(str(tmp_path))
+    assert changes
+    assert np.array_equal(trace['step'], changes)
+    assert np.array_equal(trace['state'], states)
+    assert np.array_equal(trace['goal'], goals)